@@ -0,0 +1,148 @@
+"""Redirect handlers benchmark: the raw Starlette route against the FastAPI one.
+
+Both handlers are served by the application, behind the same middlewares,
+and the URL comes from the redirect cache, so no database is needed and
+only the per-request overhead is compared. The requests are driven
+in-process through the ASGI transport, with no network noise.
+
+    python benchmarks/redirects.py --requests 20000 --concurrency 32
+"""
+
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime
+
+import click
+import httpx
+from fastapi.requests import Request
+from fastapi.responses import ORJSONResponse
+
+# set before the settings are imported; the limits would throttle the run
+os.environ["S4_RATE_LIMIT_ENABLED"] = "false"
+
+from sprint4.api import URL_SHORTENER_SERVICE  # noqa: E402
+from sprint4.api.rest.app import APP  # noqa: E402
+from sprint4.models.urls import HttpUrlFilter, HttpUrlRow  # noqa: E402
+
+
+SHORT_URL = "http://localhost:8080/bEnChMk"
+
+PATHS = {
+    "fastapi": f"/baseline/short-url/{SHORT_URL}",
+    "raw": f"/urls/short-url/{SHORT_URL}",
+}
+
+
+async def click_url_by_short_url(request: Request, short_url: str) -> HttpUrlRow:
+    """The handler the raw route has replaced, bar the `print`."""
+
+    ip_addr, port = request.get("client")
+    user_agent = request.headers.get("user-agent")
+    url_filter = HttpUrlFilter(
+        short_url=short_url,
+        client_info=f"<address={ip_addr}:{port};user-agent={user_agent}>",
+    )
+    row = await URL_SHORTENER_SERVICE.click_url(
+        url_filter=url_filter, ip=ip_addr, user_agent=user_agent
+    )
+    content = row.model_dump()
+    return ORJSONResponse(
+        content=content, status_code=307, headers={"Location": content["url"]}
+    )
+
+
+APP.add_api_route(
+    "/baseline/short-url/{short_url:path}", click_url_by_short_url, methods=["GET"]
+)
+
+
+def _seed_redirect_cache() -> None:
+    row = HttpUrlRow(
+        id=1,
+        url="https://example.com/benchmark",
+        short_url=SHORT_URL,
+        client_info=None,
+        clicked_at=datetime.now(),
+        nclicks=0,
+    )
+    URL_SHORTENER_SERVICE._cache_url(row, key=None)
+
+
+def _check_redirect(response: httpx.Response) -> None:
+    """Fail the run unless the response is the redirect, not timing the errors."""
+
+    if response.status_code != 307 or "location" not in response.headers:
+        msg = (
+            f"GET {response.request.url.path} answered {response.status_code}"
+            f" instead of the 307 redirect: {response.text[:200]}"
+        )
+        raise click.ClickException(msg)
+
+
+async def _run(path: str, nrequests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=APP, client=("127.0.0.1", 12345))
+    latencies: list[float] = []
+    remaining = nrequests
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started_at = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started_at)
+            _check_redirect(response)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started_at
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": nrequests,
+        "rps": nrequests / elapsed,
+        "p50_ms": percentiles[49] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+    }
+
+
+@click.command()
+@click.option(
+    "-n",
+    "--requests",
+    "nrequests",
+    type=click.IntRange(min=100),
+    default=20_000,
+    show_default=True,
+    help="number of the requests per handler",
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=32,
+    show_default=True,
+    help="number of the concurrent clients",
+)
+def main(nrequests: int, concurrency: int) -> None:
+    _seed_redirect_cache()
+    results = {}
+    for name, path in PATHS.items():
+        # warming the handler up
+        asyncio.run(_run(path, nrequests=100, concurrency=concurrency))
+        results[name] = asyncio.run(
+            _run(path, nrequests=nrequests, concurrency=concurrency)
+        )
+    for name, result in results.items():
+        click.echo(
+            f"{name:>8}: {result['rps']:10.1f} req/s"
+            f"  p50={result['p50_ms']:.3f} ms  p99={result['p99_ms']:.3f} ms"
+        )
+    gain = results["raw"]["rps"] / results["fastapi"]["rps"]
+    click.echo(f"    gain: x{gain:.2f}")
+
+
+if __name__ == "__main__":
+    main()
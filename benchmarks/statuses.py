@@ -0,0 +1,209 @@
+"""URL statuses benchmark: the lean `/statuses/all` against the model-based one.
+
+The baseline handler is the one the lean route has replaced: the ORM
+entities are loaded, validated into the status models and serialized
+by the response model. Both handlers scan the same seeded table page
+by page, in process through the ASGI transport, and the rows per second
+are compared. The table is a throwaway SQLite file by default, the
+PostgreSQL one (`S4_POSTGRES_*`, migrated) is used with `--backend postgres`,
+its benchmark rows deleted afterwards.
+
+    python benchmarks/statuses.py --rows 100000 --page-size 1000
+"""
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import click
+import orjson
+
+
+BENCH_URL_PREFIX = "https://bench.invalid/statuses/"
+
+_SEED_CHUNK_SIZE = 10_000
+
+
+async def _seed(repo, nrows: int) -> None:
+    from sprint4.core.settings import SETTINGS
+    from sprint4.core.url_shorteners import LocalShortener
+    from sprint4.models.urls import HttpUrlModel
+
+    shortener = LocalShortener(
+        domain=SETTINGS.shortener.domain,
+        code_length=SETTINGS.shortener.code_length,
+    )
+    for start in range(0, nrows, _SEED_CHUNK_SIZE):
+        ids = await repo.reserve_ids(min(_SEED_CHUNK_SIZE, nrows - start))
+        await repo.copy_urls(
+            [
+                HttpUrlModel(
+                    id=url_id,
+                    url=f"{BENCH_URL_PREFIX}{url_id}",
+                    short_url=shortener.encode_id(url_id),
+                )
+                for url_id in ids
+            ]
+        )
+
+
+async def _cleanup(repo) -> None:
+    from sqlalchemy import delete
+
+    from sprint4.db.orms import Url
+
+    async with repo._session() as session:
+        async with session.begin():
+            await session.execute(
+                delete(Url).where(Url.url.startswith(BENCH_URL_PREFIX))
+            )
+
+
+async def _scan(client, path: str, page_size: int) -> tuple[int, list[float]]:
+    """Read all the pages, return the number of the rows and the page latencies."""
+
+    from sprint4.api.rest.routes.urls import NEXT_AFTER_ID_HEADER
+
+    nrows = 0
+    latencies: list[float] = []
+    after_id = None
+    while True:
+        params = {"limit": page_size}
+        if after_id is not None:
+            params["after_id"] = after_id
+        started_at = time.perf_counter()
+        response = await client.get(path, params=params)
+        latencies.append(time.perf_counter() - started_at)
+        response.raise_for_status()
+        nrows += len(orjson.loads(response.content))
+        after_id = response.headers.get(NEXT_AFTER_ID_HEADER)
+        if after_id is None:
+            return nrows, latencies
+
+
+def _add_baseline_route(app) -> None:
+    from fastapi import Response
+
+    from sprint4.api import URL_SHORTENER_SERVICE
+    from sprint4.api.rest.routes.urls import NEXT_AFTER_ID_HEADER
+    from sprint4.models.clicks import HttpUrlStatus
+    from sprint4.models.urls import HttpUrlFilter
+
+    async def get_all_url_statuses(
+        response: Response, after_id: None | int = None, limit: int = 1000
+    ) -> list[HttpUrlStatus]:
+        """The handler the lean one has replaced."""
+
+        statuses = await URL_SHORTENER_SERVICE.get_url_stats(
+            url_filter=HttpUrlFilter(), after_id=after_id, limit=limit
+        )
+        if len(statuses) == limit:
+            response.headers[NEXT_AFTER_ID_HEADER] = str(statuses[-1].id)
+        return statuses
+
+    app.add_api_route("/baseline/statuses/all", get_all_url_statuses, methods=["GET"])
+
+
+async def _run(nrows: int, page_size: int, rounds: int, backend: str) -> dict:
+    import httpx
+
+    from sprint4.api import URL_SHORTENER_SERVICE
+    from sprint4.api.rest.app import APP
+
+    _add_baseline_route(APP)
+    paths = {"models": "/baseline/statuses/all", "lean": "/statuses/all"}
+    transport = httpx.ASGITransport(app=APP, client=("127.0.0.1", 12345))
+    results = {}
+    async with APP.router.lifespan_context(APP):
+        repo = URL_SHORTENER_SERVICE._repo
+        await _seed(repo, nrows)
+        try:
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark", timeout=None
+            ) as client:
+                # the same statuses either way, bar the JSON formatting
+                params = {"limit": page_size}
+                pages = [
+                    orjson.loads((await client.get(path, params=params)).content)
+                    for path in paths.values()
+                ]
+                assert pages[0] == pages[1], "the handlers disagree"
+                for name, path in paths.items():
+                    await _scan(client, path, page_size)  # warming up
+                    elapsed: list[float] = []
+                    latencies: list[float] = []
+                    for _ in range(rounds):
+                        started_at = time.perf_counter()
+                        scanned, page_latencies = await _scan(client, path, page_size)
+                        elapsed.append(time.perf_counter() - started_at)
+                        latencies.extend(page_latencies)
+                    percentiles = (
+                        statistics.quantiles(latencies, n=100)
+                        if len(latencies) > 1
+                        else latencies * 99
+                    )
+                    results[name] = {
+                        "rows": scanned,
+                        "rows_per_s": scanned / statistics.median(elapsed),
+                        "p50_ms": percentiles[49] * 1000,
+                        "p99_ms": percentiles[98] * 1000,
+                    }
+        finally:
+            if backend == "postgres":
+                await _cleanup(repo)
+    return results
+
+
+@click.command()
+@click.option(
+    "-r",
+    "--rows",
+    "nrows",
+    type=click.IntRange(min=1),
+    default=100_000,
+    show_default=True,
+    help="number of the seeded URLs",
+)
+@click.option(
+    "-p",
+    "--page-size",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="number of the statuses per page",
+)
+@click.option(
+    "--rounds",
+    type=click.IntRange(min=1),
+    default=3,
+    show_default=True,
+    help="number of the full scans per handler, the median one reported",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["sqlite", "postgres"]),
+    default="sqlite",
+    show_default=True,
+)
+def main(nrows: int, page_size: int, rounds: int, backend: str) -> None:
+    # set before the settings are imported; the limits would throttle the run
+    os.environ["S4_RATE_LIMIT_ENABLED"] = "false"
+    os.environ["S4_REPOSITORY_BACKEND"] = backend
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if backend == "sqlite":
+            path = os.path.join(tmp_dir, "statuses.sqlite3")
+            os.environ["S4_REPOSITORY_SQLITE_PATH"] = path
+        results = asyncio.run(_run(nrows, page_size, rounds, backend=backend))
+    for name, result in results.items():
+        click.echo(
+            f"{name:>8}: {result['rows_per_s']:12.1f} rows/s"
+            f"  page p50={result['p50_ms']:.3f} ms  p99={result['p99_ms']:.3f} ms"
+        )
+    gain = results["lean"]["rows_per_s"] / results["models"]["rows_per_s"]
+    click.echo(f"    gain: x{gain:.2f}")
+
+
+if __name__ == "__main__":
+    main()
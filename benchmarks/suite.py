@@ -0,0 +1,507 @@
+"""Benchmark suite: the repository against PostgreSQL and the app in process.
+
+The database is the one configured by the `S4_POSTGRES_*` variables,
+migrated beforehand (`alembic upgrade head`), e.g. the docker-compose
+`s4_db` service or a temporary local cluster. The benchmark rows are
+the `https://bench.invalid/...` URLs, deleted afterwards unless kept.
+
+    python benchmarks/suite.py run --output results.json
+    python benchmarks/suite.py compare old.json new.json
+
+Every result has the p50/p99 latency of a call and the throughput,
+so that the runs of two commits can be compared.
+"""
+
+import asyncio
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import click
+import orjson
+
+
+BENCH_URL_PREFIX = "https://bench.invalid/"
+SCENARIOS = ("add_urls", "redirects", "hot_clicks", "statuses")
+
+_COPY_CHUNK_SIZE = 10_000
+
+
+def _get_commit() -> None | str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _measure(
+    call: Callable[[int], Awaitable], count: int, concurrency: int
+) -> tuple[list[float], float]:
+    """Run the `count` calls by `concurrency` workers, return their latencies."""
+
+    latencies: list[float] = []
+    next_idx = 0
+
+    async def worker() -> None:
+        nonlocal next_idx
+        while next_idx < count:
+            idx, next_idx = next_idx, next_idx + 1
+            started_at = time.perf_counter()
+            await call(idx)
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started_at
+
+
+def _check_redirect(response) -> None:
+    """Fail the run unless the response is the redirect, not timing the errors."""
+
+    if response.status_code != 307 or "location" not in response.headers:
+        msg = (
+            f"GET {response.request.url.path} answered {response.status_code}"
+            f" instead of the 307 redirect: {response.text[:200]}"
+        )
+        raise click.ClickException(msg)
+
+
+def _summarize(
+    scenario: str,
+    params: dict,
+    latencies: list[float],
+    elapsed: float,
+    items_per_call: int = 1,
+    unit: str = "requests/s",
+) -> dict:
+    percentiles = (
+        statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    )
+    result = {
+        "scenario": scenario,
+        "params": params,
+        "calls": len(latencies),
+        "p50_ms": percentiles[49] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "throughput": len(latencies) * items_per_call / elapsed,
+        "unit": unit,
+    }
+    click.echo(
+        f"{scenario:>12} {orjson.dumps(params).decode():<40}"
+        f" p50={result['p50_ms']:9.3f} ms  p99={result['p99_ms']:9.3f} ms"
+        f"  {result['throughput']:12.1f} {unit}"
+    )
+    return result
+
+
+class BenchmarkSuite:
+    """The scenarios sharing the repository, the app client and the rows."""
+
+    def __init__(self, run_id: str, concurrency: int, requests: int) -> None:
+        # imported here, once the environment has been set by the command
+        from sprint4.api.rest.app import APP
+        from sprint4.core.settings import SETTINGS
+        from sprint4.core.url_shorteners import LocalShortener
+        from sprint4.db.repositories import UrlRepository
+
+        self.run_id = run_id
+        self.concurrency = concurrency
+        self.requests = requests
+        self.app = APP
+        self.repo = UrlRepository(dsn=str(SETTINGS.postgres.dsn))
+        self.shortener = LocalShortener(
+            domain=SETTINGS.shortener.domain,
+            code_length=SETTINGS.shortener.code_length,
+        )
+        self._nurls = 0
+
+    def _make_models(self, ids: list[int]) -> list:
+        from sprint4.models.urls import HttpUrlModel
+
+        models = []
+        for url_id in ids:
+            self._nurls += 1
+            models.append(
+                HttpUrlModel(
+                    id=url_id,
+                    url=f"{BENCH_URL_PREFIX}{self.run_id}/{self._nurls}",
+                    short_url=self.shortener.encode_id(url_id),
+                )
+            )
+        return models
+
+    async def seed(self, count: int) -> list:
+        """Load the `count` new URLs by COPY, return their models."""
+
+        seeded = []
+        for start in range(0, count, _COPY_CHUNK_SIZE):
+            size = min(_COPY_CHUNK_SIZE, count - start)
+            models = self._make_models(await self.repo.reserve_ids(size))
+            await self.repo.copy_urls(models)
+            seeded.extend(models)
+        return seeded
+
+    async def count_urls(self) -> int:
+        from sqlalchemy import func, select
+
+        from sprint4.db.orms import Url
+
+        async with self.repo._session() as session:
+            async with session.begin():
+                result = await session.execute(select(func.count(Url.id)))
+                return result.scalar_one()
+
+    async def cleanup(self) -> None:
+        from sqlalchemy import delete
+
+        from sprint4.db.orms import Url
+
+        async with self.repo._session() as session:
+            async with session.begin():
+                await session.execute(
+                    delete(Url).where(Url.url.startswith(BENCH_URL_PREFIX))
+                )
+
+    async def bench_add_urls(self, batch_sizes: list[int]) -> list[dict]:
+        results = []
+        for batch_size in batch_sizes:
+            ncalls = max(self.requests // batch_size, 10)
+            ids = await self.repo.reserve_ids(ncalls * batch_size)
+            batches = []
+            for start in range(0, len(ids), batch_size):
+                stop = start + batch_size
+                batches.append(self._make_models(ids[start:stop]))
+
+            async def call(idx: int) -> None:
+                await self.repo.add_urls(batches[idx])
+
+            latencies, elapsed = await _measure(call, ncalls, self.concurrency)
+            results.append(
+                _summarize(
+                    "add_urls",
+                    {"batch_size": batch_size, "concurrency": self.concurrency},
+                    latencies,
+                    elapsed,
+                    items_per_call=batch_size,
+                    unit="urls/s",
+                )
+            )
+        return results
+
+    async def bench_redirects(self, client, models: list) -> list[dict]:
+        nurls = len(models)
+        paths = {
+            "id": [f"/urls/{model.id}" for model in models],
+            "short_url": [f"/urls/short-url/{model.short_url}" for model in models],
+            "url": [f"/urls/full-url/{model.url}" for model in models],
+        }
+        results = []
+        for kind, kind_paths in paths.items():
+
+            async def call(idx: int) -> None:
+                response = await client.get(kind_paths[idx % nurls])
+                _check_redirect(response)
+
+            latencies, elapsed = await _measure(call, self.requests, self.concurrency)
+            results.append(
+                _summarize(
+                    "redirects",
+                    {"by": kind, "urls": nurls, "concurrency": self.concurrency},
+                    latencies,
+                    elapsed,
+                )
+            )
+        return results
+
+    async def bench_hot_clicks(self) -> list[dict]:
+        from sprint4.models.urls import HttpUrlFilter
+
+        (hot,) = await self.seed(1)
+        url_filter = HttpUrlFilter(id=hot.id, client_info="benchmark")
+
+        async def call(idx: int) -> None:
+            await self.repo.click_url(url_filter=url_filter)
+
+        latencies, elapsed = await _measure(call, self.requests, self.concurrency)
+        return [
+            _summarize(
+                "hot_clicks",
+                {"concurrency": self.concurrency},
+                latencies,
+                elapsed,
+            )
+        ]
+
+    async def bench_statuses(
+        self, client, table_sizes: list[int], page_size: int
+    ) -> list[dict]:
+        from sprint4.api.rest.routes.urls import NEXT_AFTER_ID_HEADER
+
+        results = []
+        for table_size in sorted(table_sizes):
+            missing = table_size - await self.count_urls()
+            if missing > 0:
+                await self.seed(missing)
+            nrows = await self.count_urls()
+
+            # the paginated scan, timed page by page
+            after_id = None
+            latencies: list[float] = []
+            started_at = time.perf_counter()
+            while True:
+                params = {"limit": page_size}
+                if after_id is not None:
+                    params["after_id"] = after_id
+                page_started_at = time.perf_counter()
+                response = await client.get("/statuses/all", params=params)
+                latencies.append(time.perf_counter() - page_started_at)
+                response.raise_for_status()
+                after_id = response.headers.get(NEXT_AFTER_ID_HEADER)
+                if after_id is None:
+                    break
+            elapsed = time.perf_counter() - started_at
+            results.append(
+                _summarize(
+                    "statuses",
+                    {"rows": nrows, "mode": "pages", "page_size": page_size},
+                    latencies,
+                    elapsed,
+                    items_per_call=nrows // len(latencies),
+                    unit="rows/s",
+                )
+            )
+
+            # the streamed scan, timed as a whole
+            async def call(idx: int) -> None:
+                params = {"stream": True}
+                async with client.stream("GET", "/statuses/all", params=params) as r:
+                    r.raise_for_status()
+                    async for _ in r.aiter_bytes():
+                        pass
+
+            latencies, elapsed = await _measure(call, 3, 1)
+            results.append(
+                _summarize(
+                    "statuses",
+                    {"rows": nrows, "mode": "stream"},
+                    latencies,
+                    elapsed,
+                    items_per_call=nrows,
+                    unit="rows/s",
+                )
+            )
+        return results
+
+
+async def _run(
+    scenarios: list[str],
+    concurrency: int,
+    requests: int,
+    batch_sizes: list[int],
+    redirect_urls: int,
+    table_sizes: list[int],
+    page_size: int,
+    keep_rows: bool,
+) -> list[dict]:
+    import httpx
+
+    suite = BenchmarkSuite(
+        run_id=datetime.now().strftime("%Y%m%d%H%M%S"),
+        concurrency=concurrency,
+        requests=requests,
+    )
+    transport = httpx.ASGITransport(app=suite.app, client=("127.0.0.1", 12345))
+    results = []
+    try:
+        # seeded before the startup builds the URL existence filter
+        redirect_models = (
+            await suite.seed(redirect_urls) if "redirects" in scenarios else []
+        )
+        async with suite.app.router.lifespan_context(suite.app):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark", timeout=None
+            ) as client:
+                if "add_urls" in scenarios:
+                    results += await suite.bench_add_urls(batch_sizes)
+                if "redirects" in scenarios:
+                    results += await suite.bench_redirects(client, redirect_models)
+                if "hot_clicks" in scenarios:
+                    results += await suite.bench_hot_clicks()
+                if "statuses" in scenarios:
+                    results += await suite.bench_statuses(
+                        client, table_sizes=table_sizes, page_size=page_size
+                    )
+    finally:
+        if not keep_rows:
+            await suite.cleanup()
+        await suite.repo.shutdown()
+    return results
+
+
+def _parse_ints(ctx, param, value: str) -> list[int]:
+    try:
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise click.BadParameter("expected comma-separated integers")
+
+
+@click.group()
+def cli() -> None:
+    pass
+
+
+@cli.command()
+@click.option(
+    "-s",
+    "--scenario",
+    "scenarios",
+    type=click.Choice(SCENARIOS),
+    multiple=True,
+    help="scenario to run (repeatable), all by default",
+)
+@click.option("-c", "--concurrency", type=click.IntRange(min=1), default=16)
+@click.option(
+    "-n",
+    "--requests",
+    type=click.IntRange(min=10),
+    default=5000,
+    show_default=True,
+    help="number of the calls per measurement",
+)
+@click.option(
+    "--batch-sizes",
+    default="1,10,100,1000",
+    show_default=True,
+    callback=_parse_ints,
+    help="`add_urls` batch sizes",
+)
+@click.option("--redirect-urls", type=click.IntRange(min=1), default=1000)
+@click.option(
+    "--table-sizes",
+    default="10000,1000000",
+    show_default=True,
+    callback=_parse_ints,
+    help="`/statuses/all` table sizes, the URLs are added up to them",
+)
+@click.option("--page-size", type=click.IntRange(min=1), default=1000)
+@click.option(
+    "--redirect-cache/--no-redirect-cache",
+    default=True,
+    show_default=True,
+    help="serve the redirects from the in-process cache",
+)
+@click.option(
+    "--keep-rows",
+    is_flag=True,
+    help="keep the benchmark URLs for the next runs to reuse the large tables",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="JSON results file, `benchmarks/results/<commit>-<time>.json` by default",
+)
+def run(
+    scenarios: tuple[str],
+    concurrency: int,
+    requests: int,
+    batch_sizes: list[int],
+    redirect_urls: int,
+    table_sizes: list[int],
+    page_size: int,
+    redirect_cache: bool,
+    keep_rows: bool,
+    output: None | Path,
+) -> None:
+    """Run the scenarios, write the results to the JSON file."""
+
+    # set before the settings are imported; the limits would throttle the run
+    os.environ["S4_RATE_LIMIT_ENABLED"] = "false"
+    if not redirect_cache:
+        os.environ["S4_CACHE_REDIRECT_SIZE"] = "0"
+    started_at = datetime.now()
+    results = asyncio.run(
+        _run(
+            scenarios=list(scenarios or SCENARIOS),
+            concurrency=concurrency,
+            requests=requests,
+            batch_sizes=batch_sizes,
+            redirect_urls=redirect_urls,
+            table_sizes=table_sizes,
+            page_size=page_size,
+            keep_rows=keep_rows,
+        )
+    )
+    commit = _get_commit()
+    report = {
+        "commit": commit,
+        "started_at": started_at.isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "options": {
+            "concurrency": concurrency,
+            "requests": requests,
+            "redirect_cache": redirect_cache,
+        },
+        "results": results,
+    }
+    if output is None:
+        name = f"{commit or 'unknown'}-{started_at:%Y%m%d%H%M%S}.json"
+        output = Path(__file__).parent / "results" / name
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    click.echo(f"the results are written to {output}")
+
+
+def _get_result_key(result: dict) -> str:
+    return f"{result['scenario']} {orjson.dumps(result['params']).decode()}"
+
+
+@cli.command()
+@click.argument("baseline", type=click.Path(exists=True, path_type=Path))
+@click.argument("current", type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "-t",
+    "--threshold",
+    type=click.FloatRange(min=0),
+    default=0.1,
+    show_default=True,
+    help="relative change of p99 or throughput to count as a regression",
+)
+def compare(baseline: Path, current: Path, threshold: float) -> None:
+    """Compare two results files, exit with 1 on any regression."""
+
+    old, new = (
+        {_get_result_key(r): r for r in orjson.loads(path.read_bytes())["results"]}
+        for path in (baseline, current)
+    )
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        p99_change = new[key]["p99_ms"] / old[key]["p99_ms"] - 1
+        throughput_change = new[key]["throughput"] / old[key]["throughput"] - 1
+        regressed = p99_change > threshold or throughput_change < -threshold
+        regressions += regressed
+        click.echo(
+            f"{'REGRESSED' if regressed else 'ok':>9}  {key:<60}"
+            f" p99 {p99_change:+7.1%}  throughput {throughput_change:+7.1%}"
+        )
+    for key in sorted(old.keys() ^ new.keys()):
+        click.echo(f"{'unpaired':>9}  {key}")
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    cli()
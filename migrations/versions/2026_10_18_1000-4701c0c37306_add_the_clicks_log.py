@@ -0,0 +1,65 @@
+"""add the clicks log
+
+Revision ID: 4701c0c37306
+Revises: 5c59b447e8f5
+Create Date: 2026-10-18 10:00:12.415093
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4701c0c37306"
+down_revision: Union[str, None] = "5c59b447e8f5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# tables
+CLICKS_TABLE: str = "clicks"
+CLICKS_DEFAULT_PARTITION: str = f"{CLICKS_TABLE}_default"
+
+# indexes
+IDX_SUFFIX = "idx"
+URL_ID_CLICKED_AT_INDEX = f"{CLICKS_TABLE}_url_id_clicked_at_{IDX_SUFFIX}"
+
+
+def upgrade() -> None:
+    # Alembic operations cannot declare partitioned tables, hence raw SQL.
+    # The monthly partitions are created by the application in advance,
+    # the default partition catches whatever falls out of them.
+    op.execute(
+        f"""
+        CREATE TABLE {CLICKS_TABLE} (
+            id BIGSERIAL NOT NULL,
+            clicked_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            url_id INTEGER NOT NULL,
+            ip TEXT,
+            user_agent TEXT,
+            PRIMARY KEY (id, clicked_at)
+        ) PARTITION BY RANGE (clicked_at)
+        """
+    )
+    op.execute(f"COMMENT ON TABLE {CLICKS_TABLE} IS 'The append-only click log'")
+    op.execute(
+        f"CREATE TABLE {CLICKS_DEFAULT_PARTITION} "
+        f"PARTITION OF {CLICKS_TABLE} DEFAULT"
+    )
+    op.create_index(
+        index_name=URL_ID_CLICKED_AT_INDEX,
+        table_name=CLICKS_TABLE,
+        columns=["url_id", "clicked_at"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        index_name=URL_ID_CLICKED_AT_INDEX,
+        table_name=CLICKS_TABLE,
+        if_exists=True,
+    )
+    # the partitions are dropped along with the parent table
+    op.execute(f"DROP TABLE IF EXISTS {CLICKS_TABLE}")
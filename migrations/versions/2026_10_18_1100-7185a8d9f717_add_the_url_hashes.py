@@ -0,0 +1,65 @@
+"""add the url hashes for deduplication
+
+Revision ID: 7185a8d9f717
+Revises: 4701c0c37306
+Create Date: 2026-10-18 11:00:41.870512
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7185a8d9f717"
+down_revision: Union[str, None] = "4701c0c37306"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# tables
+URLS_TABLE: str = "urls"
+
+# columns
+URL_HASH_COL = "url_hash"
+
+# indexes
+IDX_SUFFIX = "idx"
+URL_HASH_INDEX = f"{URL_HASH_COL}_{IDX_SUFFIX}"
+
+
+def upgrade() -> None:
+    op.add_column(
+        URLS_TABLE,
+        sa.Column(
+            URL_HASH_COL,
+            sa.LargeBinary,
+            nullable=True,
+            comment="SHA-256 of the normalized URL",
+        ),
+    )
+    # the stored URLs are normalized already, hashing them as the app does;
+    # the duplicates inserted so far keep NULL, only the first one is hashed
+    op.execute(
+        f"""
+        UPDATE {URLS_TABLE} SET {URL_HASH_COL} = sha256(convert_to(url, 'UTF8'))
+        WHERE id IN (SELECT min(id) FROM {URLS_TABLE} GROUP BY url)
+        """
+    )
+    op.create_index(
+        index_name=URL_HASH_INDEX,
+        table_name=URLS_TABLE,
+        columns=[URL_HASH_COL],
+        unique=True,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        index_name=URL_HASH_INDEX,
+        table_name=URLS_TABLE,
+        if_exists=True,
+    )
+    op.drop_column(URLS_TABLE, URL_HASH_COL)
@@ -0,0 +1,58 @@
+"""add the click rollups
+
+Revision ID: e660292a8e7d
+Revises: 7185a8d9f717
+Create Date: 2026-10-18 12:00:27.530914
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e660292a8e7d"
+down_revision: Union[str, None] = "7185a8d9f717"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# tables
+ROLLUP_TABLES: tuple[str, ...] = (
+    "click_rollups_minute",
+    "click_rollups_hour",
+    "click_rollups_day",
+)
+
+# indexes
+IDX_SUFFIX = "idx"
+
+
+def upgrade() -> None:
+    for table in ROLLUP_TABLES:
+        op.create_table(
+            table,
+            sa.Column("url_id", sa.Integer, nullable=False),
+            sa.Column("bucket", sa.DateTime, nullable=False),
+            sa.Column("nclicks", sa.BigInteger, nullable=False, server_default="0"),
+            # the series of a URL is a range scan of the primary key
+            sa.PrimaryKeyConstraint("url_id", "bucket"),
+        )
+        # the expired buckets are pruned by the time
+        op.create_index(
+            index_name=f"{table}_bucket_{IDX_SUFFIX}",
+            table_name=table,
+            columns=["bucket"],
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    for table in reversed(ROLLUP_TABLES):
+        op.drop_index(
+            index_name=f"{table}_bucket_{IDX_SUFFIX}",
+            table_name=table,
+            if_exists=True,
+        )
+        op.drop_table(table)
@@ -0,0 +1,41 @@
+"""add the unique visitor sketches
+
+Revision ID: 1372bcce7fde
+Revises: e660292a8e7d
+Create Date: 2026-10-18 13:00:09.163528
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1372bcce7fde"
+down_revision: Union[str, None] = "e660292a8e7d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# tables
+URLS_TABLE: str = "urls"
+
+# columns
+VISITORS_HLL_COL = "visitors_hll"
+
+
+def upgrade() -> None:
+    op.add_column(
+        URLS_TABLE,
+        sa.Column(
+            VISITORS_HLL_COL,
+            sa.LargeBinary,
+            nullable=True,
+            comment="HyperLogLog sketch of the distinct visitors",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column(URLS_TABLE, VISITORS_HLL_COL)
@@ -0,0 +1,304 @@
+"""partition the urls table
+
+Revision ID: 137d44dc3b6d
+Revises: 1372bcce7fde
+Create Date: 2026-10-18 14:00:51.204617
+
+The expand step of the online move to the partitioned `urls` table:
+the partitioned copy is created alongside and kept in sync by a trigger,
+the existing rows are copied by `python -m sprint4.db.backfill run`,
+then the tables are swapped by `python -m sprint4.db.backfill swap`.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "137d44dc3b6d"
+down_revision: Union[str, None] = "1372bcce7fde"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# tables
+URLS_TABLE: str = "urls"
+URLS_SEQUENCE: str = f"{URLS_TABLE}_id_seq"
+PARTITIONED_TABLE: str = "urls_partitioned"
+LIVE_TABLE: str = "urls_live"
+GONE_TABLE: str = "urls_gone"
+GONE_DEFAULT_PARTITION: str = f"{GONE_TABLE}_default"
+SHORT_URLS_TABLE: str = "url_short_urls"
+URL_HASHES_TABLE: str = "url_hashes"
+ROLLUP_TABLES: tuple[str, ...] = (
+    "click_rollups_minute",
+    "click_rollups_hour",
+    "click_rollups_day",
+)
+
+# columns
+URL_COLUMNS: tuple[str, ...] = (
+    "id",
+    "url",
+    "short_url",
+    "is_gone",
+    "visibility",
+    "client_info",
+    "clicked_at",
+    "nclicks",
+    "url_hash",
+    "visitors_hll",
+)
+
+# indexes
+IDX_SUFFIX = "idx"
+SHORT_URL_INDEX = f"{PARTITIONED_TABLE}_short_url_{IDX_SUFFIX}"
+URL_HASH_INDEX = f"{PARTITIONED_TABLE}_url_hash_{IDX_SUFFIX}"
+
+# functions and triggers
+CLAIM_KEYS_FUNCTION = "url_keys_claim"
+RELEASE_KEYS_FUNCTION = "url_keys_release"
+MIRROR_FUNCTION = "urls_mirror"
+ENSURE_GONE_PARTITIONS_FUNCTION = "urls_gone_ensure_partitions"
+
+# partitioning
+LIVE_PARTITIONS = 16  # the hash modulus, fixed for the table lifetime
+GONE_RANGE = 10_000_000  # the ids per archive partition
+GONE_RANGES_AHEAD = 4
+
+
+def _create_partitioned_table() -> None:
+    # Alembic operations cannot declare partitioned tables, hence raw SQL.
+    # The live URLs are spread by the id hash, the gone ones are archived
+    # by the id ranges, which can be detached as a whole once obsolete.
+    # The unique keys must include the partition key, hence (id, is_gone).
+    op.execute(
+        f"""
+        CREATE TABLE {PARTITIONED_TABLE} (
+            id BIGINT NOT NULL DEFAULT nextval('{URLS_SEQUENCE}'),
+            url TEXT NOT NULL,
+            short_url VARCHAR NOT NULL,
+            is_gone BOOLEAN NOT NULL DEFAULT false,
+            visibility urlvisibilitytypes NOT NULL DEFAULT 'public',
+            client_info TEXT,
+            clicked_at TIMESTAMP WITHOUT TIME ZONE,
+            nclicks INTEGER NOT NULL DEFAULT 0 CHECK (nclicks > -1),
+            url_hash BYTEA,
+            visitors_hll BYTEA,
+            PRIMARY KEY (id, is_gone)
+        ) PARTITION BY LIST (is_gone)
+        """
+    )
+    op.execute(
+        f"CREATE TABLE {LIVE_TABLE} PARTITION OF {PARTITIONED_TABLE} "
+        "FOR VALUES IN (false) PARTITION BY HASH (id)"
+    )
+    for remainder in range(LIVE_PARTITIONS):
+        op.execute(
+            f"CREATE TABLE {LIVE_TABLE}_p{remainder} PARTITION OF {LIVE_TABLE} "
+            f"FOR VALUES WITH (MODULUS {LIVE_PARTITIONS}, REMAINDER {remainder})"
+        )
+    op.execute(
+        f"CREATE TABLE {GONE_TABLE} PARTITION OF {PARTITIONED_TABLE} "
+        "FOR VALUES IN (true) PARTITION BY RANGE (id)"
+    )
+    op.execute(
+        f"CREATE TABLE {GONE_DEFAULT_PARTITION} PARTITION OF {GONE_TABLE} DEFAULT"
+    )
+    # the local indexes, the keys are unique by the directory tables
+    op.create_index(
+        index_name=SHORT_URL_INDEX,
+        table_name=PARTITIONED_TABLE,
+        columns=["short_url"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        index_name=URL_HASH_INDEX,
+        table_name=PARTITIONED_TABLE,
+        columns=["url_hash"],
+        if_not_exists=True,
+    )
+
+
+def _create_gone_partitions_function() -> None:
+    # the ranges up to the last id and `ahead` more; a range some rows
+    # of which are in the default partition already is skipped
+    op.execute(
+        f"""
+        CREATE FUNCTION {ENSURE_GONE_PARTITIONS_FUNCTION}(ahead integer)
+        RETURNS integer AS $$
+        DECLARE
+            last_range integer := (SELECT last_value FROM {URLS_SEQUENCE})
+                / {GONE_RANGE} + ahead;
+            created integer := 0;
+        BEGIN
+            FOR n IN 0..last_range LOOP
+                CONTINUE WHEN to_regclass(format('{GONE_TABLE}_p%s', n)) IS NOT NULL;
+                BEGIN
+                    EXECUTE format(
+                        'CREATE TABLE {GONE_TABLE}_p%s PARTITION OF {GONE_TABLE} '
+                        'FOR VALUES FROM (%s) TO (%s)',
+                        n, n::bigint * {GONE_RANGE}, (n + 1)::bigint * {GONE_RANGE}
+                    );
+                    created := created + 1;
+                EXCEPTION WHEN check_violation THEN
+                    RAISE NOTICE 'skipped {GONE_TABLE}_p%: rows in the default', n;
+                END;
+            END LOOP;
+            RETURN created;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+
+def _create_key_triggers() -> None:
+    # The key directories keep the short URLs and the hashes unique across
+    # the partitions. A row with a key taken is skipped as ON CONFLICT DO
+    # NOTHING would, the row moved to the other partition keeps its keys.
+    # The application never updates the keys.
+    op.execute(
+        f"""
+        CREATE FUNCTION {CLAIM_KEYS_FUNCTION}() RETURNS trigger AS $$
+        DECLARE
+            hash_claimed boolean := false;
+        BEGIN
+            IF NEW.url_hash IS NOT NULL THEN
+                INSERT INTO {URL_HASHES_TABLE} (url_hash, id)
+                VALUES (NEW.url_hash, NEW.id) ON CONFLICT DO NOTHING;
+                hash_claimed := FOUND;
+                IF NOT hash_claimed AND NOT EXISTS (
+                    SELECT 1 FROM {URL_HASHES_TABLE}
+                    WHERE url_hash = NEW.url_hash AND id = NEW.id
+                ) THEN
+                    RETURN NULL;
+                END IF;
+            END IF;
+            INSERT INTO {SHORT_URLS_TABLE} (short_url, id)
+            VALUES (NEW.short_url, NEW.id) ON CONFLICT DO NOTHING;
+            IF NOT FOUND AND NOT EXISTS (
+                SELECT 1 FROM {SHORT_URLS_TABLE}
+                WHERE short_url = NEW.short_url AND id = NEW.id
+            ) THEN
+                IF hash_claimed THEN
+                    DELETE FROM {URL_HASHES_TABLE} WHERE url_hash = NEW.url_hash;
+                END IF;
+                RETURN NULL;
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # the leaf parents are named alike before and after the swap
+    op.execute(
+        f"""
+        CREATE FUNCTION {RELEASE_KEYS_FUNCTION}() RETURNS trigger AS $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM {LIVE_TABLE} WHERE id = OLD.id)
+                OR EXISTS (SELECT 1 FROM {GONE_TABLE} WHERE id = OLD.id)
+            THEN
+                RETURN NULL;
+            END IF;
+            DELETE FROM {SHORT_URLS_TABLE}
+            WHERE short_url = OLD.short_url AND id = OLD.id;
+            DELETE FROM {URL_HASHES_TABLE}
+            WHERE url_hash = OLD.url_hash AND id = OLD.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        f"CREATE TRIGGER {CLAIM_KEYS_FUNCTION} BEFORE INSERT ON {PARTITIONED_TABLE} "
+        f"FOR EACH ROW EXECUTE FUNCTION {CLAIM_KEYS_FUNCTION}()"
+    )
+    op.execute(
+        f"CREATE TRIGGER {RELEASE_KEYS_FUNCTION} AFTER DELETE ON {PARTITIONED_TABLE} "
+        f"FOR EACH ROW EXECUTE FUNCTION {RELEASE_KEYS_FUNCTION}()"
+    )
+
+
+def _create_mirror_trigger() -> None:
+    # the writes to `urls` are repeated on the partitioned copy
+    # in the same transaction, until the swap drops the trigger
+    columns = ", ".join(URL_COLUMNS)
+    new_values = ", ".join(f"NEW.{column}" for column in URL_COLUMNS)
+    assignments = ", ".join(f"{column} = NEW.{column}" for column in URL_COLUMNS)
+    op.execute(
+        f"""
+        CREATE FUNCTION {MIRROR_FUNCTION}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO {PARTITIONED_TABLE} ({columns})
+                VALUES ({new_values}) ON CONFLICT DO NOTHING;
+            ELSIF TG_OP = 'UPDATE' THEN
+                UPDATE {PARTITIONED_TABLE} SET {assignments}
+                WHERE id = OLD.id AND is_gone = OLD.is_gone;
+            ELSE
+                DELETE FROM {PARTITIONED_TABLE}
+                WHERE id = OLD.id AND is_gone = OLD.is_gone;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        f"CREATE TRIGGER {MIRROR_FUNCTION} "
+        f"AFTER INSERT OR UPDATE OR DELETE ON {URLS_TABLE} "
+        f"FOR EACH ROW EXECUTE FUNCTION {MIRROR_FUNCTION}()"
+    )
+
+
+def upgrade() -> None:
+    # the column keeps INTEGER until the swap, the new table takes BIGINT
+    op.execute(f"ALTER SEQUENCE {URLS_SEQUENCE} AS bigint")
+    for table in ROLLUP_TABLES:
+        op.alter_column(table, "url_id", type_=sa.BigInteger, existing_type=sa.Integer)
+    op.create_table(
+        SHORT_URLS_TABLE,
+        sa.Column("short_url", sa.String, primary_key=True),
+        sa.Column("id", sa.BigInteger, nullable=False),
+        comment="The short URLs unique across the urls partitions",
+    )
+    op.create_table(
+        URL_HASHES_TABLE,
+        sa.Column("url_hash", sa.LargeBinary, primary_key=True),
+        sa.Column("id", sa.BigInteger, nullable=False),
+        comment="The URL hashes unique across the urls partitions",
+    )
+    _create_partitioned_table()
+    _create_gone_partitions_function()
+    op.execute(f"SELECT {ENSURE_GONE_PARTITIONS_FUNCTION}({GONE_RANGES_AHEAD})")
+    _create_key_triggers()
+    _create_mirror_trigger()
+
+
+def downgrade() -> None:
+    # swapped, the partitioned table is `urls` itself, not to be dropped
+    op.execute(
+        f"""
+        DO $$
+        BEGIN
+            IF to_regclass('{PARTITIONED_TABLE}') IS NULL THEN
+                RAISE EXCEPTION 'the partitioned {URLS_TABLE} table is in use';
+            END IF;
+        END
+        $$
+        """
+    )
+    op.execute(f"DROP TRIGGER IF EXISTS {MIRROR_FUNCTION} ON {URLS_TABLE}")
+    op.execute(f"DROP FUNCTION IF EXISTS {MIRROR_FUNCTION}()")
+    # the partitions and their triggers are dropped along with the table
+    op.execute(f"DROP TABLE IF EXISTS {PARTITIONED_TABLE}")
+    op.execute(f"DROP FUNCTION IF EXISTS {CLAIM_KEYS_FUNCTION}()")
+    op.execute(f"DROP FUNCTION IF EXISTS {RELEASE_KEYS_FUNCTION}()")
+    op.execute(f"DROP FUNCTION IF EXISTS {ENSURE_GONE_PARTITIONS_FUNCTION}(integer)")
+    op.drop_table(URL_HASHES_TABLE)
+    op.drop_table(SHORT_URLS_TABLE)
+    for table in ROLLUP_TABLES:
+        op.alter_column(table, "url_id", type_=sa.Integer, existing_type=sa.BigInteger)
+    op.execute(f"ALTER SEQUENCE {URLS_SEQUENCE} AS integer")
@@ -0,0 +1,50 @@
+"""widen the click url ids
+
+Revision ID: 67ca8d28668a
+Revises: 137d44dc3b6d
+Create Date: 2026-10-18 15:00:27.418093
+
+The URL ids have become BIGINT, the click log follows. The type is
+changed on the partitioned table, hence on all of its partitions, each
+one rewritten under its lock: run it off-peak on a large log.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "67ca8d28668a"
+down_revision: Union[str, None] = "137d44dc3b6d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# tables
+CLICKS_TABLE: str = "clicks"
+
+# columns
+URL_ID_COL: str = "url_id"
+
+
+def upgrade() -> None:
+    # the partitions created later take the type of the partitioned table
+    op.alter_column(
+        CLICKS_TABLE,
+        URL_ID_COL,
+        type_=sa.BigInteger,
+        existing_type=sa.Integer,
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        CLICKS_TABLE,
+        URL_ID_COL,
+        type_=sa.Integer,
+        existing_type=sa.BigInteger,
+        existing_nullable=False,
+    )
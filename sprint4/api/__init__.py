@@ -1,4 +1,4 @@
-from sprint4.core.exceptions import UrlServiceError  # noqa: F401
+from sprint4.core.exceptions import UrlGoneError, UrlServiceError  # noqa: F401
 from sprint4.services.url_shortener import UrlShortenerService  # noqa: F401
 
 
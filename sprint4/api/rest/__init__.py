@@ -1,3 +1,4 @@
+# the static networks (CIDRs), `S4_BLACKLIST_PATH` names the reloaded list
 BLACKLIST_IPS = [
     # "127.0.0.1",
 ]
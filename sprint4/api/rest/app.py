@@ -1,14 +1,33 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse
 from pydantic import ValidationError
 from sqlalchemy.exc import DataError, DatabaseError, NoResultFound
 
+from sprint4.api import URL_SHORTENER_SERVICE, UrlGoneError
 from sprint4.api.rest import BLACKLIST_IPS
+from sprint4.api.rest.middlewares import (
+    IpBlacklistMiddleware,
+    PrometheusMiddleware,
+    RateLimitMiddleware,
+)
 from sprint4.api.rest.routes import INTERNAL_ROUTER, URLS_ROUTER, URL_STATUSES_ROUTER
+from sprint4.core.metrics import mark_process_dead
+from sprint4.core.rate_limits import TokenBucketLimiter
 from sprint4.core.settings import SETTINGS
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await URL_SHORTENER_SERVICE.startup()
+    yield
+    await URL_SHORTENER_SERVICE.shutdown()
+    mark_process_dead()
+
+
 APP = FastAPI(
+    lifespan=lifespan,
     title=SETTINGS.title,
     summary=SETTINGS.summary,
     description=SETTINGS.description,
@@ -44,6 +63,14 @@ async def handle_not_found_entity(
     return ORJSONResponse(status_code=404, content={"msg": f"NotFoundError: {exc}"})
 
 
+@APP.exception_handler(UrlGoneError)
+async def handle_gone_entity(
+    request: Request,
+    exc: UrlGoneError,
+):
+    return ORJSONResponse(status_code=410, content={"msg": f"GoneError: {exc}"})
+
+
 @APP.exception_handler(DatabaseError)
 async def handle_database_error(
     request: Request,
@@ -52,10 +79,35 @@ async def handle_database_error(
     return ORJSONResponse(status_code=418, content={"msg": f"DatabaseError: {exc}"})
 
 
-@APP.middleware("http")
-async def filter_hosts(request: Request, call_next):
-    ip, _ = request.get("client")
-    if ip in BLACKLIST_IPS:
-        msg = f"the IP={ip} is in the black list"
-        return ORJSONResponse(content=msg, status_code=400)
-    return await call_next(request)
+if SETTINGS.rate_limit.enabled:
+    _limits = SETTINGS.rate_limit
+    APP.add_middleware(
+        RateLimitMiddleware,
+        limiters={
+            route_class: TokenBucketLimiter(
+                rate=getattr(_limits, f"{route_class}_rate"),
+                burst=getattr(_limits, f"{route_class}_burst"),
+                max_keys=_limits.max_keys,
+            )
+            for route_class in ("redirects", "uploads", "scans")
+        },
+        get_db_congestion=URL_SHORTENER_SERVICE.db_congestion,
+        shed_wait_time=_limits.shed_wait_time,
+        shed_classes=_limits.shed_classes,
+        shed_retry_after=_limits.shed_retry_after,
+        trusted_proxies=SETTINGS.blacklist.trusted_proxies,
+    )
+
+
+# the black list is checked before the rate limits
+APP.add_middleware(
+    IpBlacklistMiddleware,
+    networks=BLACKLIST_IPS,
+    path=SETTINGS.blacklist.path,
+    reload_interval=SETTINGS.blacklist.reload_interval,
+    trusted_proxies=SETTINGS.blacklist.trusted_proxies,
+)
+
+
+# the outermost one, to measure the whole request handling
+APP.add_middleware(PrometheusMiddleware)
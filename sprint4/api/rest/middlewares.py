@@ -0,0 +1,292 @@
+"""Pure ASGI middlewares module."""
+
+import asyncio
+import logging
+import os
+import math
+import time
+from ipaddress import IPv4Address, IPv6Address
+from pathlib import Path
+from typing import Callable, Iterable
+
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from sprint4.core.cidr import CidrIndex, parse_ip, read_networks
+from sprint4.core.metrics import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    HTTP_REQUESTS_REJECTED,
+)
+from sprint4.core.rate_limits import TokenBucketLimiter
+
+
+LOGGER = logging.getLogger(__name__)
+
+_UNMATCHED_ROUTE = "<unmatched>"
+_FORWARDED_FOR_HEADER = b"x-forwarded-for"
+
+
+def get_client_ip(
+    scope: Scope, trusted_proxies: CidrIndex
+) -> None | IPv4Address | IPv6Address:
+    """Return the client address, None if unknown or invalid.
+
+    The client is the connection peer unless the peer is a trusted proxy:
+    then `X-Forwarded-For` is read from the right, the first untrusted
+    address being the client.
+    """
+
+    client = scope.get("client")
+    addr = parse_ip(client[0]) if client else None
+    if addr is None or addr not in trusted_proxies:
+        return addr
+    hops = b",".join(
+        value for name, value in scope["headers"] if name == _FORWARDED_FOR_HEADER
+    )
+    for hop in reversed(hops.decode("latin-1").split(",")):
+        hop_addr = parse_ip(hop)
+        if hop_addr is None:
+            break
+        addr = hop_addr
+        if addr not in trusted_proxies:
+            break
+    return addr
+
+
+class PrometheusMiddleware:
+    """Count and time the HTTP requests by their route templates.
+
+    The route is known only after the routing, so it is read from the
+    scope updated by the router. The templates rather than the paths
+    keep the label cardinality bounded. The plain Starlette routes leave
+    only their endpoints in the scope, mapped back to the templates.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._endpoint_paths: None | dict = None
+
+    def _get_route_path(self, scope: Scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return _UNMATCHED_ROUTE
+        if self._endpoint_paths is None:
+            self._endpoint_paths = {
+                getattr(route, "endpoint", None): route.path
+                for route in scope["app"].routes
+            }
+        return self._endpoint_paths.get(endpoint, _UNMATCHED_ROUTE)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started_at
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            path = self._get_route_path(scope)
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, path).observe(duration)
+            HTTP_REQUESTS.labels(method, path, str(status)).inc()
+
+
+class IpBlacklistMiddleware:
+    """Reject the requests from the black listed IP networks.
+
+    The networks are the static ones plus those listed in the file,
+    which is re-read in a thread once it has changed, so that the new list
+    is swapped in without a restart. Being checked at most every
+    `reload_interval` seconds, the file costs no request a system call.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        networks: Iterable[str] = (),
+        path: None | Path = None,
+        reload_interval: float = 5.0,
+        trusted_proxies: Iterable[str] = (),
+    ) -> None:
+        self.app = app
+        self._networks = list(networks)
+        self._path = path
+        self._reload_interval = reload_interval
+        self._trusted = CidrIndex(trusted_proxies)
+        self._blocked = CidrIndex(self._networks)
+        self._mtime: None | int = -1  # not loaded yet
+        self._next_check = 0.0
+        self._reload_task: None | asyncio.Task = None
+        if path is not None:
+            # the first load blocks, not to let any request through unchecked
+            self._blocked = self._load_if_changed() or self._blocked
+            self._next_check = time.monotonic() + reload_interval
+
+    def _load_if_changed(self) -> None | CidrIndex:
+        """Return the index built anew if the file has changed, None otherwise."""
+
+        try:
+            mtime = os.stat(self._path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return None
+        blocked = CidrIndex(self._networks)
+        if mtime is None:
+            LOGGER.warning("the IP black list file %s is missing", self._path)
+        else:
+            ninvalid = 0
+            for network in read_networks(self._path):
+                try:
+                    blocked.add(network)
+                except ValueError:
+                    ninvalid += 1
+            if ninvalid:
+                msg = "skipped %d invalid networks in %s"
+                LOGGER.warning(msg, ninvalid, self._path)
+            LOGGER.info("loaded %d black listed networks", len(blocked))
+        self._mtime = mtime
+        return blocked
+
+    async def _reload(self) -> None:
+        try:
+            blocked = await asyncio.to_thread(self._load_if_changed)
+        except Exception:
+            LOGGER.exception("failed to reload the IP black list from %s", self._path)
+            return
+        if blocked is not None:
+            self._blocked = blocked
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self._reload_interval
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self._reload())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if self._path is not None:
+            self._maybe_reload()
+        if len(self._blocked):
+            ip = get_client_ip(scope, trusted_proxies=self._trusted)
+            if ip is not None and ip in self._blocked:
+                msg = f"the IP={ip} is in the black list"
+                response = ORJSONResponse(content=msg, status_code=400)
+                return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+
+def get_route_class(method: str, path: str) -> None | str:
+    """Return the rate limited class of the route, None for the unlimited ones."""
+
+    if path.startswith("/statuses"):
+        return "scans"
+    if path.startswith("/urls"):
+        if method == "POST":
+            return "uploads"
+        if method == "GET" and not path.startswith("/urls/bulk"):
+            return "redirects"
+    return None
+
+
+class RateLimitMiddleware:
+    """Limit the request rate per client IP and route class, shed the load.
+
+    Each route class has its own token buckets, so that the redirects
+    are not starved by the uploads and the status scans. The request over
+    the limit is answered 429 with `Retry-After`. While the database pool
+    is congested, as told by `get_db_congestion` returning the average
+    checkout wait, the `shed_classes` requests are answered 503 at once
+    rather than queued to time out.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: dict[str, TokenBucketLimiter],
+        get_db_congestion: Callable[[], float],
+        shed_wait_time: float = 0.0,
+        shed_classes: Iterable[str] = (),
+        shed_retry_after: int = 1,
+        trusted_proxies: Iterable[str] = (),
+    ) -> None:
+        self.app = app
+        self._limiters = limiters
+        self._get_db_congestion = get_db_congestion
+        self._shed_wait_time = shed_wait_time
+        self._shed_classes = frozenset(shed_classes)
+        self._shed_retry_after = shed_retry_after
+        self._trusted = CidrIndex(trusted_proxies)
+
+    async def _reject(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        route_class: str,
+        reason: str,
+        status_code: int,
+        retry_after: float,
+    ) -> None:
+        HTTP_REQUESTS_REJECTED.labels(route_class, reason).inc()
+        response = ORJSONResponse(
+            content={"msg": f"{reason}: retry after {retry_after:.3f} seconds"},
+            status_code=status_code,
+            headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route_class = get_route_class(scope["method"], scope["path"])
+        if route_class is None:
+            return await self.app(scope, receive, send)
+        if (
+            self._shed_wait_time
+            and route_class in self._shed_classes
+            and self._get_db_congestion() >= self._shed_wait_time
+        ):
+            return await self._reject(
+                scope,
+                receive,
+                send,
+                route_class,
+                reason="LoadShedding",
+                status_code=503,
+                retry_after=self._shed_retry_after,
+            )
+        limiter = self._limiters.get(route_class)
+        ip = get_client_ip(scope, trusted_proxies=self._trusted)
+        if limiter is not None and ip is not None:
+            wait = limiter.acquire(ip)
+            if wait:
+                return await self._reject(
+                    scope,
+                    receive,
+                    send,
+                    route_class,
+                    reason="RateLimitExceeded",
+                    status_code=429,
+                    retry_after=wait,
+                )
+        await self.app(scope, receive, send)
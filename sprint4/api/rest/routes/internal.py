@@ -1,8 +1,9 @@
 from fastapi.exceptions import HTTPException
-from fastapi.responses import ORJSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.routing import APIRouter
 
 from sprint4.api import URL_SHORTENER_SERVICE
+from sprint4.core.metrics import render_metrics
 from sprint4.models import ServiceStatistics
 
 INTERNAL_ROUTER = APIRouter(tags=["internal"])
@@ -30,3 +31,17 @@ async def ping_database() -> None:
         return ORJSONResponse(content={"ping": "pong"}, headers={"DB-Ping": "Pong"})
     except Exception:
         raise HTTPException(status_code=418, headers={"DB-Ping": "Failed"})
+
+
+@INTERNAL_ROUTER.get(
+    path="/metrics",
+    summary="Prometheus metrics",
+    description=(
+        "Returns the request, status code and database statement metrics"
+        " of all the workers in the Prometheus text format."
+    ),
+    response_class=Response,
+)
+async def get_metrics() -> Response:
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
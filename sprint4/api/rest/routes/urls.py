@@ -1,46 +1,111 @@
 
+from datetime import datetime
+from typing import AsyncIterator
+
+import orjson
+from fastapi import Query
 from fastapi.exceptions import HTTPException
 from fastapi.requests import Request
-from fastapi.responses import ORJSONResponse
+from fastapi.responses import (
+    FileResponse,
+    ORJSONResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.routing import APIRouter
 
 from sprint4.api import URL_SHORTENER_SERVICE, UrlServiceError
-from sprint4.models.urls import HttpUrlAddRequest, HttpUrlFilter, HttpUrlRow
+from sprint4.core.settings import SETTINGS
+from sprint4.models.clicks import (
+    ClickTimeseries,
+    HttpUrlStatus,
+    RollupGranularity,
+    TopUrls,
+    TopWindow,
+)
+from sprint4.models.urls import (
+    HttpUrlAddRequest,
+    HttpUrlAddResult,
+    HttpUrlFilter,
+    HttpUrlRow,
+    UrlRecordType,
+)
+from sprint4.services.bulk_ingest import BulkIngestFormat, BulkIngestSummary
 
 
 URLS_ROUTER = APIRouter(prefix="/urls", tags=["HTTP URLs"])
 URL_STATUSES_ROUTER = APIRouter(prefix="/statuses", tags=["URL statuses"])
 
+NEXT_AFTER_ID_HEADER = "Next-After-Id"
 
-def _assign_client_data_from_headers(
-    request: Request, url_filter: HttpUrlFilter
-) -> HttpUrlFilter:
-    ip_addr, port = request.get("client")
-    user_agent = request.headers.get("user-agent")
-    client_info = f"<address={ip_addr}:{port};user-agent={user_agent}>"
-    url_filter.client_info = client_info
-    return url_filter
-
+# the HttpUrlStatus fields the lean statuses have not read
+_LEAN_STATUS_FIELDS = {"clicks": None, "unique_visitors": None}
 
-def _get_redirected_response(row: HttpUrlRow) -> ORJSONResponse:
-    content = row.model_dump()
-    return ORJSONResponse(
-        content=content, status_code=307, headers={"Location": content["url"]}
-    )
+_PAGINATION_DESCRIPTION = (
+    "Returns the URLs ordered by id, paginated by `after_id` and `limit`.\n"
+    f"A full page comes with the `{NEXT_AFTER_ID_HEADER}` header "
+    "to pass as `after_id` for the next one.\n"
+    "If `stream` query parametre is True, the URLs are streamed as NDJSON."
+)
+_FULL_INFO_DESCRIPTION = (
+    "Returns the basic information on the given and found URL, "
+    "the number of its `unique_visitors` estimated.\n"
+    "If `full_info` query parametre is True, the clicks are listed "
+    "paginated by `clicks_limit` and `clicks_offset`, the latest first."
+)
 
 
 @URLS_ROUTER.post(
     path="/",
     summary="Batch upload URLs.",
-    description="Post URLs each with shortener and URL properties specified.",
+    description=(
+        "Post URLs each with shortener and URL properties specified.\n"
+        "Each URL is stored once: the result per URL tells whether it has been "
+        "`created`, found `existing` or `failed` to be shortened."
+    ),
 )
-async def add_urls(urls: list[HttpUrlAddRequest]) -> list[HttpUrlRow]:
+async def add_urls(urls: list[HttpUrlAddRequest]) -> list[HttpUrlAddResult]:
     try:
         return await URL_SHORTENER_SERVICE.add_urls(urls)
     except UrlServiceError as e:
         raise HTTPException(status_code=409, detail=str(e))
 
 
+@URLS_ROUTER.post(
+    path="/bulk",
+    summary="Bulk ingest URLs.",
+    description=(
+        "Streams the URLs in, one per line, as NDJSON objects or CSV rows "
+        "with the `url` (and optional `visibility`) header, "
+        "and loads them by COPY with the short URLs made locally.\n"
+        "Returns the summary only. If `rejects` query parametre is True, "
+        "the rejected lines are saved to the file to download separately."
+    ),
+    status_code=201,
+)
+async def ingest_urls(
+    request: Request,
+    fmt: BulkIngestFormat = Query(default=BulkIngestFormat.ndjson, alias="format"),
+    rejects: bool = False,
+) -> BulkIngestSummary:
+    return await URL_SHORTENER_SERVICE.ingest_urls(
+        request.stream(), fmt=fmt, keep_rejects=rejects
+    )
+
+
+@URLS_ROUTER.get(
+    path="/bulk/rejects/{name}",
+    summary="Download the bulk ingestion rejects.",
+    description="Returns the NDJSON file of the lines rejected by the bulk upload.",
+)
+async def get_bulk_rejects(name: str) -> FileResponse:
+    try:
+        path = URL_SHORTENER_SERVICE.get_rejects_file(name)
+    except UrlServiceError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return FileResponse(path, media_type="application/x-ndjson")
+
+
 @URLS_ROUTER.delete(
     path="/{url_id}",
     summary="Delete the URL by its id.",
@@ -59,34 +124,178 @@ async def delete_url_by_id(url_id: int, mark_gone: bool = False) -> HttpUrlRow:
     return ORJSONResponse(content=result.model_dump(), status_code=410)
 
 
+async def _get_url_statuses(
+    response: Response,
+    url_filter: HttpUrlFilter,
+    after_id: None | int,
+    limit: None | int,
+    stream: bool = False,
+    full_info: bool = False,
+    clicks_limit: int = 10,
+    clicks_offset: int = 0,
+    unique_visitors: bool = False,
+) -> list[HttpUrlStatus] | Response:
+    if stream:
+        rows = URL_SHORTENER_SERVICE.stream_url_stats(
+            url_filter=url_filter, after_id=after_id, limit=limit
+        )
+        return StreamingResponse(_to_ndjson(rows), media_type="application/x-ndjson")
+    limit = limit or SETTINGS.statuses.page_size
+    if not full_info and not unique_visitors:
+        return await _get_lean_url_statuses(url_filter, after_id=after_id, limit=limit)
+    statuses = await URL_SHORTENER_SERVICE.get_url_stats(
+        url_filter=url_filter,
+        after_id=after_id,
+        limit=limit,
+        full_info=full_info,
+        clicks_limit=clicks_limit,
+        clicks_offset=clicks_offset,
+        unique_visitors=unique_visitors,
+    )
+    if len(statuses) == limit:
+        response.headers[NEXT_AFTER_ID_HEADER] = str(statuses[-1].id)
+    return statuses
+
+
+async def _get_lean_url_statuses(
+    url_filter: HttpUrlFilter, after_id: None | int, limit: int
+) -> Response:
+    # the records go straight to orjson, bypassing the response model
+    records = await URL_SHORTENER_SERVICE.get_url_records(
+        url_filter=url_filter, after_id=after_id, limit=limit
+    )
+    for record in records:
+        record.update(_LEAN_STATUS_FIELDS)
+    headers = {}
+    if len(records) == limit:
+        headers[NEXT_AFTER_ID_HEADER] = str(records[-1]["id"])
+    return Response(
+        content=orjson.dumps(records), media_type="application/json", headers=headers
+    )
+
+
+async def _to_ndjson(
+    batches: AsyncIterator[list[UrlRecordType]],
+) -> AsyncIterator[bytes]:
+    async for records in batches:
+        yield b"".join(orjson.dumps(record) + b"\n" for record in records)
+
+
 @URL_STATUSES_ROUTER.get(
     path="/all",
     summary="Get all URL statuses",
-    description="Returns all non-paginated urls. Proceed with caution.",
+    description=_PAGINATION_DESCRIPTION,
 )
-async def get_all_url_statuses() -> list[HttpUrlRow]:
-    return await URL_SHORTENER_SERVICE.get_url_stats(url_filter=HttpUrlFilter())
+async def get_all_url_statuses(
+    response: Response,
+    after_id: None | int = Query(default=None, ge=0),
+    limit: None | int = Query(default=None, ge=1, le=SETTINGS.statuses.max_page_size),
+    stream: bool = False,
+) -> list[HttpUrlStatus]:
+    return await _get_url_statuses(
+        response=response,
+        url_filter=HttpUrlFilter(),
+        after_id=after_id,
+        limit=limit,
+        stream=stream,
+    )
+
+
+# registered before "/{url_id}", which would take "top" for an id otherwise
+@URL_STATUSES_ROUTER.get(
+    path="/top",
+    summary="Get the most clicked URLs.",
+    description=(
+        "Returns the `n` URLs most clicked over the last `1m`, `1h` or `24h`, "
+        "the most clicked first, without querying the database.\n"
+        "The clicks are counted approximately and by each server worker apart: "
+        "a count exceeds the true one by its `error` at most."
+    ),
+)
+async def get_top_urls(
+    n: int = Query(default=10, ge=1, le=SETTINGS.clicks.top_max_n),
+    window: TopWindow = TopWindow.hour,
+) -> TopUrls:
+    try:
+        return URL_SHORTENER_SERVICE.get_top_urls(n, window=window)
+    except UrlServiceError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 @URL_STATUSES_ROUTER.get(
     path="/{url_id}",
     summary="Get the URL status by its id.",
-    description="Returns the basic information on the given and found URL.",
+    description=_FULL_INFO_DESCRIPTION,
 )
-async def get_url_status_by_id(url_id: int) -> list[HttpUrlRow]:
-    return await URL_SHORTENER_SERVICE.get_url_stats(
-        url_filter=HttpUrlFilter(id=url_id)
+async def get_url_status_by_id(
+    response: Response,
+    url_id: int,
+    after_id: None | int = Query(default=None, ge=0),
+    limit: None | int = Query(default=None, ge=1, le=SETTINGS.statuses.max_page_size),
+    full_info: bool = False,
+    clicks_limit: int = Query(default=10, ge=1, le=1000),
+    clicks_offset: int = Query(default=0, ge=0),
+) -> list[HttpUrlStatus]:
+    return await _get_url_statuses(
+        response=response,
+        url_filter=HttpUrlFilter(id=url_id),
+        after_id=after_id,
+        limit=limit,
+        full_info=full_info,
+        clicks_limit=clicks_limit,
+        clicks_offset=clicks_offset,
+        unique_visitors=True,
     )
 
 
+@URL_STATUSES_ROUTER.get(
+    path="/{url_id}/timeseries",
+    summary="Get the URL clicks per time bucket.",
+    description=(
+        "Returns the clicks of the URL per `minute`, `hour` or `day` bucket "
+        "from the rollups, the buckets without clicks omitted.\n"
+        "The series ends at `to` (now by default, exclusive) and starts "
+        "at `from`, spanning the maximum number of buckets by default. "
+        "The clicks are rolled up every few seconds."
+    ),
+)
+async def get_url_click_timeseries(
+    url_id: int,
+    granularity: RollupGranularity = RollupGranularity.hour,
+    since: None | datetime = Query(default=None, alias="from"),
+    until: None | datetime = Query(default=None, alias="to"),
+) -> ClickTimeseries:
+    try:
+        return await URL_SHORTENER_SERVICE.get_click_timeseries(
+            url_id, granularity=granularity, since=since, until=until
+        )
+    except UrlServiceError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 @URL_STATUSES_ROUTER.get(
     path="/short-url/{short_url:path}",  # thanks to Starlette
     summary="Get the URL status by its short URL.",
-    description="Returns the basic information on the given and found URL.",
+    description=_FULL_INFO_DESCRIPTION,
 )
-async def get_url_status_by_short_url(short_url: str) -> list[HttpUrlRow]:
-    return await URL_SHORTENER_SERVICE.get_url_stats(
-        url_filter=HttpUrlFilter(short_url=short_url)
+async def get_url_status_by_short_url(
+    response: Response,
+    short_url: str,
+    after_id: None | int = Query(default=None, ge=0),
+    limit: None | int = Query(default=None, ge=1, le=SETTINGS.statuses.max_page_size),
+    full_info: bool = False,
+    clicks_limit: int = Query(default=10, ge=1, le=1000),
+    clicks_offset: int = Query(default=0, ge=0),
+) -> list[HttpUrlStatus]:
+    return await _get_url_statuses(
+        response=response,
+        url_filter=HttpUrlFilter(short_url=short_url),
+        after_id=after_id,
+        limit=limit,
+        full_info=full_info,
+        clicks_limit=clicks_limit,
+        clicks_offset=clicks_offset,
+        unique_visitors=True,
     )
 
 
@@ -94,50 +303,73 @@ async def get_url_status_by_short_url(short_url: str) -> list[HttpUrlRow]:
 @URL_STATUSES_ROUTER.get(
     path="/full-url/{url:path}",  # thanks to Starlette
     summary="Get the URL status by its original URL.",
-    description="Returns the basic information on the given and found URL.",
+    description=f"{_FULL_INFO_DESCRIPTION}\n{_PAGINATION_DESCRIPTION}",
 )
-async def get_url_status_by_url(url: str) -> list[HttpUrlRow]:
-    return await URL_SHORTENER_SERVICE.get_url_stats(url_filter=HttpUrlFilter(url=url))
+async def get_url_status_by_url(
+    response: Response,
+    url: str,
+    after_id: None | int = Query(default=None, ge=0),
+    limit: None | int = Query(default=None, ge=1, le=SETTINGS.statuses.max_page_size),
+    stream: bool = False,
+    full_info: bool = False,
+    clicks_limit: int = Query(default=10, ge=1, le=1000),
+    clicks_offset: int = Query(default=0, ge=0),
+) -> list[HttpUrlStatus]:
+    return await _get_url_statuses(
+        response=response,
+        url_filter=HttpUrlFilter(url=url),
+        after_id=after_id,
+        limit=limit,
+        stream=stream,
+        full_info=full_info,
+        clicks_limit=clicks_limit,
+        clicks_offset=clicks_offset,
+        unique_visitors=True,
+    )
 
 
-@URLS_ROUTER.get(
-    path="/{url_id}",
-    summary="Get the URL by its id.",
-    description="Returns the URL for the redirection.",
-)
-async def click_url_by_id(request: Request, url_id: int) -> HttpUrlRow:
-    url_filter = HttpUrlFilter(id=url_id)
-    url_filter = _assign_client_data_from_headers(
-        request=request, url_filter=url_filter
-    )
-    row = await URL_SHORTENER_SERVICE.click_url(url_filter=url_filter)
-    return _get_redirected_response(row)
+def _get_client_kwargs(request: Request) -> dict:
+    ip_addr, port = request.scope["client"] or (None, None)
+    user_agent = request.headers.get("user-agent")
+    client_info = f"<address={ip_addr}:{port};user-agent={user_agent}>"
+    return {"client_info": client_info, "ip": ip_addr, "user_agent": user_agent}
 
 
-@URLS_ROUTER.get(
-    path="/short-url/{short_url:path}",
-    summary="Get the URL by its short URL.",
-    description="Returns the URL for the redirection.",
-)
-async def click_url_by_short_url(request: Request, short_url: str) -> HttpUrlRow:
-    url_filter = HttpUrlFilter(short_url=short_url)
-    url_filter = _assign_client_data_from_headers(
-        request=request, url_filter=url_filter
-    )
-    row = await URL_SHORTENER_SERVICE.click_url(url_filter=url_filter)
-    print(f"ROW = {row}")
-    return _get_redirected_response(row)
+async def _redirect(request: Request, kind: str, value: int | str) -> Response:
+    kwargs = _get_client_kwargs(request)
+    url = await URL_SHORTENER_SERVICE.redirect(kind, value, **kwargs)
+    return Response(status_code=307, headers={"Location": url})
 
 
-@URLS_ROUTER.get(
-    path="/full-url/{url:path}",
-    summary="Get the URL by its original URL.",
-    description="Returns the URL for the redirection.",
-)
-async def click_url_by_url(request: Request, url: str) -> HttpUrlRow:
-    url_filter = HttpUrlFilter(url=url)
-    url_filter = _assign_client_data_from_headers(
-        request=request, url_filter=url_filter
-    )
-    row = await URL_SHORTENER_SERVICE.click_url(url_filter=url_filter)
-    return _get_redirected_response(row)
+# The redirects are the raw Starlette routes, bypassing the dependency
+# resolution and the response models: the bare 307 carries `Location` only.
+
+
+async def click_url_by_id(request: Request) -> Response:
+    try:
+        url_id = int(request.path_params["url_id"])
+    except ValueError:
+        raise HTTPException(status_code=422, detail="the URL id must be an integer")
+    return await _redirect(request, "id", url_id)
+
+
+async def click_url_by_short_url(request: Request) -> Response:
+    return await _redirect(request, "short_url", request.path_params["short_url"])
+
+
+async def click_url_by_url(request: Request) -> Response:
+    return await _redirect(request, "url", request.path_params["url"])
+
+
+# the plain routes are not prefixed by the router, hence the full paths
+URLS_ROUTER.add_route(
+    f"{URLS_ROUTER.prefix}/{{url_id}}", click_url_by_id, methods=["GET"]
+)
+URLS_ROUTER.add_route(
+    f"{URLS_ROUTER.prefix}/short-url/{{short_url:path}}",
+    click_url_by_short_url,
+    methods=["GET"],
+)
+URLS_ROUTER.add_route(
+    f"{URLS_ROUTER.prefix}/full-url/{{url:path}}", click_url_by_url, methods=["GET"]
+)
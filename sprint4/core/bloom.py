@@ -0,0 +1,108 @@
+"""Probabilistic membership filters module."""
+
+import math
+from hashlib import blake2b
+
+from pydantic import BaseModel
+
+
+_MAX_COUNTER = 255
+_MASK64 = (1 << 64) - 1
+
+
+class BloomFilterStatistics(BaseModel):
+    capacity: int
+    size: int
+    nbytes: int
+    nhashes: int
+    target_fp_rate: float
+    expected_fp_rate: float
+
+
+def get_bloom_filter_size(
+    capacity: int, fp_rate: float, max_bytes: None | int = None
+) -> tuple[int, int]:
+    """Return the optimal number of counters and hashes for the filter.
+
+    Args:
+        capacity: int - the expected number of keys
+        fp_rate: float - the target false positive rate
+        max_bytes: None | int - the memory budget, one byte per counter
+
+    Returns:
+        tuple[int, int] - the number of counters and of the hash functions
+    """
+
+    capacity = max(capacity, 1)
+    ncounters = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+    if max_bytes is not None:
+        ncounters = min(ncounters, max_bytes)
+    ncounters = max(ncounters, 8)
+    nhashes = max(round(ncounters / capacity * math.log(2)), 1)
+    return ncounters, nhashes
+
+
+class CountingBloomFilter:
+    """The Bloom filter with byte counters, so that the keys can be removed.
+
+    A key reported absent is definitely absent, as long as only the added
+    keys are removed. The counters saturate at 255 and are never decreased
+    afterwards, which may only leave a false positive.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float, max_bytes: None | int = None):
+        self._capacity = capacity
+        self._fp_rate = fp_rate
+        self._size, self._nhashes = get_bloom_filter_size(capacity, fp_rate, max_bytes)
+        self._counters = bytearray(self._size)
+        self._nkeys = 0
+
+    def __len__(self) -> int:
+        return self._nkeys
+
+    def __contains__(self, key: str) -> bool:
+        counters = self._counters
+        return all(counters[idx] for idx in self._get_indexes(key))
+
+    def _get_indexes(self, key: str) -> list[int]:
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        size = self._size
+        return [
+            ((first + idx * second) & _MASK64) % size for idx in range(self._nhashes)
+        ]
+
+    def add(self, key: str) -> None:
+        counters = self._counters
+        for idx in self._get_indexes(key):
+            if counters[idx] < _MAX_COUNTER:
+                counters[idx] += 1
+        self._nkeys += 1
+
+    def remove(self, key: str) -> bool:
+        """Remove the key if it seems present, return False otherwise."""
+
+        indexes = self._get_indexes(key)
+        counters = self._counters
+        if not all(counters[idx] for idx in indexes):
+            return False
+        for idx in indexes:
+            if counters[idx] < _MAX_COUNTER:
+                counters[idx] -= 1
+        self._nkeys = max(self._nkeys - 1, 0)
+        return True
+
+    def expected_fp_rate(self) -> float:
+        exponent = -self._nhashes * self._nkeys / self._size
+        return (1 - math.exp(exponent)) ** self._nhashes
+
+    def statistics(self) -> BloomFilterStatistics:
+        return BloomFilterStatistics(
+            capacity=self._capacity,
+            size=self._nkeys,
+            nbytes=self._size,
+            nhashes=self._nhashes,
+            target_fp_rate=self._fp_rate,
+            expected_fp_rate=self.expected_fp_rate(),
+        )
@@ -0,0 +1,81 @@
+"""IP network (CIDR) membership index module."""
+
+from ipaddress import IPv4Address, IPv6Address, ip_address, ip_network
+from pathlib import Path
+from typing import Iterable, Iterator
+
+
+_IpAddressType = IPv4Address | IPv6Address
+
+
+def parse_ip(value: str) -> None | _IpAddressType:
+    """Return the address (IPv4-mapped IPv6 ones as IPv4), None if invalid."""
+
+    try:
+        addr = ip_address(value.strip())
+    except ValueError:
+        return None
+    if isinstance(addr, IPv6Address) and addr.ipv4_mapped is not None:
+        return addr.ipv4_mapped
+    return addr
+
+
+def read_networks(path: Path) -> Iterator[str]:
+    """Yield the networks listed one per line, skipping the `#` comments."""
+
+    with open(path, mode="r") as lines:
+        for line in lines:
+            network = line.split("#", 1)[0].strip()
+            if network:
+                yield network
+
+
+class CidrIndex:
+    """The set of the IPv4 and IPv6 networks to look the addresses up in.
+
+    It is the binary prefix trie flattened into a hash set of the network
+    prefixes per prefix length: a lookup masks the address by each length
+    present, shortest first, which takes O(prefix length) set probes
+    however many networks there are, at one integer per network.
+    """
+
+    def __init__(self, networks: Iterable[str] = ()) -> None:
+        # ip version -> prefix length -> network prefixes
+        self._prefixes: dict[int, dict[int, set[int]]] = {4: {}, 6: {}}
+        self._lengths: dict[int, list[int]] = {4: [], 6: []}
+        self._size = 0
+        for network in networks:
+            self.add(network)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, network: str) -> None:
+        """Add the network, raising ValueError if it is invalid.
+
+        The host bits set are ignored, so `10.1.2.3/8` stands for `10.0.0.0/8`.
+        """
+
+        net = ip_network(network.strip(), strict=False)
+        by_length = self._prefixes[net.version]
+        if net.prefixlen not in by_length:
+            by_length[net.prefixlen] = set()
+            self._lengths[net.version] = sorted(by_length)
+        prefixes = by_length[net.prefixlen]
+        prefix = int(net.network_address) >> (net.max_prefixlen - net.prefixlen)
+        if prefix not in prefixes:
+            prefixes.add(prefix)
+            self._size += 1
+
+    def __contains__(self, addr: str | _IpAddressType) -> bool:
+        if isinstance(addr, str):
+            addr = parse_ip(addr)
+            if addr is None:
+                return False
+        value = int(addr)
+        bits = addr.max_prefixlen
+        prefixes = self._prefixes[addr.version]
+        for length in self._lengths[addr.version]:
+            if value >> (bits - length) in prefixes[length]:
+                return True
+        return False
@@ -2,5 +2,9 @@ class UrlServiceError(Exception):
     """Url Service Error."""
 
 
+class UrlGoneError(UrlServiceError):
+    """The URL is marked "gone"."""
+
+
 class UrlRepositoryError(Exception):
     """The base exception for database interaction errors."""
@@ -0,0 +1,118 @@
+"""Heavy hitters (top-N most frequent keys) module."""
+
+import heapq
+import time
+from collections import deque
+from typing import Callable, Generic, Hashable, TypeVar
+
+
+# the keys are compared on the count ties, so they must be orderable
+_KeyType = TypeVar("_KeyType", bound=Hashable)
+
+
+class SpaceSaving(Generic[_KeyType]):
+    """The Space-Saving summary of the stream keys, `capacity` of them at most.
+
+    A new key replaces the least counted one, inheriting its count as
+    the error, so a count overestimates the true one by its error at most.
+    Any key counted more than `total / capacity` times is in the summary.
+    The least counted key is found by a heap of the counts, its stale
+    entries skipped and rebuilt away once they outnumber the keys.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._counts: dict[_KeyType, tuple[int, int]] = {}  # key -> (count, error)
+        self._heap: list[tuple[int, _KeyType]] = []
+        self.total = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, key: _KeyType, count: int = 1) -> None:
+        self.total += count
+        counts = self._counts
+        entry = counts.get(key)
+        if entry is not None:
+            counts[key] = (entry[0] + count, entry[1])
+        elif len(counts) < self._capacity:
+            counts[key] = (count, 0)
+        else:
+            least_count, least_key = self._pop_least()
+            del counts[least_key]
+            counts[key] = (least_count + count, least_count)
+        heapq.heappush(self._heap, (counts[key][0], key))
+        if len(self._heap) > 4 * self._capacity:
+            self._heap = [(count, key) for key, (count, _) in counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_least(self) -> tuple[int, _KeyType]:
+        heap = self._heap
+        while True:
+            count, key = heapq.heappop(heap)
+            entry = self._counts.get(key)
+            if entry is not None and entry[0] == count:
+                return count, key
+
+    def items(self) -> list[tuple[_KeyType, int, int]]:
+        """Return the (key, count, error) triples in no particular order."""
+
+        return [(key, count, error) for key, (count, error) in self._counts.items()]
+
+
+class SlidingTopK(Generic[_KeyType]):
+    """The most frequent keys over the last `window` seconds.
+
+    The window is split into `slots` time slots, each summarized by its
+    own Space-Saving summary of `capacity` keys, so the memory is bounded
+    by `slots * capacity` keys. The oldest slot is dropped as a new one
+    starts, the window slides by `window / slots` seconds. Not thread-safe,
+    meant to be used from the event loop only.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        slots: int,
+        capacity: int,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._slot_length = window / slots
+        self._nslots = slots
+        self._capacity = capacity
+        self._timer = timer
+        self._slots: deque[tuple[int, SpaceSaving[_KeyType]]] = deque()
+
+    def _expire(self, slot: int) -> None:
+        slots = self._slots
+        while slots and slots[0][0] <= slot - self._nslots:
+            slots.popleft()
+
+    def add(self, key: _KeyType, count: int = 1) -> None:
+        slot = int(self._timer() // self._slot_length)
+        slots = self._slots
+        if not slots or slots[-1][0] != slot:
+            self._expire(slot)
+            slots.append((slot, SpaceSaving(self._capacity)))
+        slots[-1][1].add(key, count)
+
+    def top(self, n: int) -> list[tuple[_KeyType, int, int]]:
+        """Return the (key, count, error) triples of the `n` most counted keys.
+
+        The counts are summed over the slots, as are their errors. A key
+        evicted from a full slot summary is taken as not counted there,
+        so the keys frequent only in a part of the window may be undercounted.
+        """
+
+        self._expire(int(self._timer() // self._slot_length))
+        totals: dict[_KeyType, list[int]] = {}
+        for _, summary in self._slots:
+            for key, count, error in summary.items():
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = [count, error]
+                else:
+                    total[0] += count
+                    total[1] += error
+        top = heapq.nlargest(n, totals.items(), key=lambda item: item[1][0])
+        return [(key, count, error) for key, (count, error) in top]
@@ -0,0 +1,97 @@
+"""Prometheus metrics module.
+
+The metrics are aggregated across the worker processes by the client's
+multiprocess mode, enabled by the `PROMETHEUS_MULTIPROC_DIR` variable
+which must be set before the first import of `prometheus_client`.
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+MULTIPROC_DIR_VARIABLE = "PROMETHEUS_MULTIPROC_DIR"
+# the client picks the value storage on import, so does the module
+_MULTIPROCESS = bool(os.environ.get(MULTIPROC_DIR_VARIABLE))
+
+_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "The number of the HTTP requests handled.",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "The HTTP request handling time.",
+    ["method", "route"],
+    buckets=_LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "The number of the HTTP requests being handled.",
+    multiprocess_mode="livesum",
+)
+HTTP_REQUESTS_REJECTED = Counter(
+    "http_requests_rejected_total",
+    "The number of the HTTP requests rate limited or shed.",
+    ["route_class", "reason"],
+)
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds",
+    "The database statement execution time by the repository method.",
+    ["operation"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Return the metrics exposition and its content type."""
+
+    if _MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop the live gauges of the exiting worker process."""
+
+    if _MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def prepare_multiproc_dir(path: Path) -> None:
+    """Make the empty metrics directory for the worker processes to spawn."""
+
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+    os.environ[MULTIPROC_DIR_VARIABLE] = str(path)
@@ -0,0 +1,75 @@
+"""Rate limiting module."""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+
+_KeyType = TypeVar("_KeyType", bound=Hashable)
+
+# the idle buckets evicted per call at most, amortizing the eviction
+_MAX_IDLE_EVICTIONS = 2
+
+
+class TokenBucketLimiter(Generic[_KeyType]):
+    """The token buckets per key, refilled by `rate` tokens a second up to `burst`.
+
+    The buckets are kept in the LRU order, `max_keys` of them at most,
+    the least recently used being evicted first. The buckets idle for
+    `idle_ttl` seconds, by default the time to refill an empty one, are
+    evicted along the way, since a full bucket is no different from
+    a new one. Not thread-safe, meant to be used from the event loop only.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_keys: int = 100_000,
+        idle_ttl: None | float = None,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._max_keys = max_keys
+        self._idle_ttl = burst / rate if idle_ttl is None else idle_ttl
+        self._timer = timer
+        self._buckets: OrderedDict[_KeyType, tuple[float, float]] = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: _KeyType) -> float:
+        """Take a token, return zero or the seconds until one is available."""
+
+        now = self._timer()
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            tokens = float(self._burst)
+        else:
+            tokens, updated_at = bucket
+            tokens = min(self._burst, tokens + (now - updated_at) * self._rate)
+            buckets.move_to_end(key)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self._rate
+        buckets[key] = (tokens, now)
+        self._evict(now)
+        return wait
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while len(buckets) > self._max_keys:
+            buckets.popitem(last=False)
+            self.evictions += 1
+        for _ in range(_MAX_IDLE_EVICTIONS):
+            if not buckets:
+                break
+            _, updated_at = next(iter(buckets.values()))
+            if now - updated_at < self._idle_ttl:
+                break
+            buckets.popitem(last=False)
@@ -1,13 +1,20 @@
 """Project configuration module."""
 
 from pathlib import Path
-from os import getenv
-from typing import Callable
+from tempfile import gettempdir
+from os import cpu_count, getenv
+from typing import Callable, Literal
 
 import orjson
 import tomli
 from dotenv import find_dotenv, load_dotenv
-from pydantic import BaseModel, Field, PostgresDsn, field_serializer
+from pydantic import (
+    BaseModel,
+    Field,
+    PostgresDsn,
+    computed_field,
+    field_serializer,
+)
 from pydantic_settings import BaseSettings
 
 
@@ -37,15 +44,376 @@ class ServerSettings(BaseSettings):
 
     host: str = Field(validation_alias="s4_server_host", default=_LOCALHOST)
     port: int = Field(validation_alias="s4_server_port", default=8080)
+    # `dev` reloads on changes in one process, `prod` runs the workers
+    mode: Literal["dev", "prod"] = Field(
+        validation_alias="s4_server_mode", default="dev"
+    )
+    workers: int = Field(
+        validation_alias="s4_server_workers", default=cpu_count() or 1, ge=1
+    )
+    backlog: int = Field(validation_alias="s4_server_backlog", default=2048, ge=1)
+    keep_alive: int = Field(validation_alias="s4_server_keep_alive", default=5, ge=0)
+    limit_concurrency: None | int = Field(
+        validation_alias="s4_server_limit_concurrency", default=None, ge=1
+    )
+    limit_max_requests: None | int = Field(
+        validation_alias="s4_server_limit_max_requests", default=None, ge=1
+    )
+    graceful_shutdown: int = Field(
+        validation_alias="s4_server_graceful_shutdown", default=30, ge=0
+    )
+
+
+class ShortenerSettings(BaseSettings):
+    """The URL shorteners configuration.
+
+    The `local` shortener makes codes either from the reserved row ids
+    (`id` strategy) or from the URL hashes (`hash` strategy).
+    """
+
+    domain: str = Field(
+        validation_alias="s4_shortener_domain",
+        default=f"http://{_LOCALHOST}:8080",
+    )
+    code_length: int = Field(
+        validation_alias="s4_shortener_code_length", default=7, ge=1
+    )
+    strategy: Literal["id", "hash"] = Field(
+        validation_alias="s4_shortener_strategy", default="id"
+    )
+    max_hash_attempts: int = Field(
+        validation_alias="s4_shortener_max_hash_attempts", default=5, ge=1
+    )
+    # the external (HTTP) shorteners
+    max_workers: int = Field(
+        validation_alias="s4_shortener_max_workers", default=32, ge=1
+    )
+    concurrency: int = Field(
+        validation_alias="s4_shortener_concurrency", default=32, ge=1
+    )
+    timeout: float = Field(validation_alias="s4_shortener_timeout", default=5.0, gt=0)
+    retries: int = Field(validation_alias="s4_shortener_retries", default=2, ge=0)
+    backoff: float = Field(validation_alias="s4_shortener_backoff", default=0.2, ge=0)
+
+
+class ClicksSettings(BaseSettings):
+    """The click recording configuration.
+
+    The click log is written in the background: the clicks are queued
+    and flushed by batches of `log_batch_size` or every `log_flush_interval`
+    seconds, whatever comes first. The clicks exceeding `log_max_pending`
+    are dropped (and counted) rather than making the redirects wait.
+    The clicks per minute are rolled up into the minute, hour and day
+    buckets every `rollups_flush_interval` seconds; the minute and hour
+    buckets are kept for their retention in days, zero keeping them all.
+    The distinct visitors (IP and user agent) of each URL are estimated
+    by a HyperLogLog sketch of `2 ** visitors_precision` bytes, the error
+    being `1.04 / sqrt(2 ** visitors_precision)`, 1.15% by default.
+    The most clicked URLs are tracked over the sliding 1m/1h/24h windows,
+    `top_capacity` URLs per window slot at most.
+    Without the write-behind counters, the clicks are queued for the
+    `queue_workers` background workers rather than written before the
+    redirect, the zero workers writing them in place. The clicks beyond
+    `queue_max_pending` are dropped and counted (the "drop" overflow)
+    or make the redirects wait (the "block" one).
+    """
+
+    log_enabled: bool = Field(validation_alias="s4_clicks_log_enabled", default=True)
+    log_batch_size: int = Field(
+        validation_alias="s4_clicks_log_batch_size", default=1000, ge=1, le=8000
+    )
+    log_flush_interval: float = Field(
+        validation_alias="s4_clicks_log_flush_interval", default=1.0, gt=0
+    )
+    log_max_pending: int = Field(
+        validation_alias="s4_clicks_log_max_pending", default=100_000, ge=1
+    )
+    log_partitions_ahead: int = Field(
+        validation_alias="s4_clicks_log_partitions_ahead", default=2, ge=1
+    )
+    # the write-behind counters: `nclicks` is updated in bulk every interval
+    write_behind: bool = Field(validation_alias="s4_clicks_write_behind", default=True)
+    counter_flush_interval: float = Field(
+        validation_alias="s4_clicks_counter_flush_interval", default=0.5, gt=0
+    )
+    counter_max_pending: int = Field(
+        validation_alias="s4_clicks_counter_max_pending", default=10_000, ge=1
+    )
+    rollups_enabled: bool = Field(
+        validation_alias="s4_clicks_rollups_enabled", default=True
+    )
+    rollups_flush_interval: float = Field(
+        validation_alias="s4_clicks_rollups_flush_interval", default=5.0, gt=0
+    )
+    rollups_max_pending: int = Field(
+        validation_alias="s4_clicks_rollups_max_pending", default=10_000, ge=1
+    )
+    rollups_minute_retention: float = Field(
+        validation_alias="s4_clicks_rollups_minute_retention", default=2.0, ge=0
+    )
+    rollups_hour_retention: float = Field(
+        validation_alias="s4_clicks_rollups_hour_retention", default=90.0, ge=0
+    )
+    timeseries_max_buckets: int = Field(
+        validation_alias="s4_clicks_timeseries_max_buckets", default=10_000, ge=1
+    )
+    visitors_enabled: bool = Field(
+        validation_alias="s4_clicks_visitors_enabled", default=True
+    )
+    visitors_precision: int = Field(
+        validation_alias="s4_clicks_visitors_precision", default=13, ge=4, le=16
+    )
+    visitors_flush_interval: float = Field(
+        validation_alias="s4_clicks_visitors_flush_interval", default=10.0, gt=0
+    )
+    visitors_max_pending: int = Field(
+        validation_alias="s4_clicks_visitors_max_pending", default=1000, ge=1
+    )
+    top_enabled: bool = Field(validation_alias="s4_clicks_top_enabled", default=True)
+    top_capacity: int = Field(
+        validation_alias="s4_clicks_top_capacity", default=1000, ge=1
+    )
+    top_max_n: int = Field(validation_alias="s4_clicks_top_max_n", default=100, ge=1)
+    queue_workers: int = Field(
+        validation_alias="s4_clicks_queue_workers", default=4, ge=0
+    )
+    queue_max_pending: int = Field(
+        validation_alias="s4_clicks_queue_max_pending", default=10_000, ge=1
+    )
+    queue_batch_size: int = Field(
+        validation_alias="s4_clicks_queue_batch_size", default=100, ge=1
+    )
+    queue_overflow: Literal["drop", "block"] = Field(
+        validation_alias="s4_clicks_queue_overflow", default="drop"
+    )
+
+
+class CacheSettings(BaseSettings):
+    """The in-process caches configuration, the zero size disables a cache."""
+
+    redirect_size: int = Field(
+        validation_alias="s4_cache_redirect_size", default=100_000, ge=0
+    )
+    redirect_ttl: float = Field(
+        validation_alias="s4_cache_redirect_ttl", default=60.0, gt=0
+    )
+
+
+class UrlFilterSettings(BaseSettings):
+    """The negative lookup (Bloom) filter over the short URLs and ids.
+
+    The filter takes one byte per counter, `max_bytes` caps its memory
+    at the cost of the false positive rate. The filter misses are looked up
+    in the database, the other workers may have added the URLs since the last
+    refresh, and remembered as missing for `missing_ttl` seconds.
+    """
+
+    enabled: bool = Field(validation_alias="s4_url_filter_enabled", default=True)
+    capacity: int = Field(
+        validation_alias="s4_url_filter_capacity", default=1_000_000, ge=1
+    )
+    fp_rate: float = Field(
+        validation_alias="s4_url_filter_fp_rate", default=0.01, gt=0, lt=1
+    )
+    max_bytes: int = Field(
+        validation_alias="s4_url_filter_max_bytes", default=64 * 2**20, ge=8
+    )
+    refresh_interval: float = Field(
+        validation_alias="s4_url_filter_refresh_interval", default=5.0, gt=0
+    )
+    lookback: float = Field(
+        validation_alias="s4_url_filter_lookback", default=60.0, ge=0
+    )
+    rebuild_interval: float = Field(
+        validation_alias="s4_url_filter_rebuild_interval", default=3600.0, gt=0
+    )
+    scan_batch_size: int = Field(
+        validation_alias="s4_url_filter_scan_batch_size", default=10_000, ge=1
+    )
+    missing_size: int = Field(
+        validation_alias="s4_url_filter_missing_size", default=100_000, ge=0
+    )
+    missing_ttl: float = Field(
+        validation_alias="s4_url_filter_missing_ttl", default=1.0, gt=0
+    )
+
 
+class StatusesSettings(BaseSettings):
+    """The URL statuses pagination and streaming configuration."""
 
-class PostgresEngineConfig(BaseModel):
-    echo: bool = True
-    echo_pool: bool = True
+    page_size: int = Field(validation_alias="s4_statuses_page_size", default=100, ge=1)
+    max_page_size: int = Field(
+        validation_alias="s4_statuses_max_page_size", default=10_000, ge=1
+    )
+    stream_batch_size: int = Field(
+        validation_alias="s4_statuses_stream_batch_size", default=1000, ge=1
+    )
+
+
+class BulkIngestSettings(BaseSettings):
+    """The bulk URL ingestion configuration."""
+
+    chunk_size: int = Field(validation_alias="s4_bulk_chunk_size", default=10_000, ge=1)
+    max_line_bytes: int = Field(
+        validation_alias="s4_bulk_max_line_bytes", default=65_536, ge=1
+    )
+    rejects_dir: Path = Field(
+        validation_alias="s4_bulk_rejects_dir",
+        default=Path(gettempdir()) / "sprint4-rejects",
+    )
+
+
+class BlacklistSettings(BaseSettings):
+    """The IP black list configuration.
+
+    The file lists the blocked IPv4/IPv6 networks (CIDRs) one per line,
+    `#` starting a comment. It is re-read once changed, checked at most
+    every `reload_interval` seconds. The `X-Forwarded-For` header is
+    trusted only as set by the `trusted_proxies` networks (a JSON list).
+    """
+
+    path: None | Path = Field(validation_alias="s4_blacklist_path", default=None)
+    reload_interval: float = Field(
+        validation_alias="s4_blacklist_reload_interval", default=5.0, gt=0
+    )
+    trusted_proxies: list[str] = Field(
+        validation_alias="s4_blacklist_trusted_proxies", default=[]
+    )
+
+
+class RateLimitSettings(BaseSettings):
+    """The rate limits per client IP and route class, and the load shedding.
+
+    The token buckets are per worker process: a client is allowed `rate`
+    requests a second, bursting up to `burst` ones, by each worker.
+    Once the database pool checkouts wait `shed_wait_time` seconds
+    on average, the `shed_classes` requests are rejected until they wait
+    no more; the zero time disables the shedding.
+    """
+
+    enabled: bool = Field(validation_alias="s4_rate_limit_enabled", default=True)
+    redirects_rate: float = Field(
+        validation_alias="s4_rate_limit_redirects_rate", default=100.0, gt=0
+    )
+    redirects_burst: int = Field(
+        validation_alias="s4_rate_limit_redirects_burst", default=200, ge=1
+    )
+    uploads_rate: float = Field(
+        validation_alias="s4_rate_limit_uploads_rate", default=2.0, gt=0
+    )
+    uploads_burst: int = Field(
+        validation_alias="s4_rate_limit_uploads_burst", default=10, ge=1
+    )
+    scans_rate: float = Field(
+        validation_alias="s4_rate_limit_scans_rate", default=5.0, gt=0
+    )
+    scans_burst: int = Field(
+        validation_alias="s4_rate_limit_scans_burst", default=20, ge=1
+    )
+    max_keys: int = Field(
+        validation_alias="s4_rate_limit_max_keys", default=100_000, ge=1
+    )
+    shed_wait_time: float = Field(
+        validation_alias="s4_rate_limit_shed_wait_time", default=0.5, ge=0
+    )
+    shed_classes: list[Literal["redirects", "uploads", "scans"]] = Field(
+        validation_alias="s4_rate_limit_shed_classes", default=["uploads", "scans"]
+    )
+    shed_retry_after: int = Field(
+        validation_alias="s4_rate_limit_shed_retry_after", default=1, ge=1
+    )
+
+
+class MetricsSettings(BaseSettings):
+    """The Prometheus metrics configuration.
+
+    The worker processes share their metrics through the files
+    in `multiproc_dir`, cleared when the server starts.
+    """
+
+    multiproc_dir: Path = Field(
+        validation_alias="s4_metrics_multiproc_dir",
+        default=Path(gettempdir()) / "sprint4-metrics",
+    )
+
+
+class RepositorySettings(BaseSettings):
+    """The URL storage backend configuration.
+
+    The `postgres` backend is the reference one. The `sqlite` backend keeps
+    the URLs in the local `sqlite_path` file, a writer at a time. The `memory`
+    backend keeps them in the worker process: they are neither persisted
+    nor shared between the workers, the latest `memory_max_clicks` clicks
+    of each URL are logged.
+    """
+
+    backend: Literal["postgres", "sqlite", "memory"] = Field(
+        validation_alias="s4_repository_backend", default="postgres"
+    )
+    sqlite_path: Path = Field(
+        validation_alias="s4_repository_sqlite_path",
+        default=Path(gettempdir()) / "sprint4.sqlite3",
+    )
+    sqlite_pool_size: int = Field(
+        validation_alias="s4_repository_sqlite_pool_size", default=5, ge=1
+    )
+    sqlite_busy_timeout: float = Field(
+        validation_alias="s4_repository_sqlite_busy_timeout", default=5.0, gt=0
+    )
+    memory_max_clicks: int = Field(
+        validation_alias="s4_repository_memory_max_clicks", default=1000, ge=1
+    )
+
+
+class PostgresEngineConfig(BaseSettings):
+    """The `create_async_engine` keywords.
+
+    The pool is per worker process, so the server may open up to
+    `workers * (pool_size + max_overflow)` connections. A checkout waits
+    for `pool_timeout` seconds at most. The asyncpg options are passed
+    as the `connect_args`; `statement_timeout` is in milliseconds, zero
+    disables it, as does the zero `statement_cache_size` for the prepared
+    statements (needed behind PgBouncer in the transaction mode).
+    """
+
+    echo: bool = Field(validation_alias="s4_postgres_echo", default=False)
+    echo_pool: bool = Field(validation_alias="s4_postgres_echo_pool", default=False)
     hide_parameters: bool = True
     json_deserializer: Callable = orjson.loads
     json_serializer: Callable = orjson.dumps
-    pool_pre_ping: bool = True
+    pool_pre_ping: bool = Field(
+        validation_alias="s4_postgres_pool_pre_ping", default=True
+    )
+    pool_size: int = Field(validation_alias="s4_postgres_pool_size", default=10, ge=1)
+    max_overflow: int = Field(
+        validation_alias="s4_postgres_max_overflow", default=10, ge=0
+    )
+    pool_recycle: int = Field(
+        validation_alias="s4_postgres_pool_recycle", default=1800, ge=-1
+    )
+    pool_timeout: float = Field(
+        validation_alias="s4_postgres_pool_timeout", default=10.0, gt=0
+    )
+    statement_cache_size: int = Field(
+        validation_alias="s4_postgres_statement_cache_size",
+        default=100,
+        ge=0,
+        exclude=True,
+    )
+    statement_timeout: int = Field(
+        validation_alias="s4_postgres_statement_timeout",
+        default=30_000,
+        ge=0,
+        exclude=True,
+    )
+
+    @computed_field
+    @property
+    def connect_args(self) -> dict:
+        return {
+            "statement_cache_size": self.statement_cache_size,
+            "server_settings": {"statement_timeout": str(self.statement_timeout)},
+        }
 
 
 class PostgresSessionConfig(BaseModel):
@@ -59,6 +427,9 @@ class PostgresSettings(BaseSettings):
 
     The credentials should be defined in the environment file.
     This file is meant to be `.env`, containing variables with `S4_` prefix.
+    The read replicas (a JSON list of the DSNs) serve the URL statuses
+    while they lag behind the primary `replica_max_lag` seconds at most,
+    checked every `replica_check_interval` seconds.
     """
 
     dsn: PostgresDsn = (
@@ -69,11 +440,24 @@ class PostgresSettings(BaseSettings):
     )
     engine_settings: PostgresEngineConfig = PostgresEngineConfig()
     session_settings: PostgresSessionConfig = PostgresSessionConfig()
+    replica_dsns: list[PostgresDsn] = Field(
+        validation_alias="s4_postgres_replica_dsns", default=[]
+    )
+    replica_max_lag: float = Field(
+        validation_alias="s4_postgres_replica_max_lag", default=5.0, ge=0
+    )
+    replica_check_interval: float = Field(
+        validation_alias="s4_postgres_replica_check_interval", default=5.0, gt=0
+    )
 
     @field_serializer("dsn")
     def serialise_dsn(self, dsn, _info) -> str:
         return str(dsn)
 
+    @field_serializer("replica_dsns")
+    def serialise_replica_dsns(self, replica_dsns, _info) -> list[str]:
+        return [str(dsn) for dsn in replica_dsns]
+
 
 class Settings(BaseSettings):
     title: str = _AppMetaSection.get("title", "App Title")
@@ -82,6 +466,16 @@ class Settings(BaseSettings):
     description: str = _MainSection.get("description", "App Description")
 
     server: ServerSettings = ServerSettings()
+    shortener: ShortenerSettings = ShortenerSettings()
+    clicks: ClicksSettings = ClicksSettings()
+    cache: CacheSettings = CacheSettings()
+    url_filter: UrlFilterSettings = UrlFilterSettings()
+    statuses: StatusesSettings = StatusesSettings()
+    bulk: BulkIngestSettings = BulkIngestSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    blacklist: BlacklistSettings = BlacklistSettings()
+    rate_limit: RateLimitSettings = RateLimitSettings()
+    repository: RepositorySettings = RepositorySettings()
     postgres: PostgresSettings = PostgresSettings()
 
 
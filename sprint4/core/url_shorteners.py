@@ -1,10 +1,30 @@
+import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from hashlib import blake2b
+from string import ascii_letters, digits
 
 from pyshorteners import Shortener
+from requests import exceptions as requests_exceptions
 
 from sprint4.core.ptypes import HttpUrlType
 
 
+BASE62_ALPHABET = digits + ascii_letters
+_BASE62_INDEX = {char: idx for idx, char in enumerate(BASE62_ALPHABET)}
+# an odd prime co-prime with 62, so multiplying by it permutes [0, 62**n)
+_ID_SCRAMBLER = 1_580_030_173
+
+# the transient failures worth another attempt, the shortener errors are not
+_RETRIED_ERRORS = (
+    TimeoutError,
+    ConnectionError,
+    requests_exceptions.ConnectionError,
+    requests_exceptions.Timeout,
+)
+
+
 class ShortenerError(Exception):
     """Generic (HTTP) URL Shortener Error."""
 
@@ -12,6 +32,35 @@ class ShortenerError(Exception):
 class ShortenersEnum(str, Enum):
     clckru = "clckru"
     osdb = "osdb"
+    local = "local"
+
+
+def encode_base62(number: int) -> str:
+    """Encode the non-negative integer into the base62 string."""
+
+    if number < 0:
+        msg = f"cannot encode a negative number: {number}"
+        raise ShortenerError(msg)
+    if number == 0:
+        return BASE62_ALPHABET[0]
+    chars = []
+    while number:
+        number, rem = divmod(number, 62)
+        chars.append(BASE62_ALPHABET[rem])
+    return "".join(reversed(chars))
+
+
+def decode_base62(code: str) -> int:
+    """Decode the base62 string into the integer."""
+
+    number = 0
+    try:
+        for char in code:
+            number = number * 62 + _BASE62_INDEX[char]
+    except KeyError as e:
+        msg = f"invalid base62 code: {code!r}"
+        raise ShortenerError(msg) from e
+    return number
 
 
 class ShortenerMixin:
@@ -29,7 +78,85 @@ class OsDbShortener(ShortenerMixin):
         self._shortener = Shortener(**kwargs).osdb
 
 
-def get_shortener(shortener_code: str, **kwargs) -> ClckRuShortener | OsDbShortener:
+class LocalShortener:
+    """In-process short code generator, no network involved.
+
+    Two flavours of codes are available:
+    * `encode_id` - a base62 code derived from the (reserved) row id,
+      unique by construction and reversible with `decode_id`;
+    * `shorten` - a base62 code of the URL hash, the caller is responsible
+      for checking collisions and retrying with another `salt`.
+    """
+
+    def __init__(self, domain: str, code_length: int = 7) -> None:
+        if code_length < 1:
+            msg = f"the code length must be positive, got {code_length}"
+            raise ShortenerError(msg)
+        self._domain = domain.rstrip("/")
+        self._code_length = code_length
+        self._modulo = 62**code_length
+
+    @property
+    def domain(self) -> str:
+        return self._domain
+
+    @property
+    def code_length(self) -> int:
+        return self._code_length
+
+    def to_short_url(self, code: str) -> str:
+        return f"{self._domain}/{code}"
+
+    def encode_id(self, url_id: int) -> str:
+        """Return the short URL for the row id.
+
+        Ids fitting into `code_length` characters are scrambled, so that
+        consecutive ids do not produce consecutive codes. Larger ids are
+        encoded as is and are thus longer than `code_length`.
+        """
+
+        if url_id < self._modulo:
+            scrambled = url_id * _ID_SCRAMBLER % self._modulo
+            code = encode_base62(scrambled).rjust(self._code_length, "0")
+        else:
+            code = encode_base62(url_id)
+        return self.to_short_url(code)
+
+    def decode_id(self, short_url: str) -> None | int:
+        """Return the row id the short URL was produced from, if any."""
+
+        prefix = f"{self._domain}/"
+        if not short_url.startswith(prefix):
+            return None
+        code = short_url.removeprefix(prefix)
+        try:
+            number = decode_base62(code)
+        except ShortenerError:
+            return None
+        if len(code) > self._code_length:
+            return number if number >= self._modulo else None
+        if len(code) < self._code_length:
+            return None
+        inverse = pow(_ID_SCRAMBLER, -1, self._modulo)
+        return number * inverse % self._modulo
+
+    def shorten(self, url: HttpUrlType, salt: int = 0) -> str:
+        """Return the hash-based short URL for the url.
+
+        The same `url` and `salt` always give the same code.
+        """
+
+        payload = f"{salt}:{url}".encode()
+        digest = blake2b(payload, digest_size=16).digest()
+        # reduced rather than cut: the leading digits of the 128-bit number
+        # would be skewed towards the small ones
+        number = int.from_bytes(digest, "big") % self._modulo
+        return self.to_short_url(encode_base62(number).rjust(self._code_length, "0"))
+
+
+def get_shortener(
+    shortener_code: str, **kwargs
+) -> ClckRuShortener | OsDbShortener | LocalShortener:
     """Return a Shortener class by its string code value."""
 
     try:
@@ -42,3 +169,111 @@ def get_shortener(shortener_code: str, **kwargs) -> ClckRuShortener | OsDbShorte
         return ClckRuShortener(**kwargs)
     if code == ShortenersEnum.osdb:
         return OsDbShortener(**kwargs)
+    if code == ShortenersEnum.local:
+        return LocalShortener(**kwargs)
+
+
+class ExternalShortenerPool:
+    """Runs the blocking (HTTP) shorteners off the event loop.
+
+    The calls are made in a bounded thread pool, each one with a timeout,
+    the transient failures retried with the exponential backoff. The
+    shortener instances are created once per shortener code and reused.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 32,
+        concurrency: int = 32,
+        timeout: float = 5.0,
+        retries: int = 2,
+        backoff: float = 0.2,
+    ) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="shortener"
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._timeout = timeout
+        self._retries = retries
+        self._backoff = backoff
+        self._shorteners: dict[ShortenersEnum, ClckRuShortener | OsDbShortener] = {}
+
+    def _get_shortener(
+        self, shortener_code: ShortenersEnum
+    ) -> ClckRuShortener | OsDbShortener:
+        shortener = self._shorteners.get(shortener_code)
+        if shortener is None:
+            if shortener_code == ShortenersEnum.local:
+                msg = "the local shortener does not need the external pool"
+                raise ShortenerError(msg)
+            # the HTTP timeout keeps the worker threads from hanging forever
+            shortener = get_shortener(shortener_code, timeout=self._timeout)
+            self._shorteners[shortener_code] = shortener
+        return shortener
+
+    def _release(self, future: asyncio.Future) -> None:
+        self._semaphore.release()
+        # the result of a timed out call is awaited no more
+        if not future.cancelled():
+            future.exception()
+
+    async def _call(self, shortener: ClckRuShortener | OsDbShortener, url: str) -> str:
+        """Run the call in the pool, the slot held until the thread is done.
+
+        A timed out call keeps blocking its thread, so its slot is released
+        on its completion rather than on the timeout: the retries never
+        put more than `concurrency` calls in flight.
+        """
+
+        await self._semaphore.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, shortener.shorten, url)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wait_for(asyncio.shield(future), timeout=self._timeout)
+
+    async def shorten(self, shortener_code: ShortenersEnum, url: HttpUrlType) -> str:
+        """Shorten the URL by the external shortener.
+
+        The timeouts and the connection errors are retried, the errors
+        of the shortener itself (a rejected URL, say) are not.
+
+        Raises:
+            ShortenerError - if the shortener failed or all the attempts did
+        """
+
+        shortener = self._get_shortener(shortener_code)
+        delay = self._backoff
+        attempt = 0
+        while True:
+            try:
+                return await self._call(shortener, url)
+            except Exception as e:
+                if attempt >= self._retries or not isinstance(e, _RETRIED_ERRORS):
+                    msg = f"{shortener_code.value} failed to shorten {url}: {e!r}"
+                    raise ShortenerError(msg) from e
+            attempt += 1
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay *= 2
+
+    async def shorten_many(
+        self,
+        items: list[tuple[ShortenersEnum, HttpUrlType]],
+        return_exceptions: bool = False,
+    ) -> list[str | BaseException]:
+        """Shorten the URLs concurrently, preserving their order.
+
+        With `return_exceptions`, a failed URL gets its exception in place
+        of the short URL instead of failing the others.
+        """
+
+        return await asyncio.gather(
+            *(self.shorten(code, url) for code, url in items),
+            return_exceptions=return_exceptions,
+        )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
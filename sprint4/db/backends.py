@@ -0,0 +1,43 @@
+"""URL repository backends module."""
+
+from sprint4.core.settings import SETTINGS, RepositorySettings
+from sprint4.db.memory import InMemoryUrlRepository
+from sprint4.db.protocols import UrlRepositoryProtocol
+from sprint4.db.repositories import UrlRepository
+from sprint4.db.sqlite import (
+    SqliteUrlRepository,
+    get_sqlite_dsn,
+    get_sqlite_engine_settings,
+)
+
+
+def get_url_repository(
+    settings: None | RepositorySettings = None,
+) -> UrlRepositoryProtocol:
+    """Return the URL repository of the configured backend.
+
+    Args:
+        settings: None | RepositorySettings - the backend settings,
+            `SETTINGS.repository` by default
+
+    Returns:
+        UrlRepositoryProtocol - the repository
+    """
+
+    settings = settings if settings else SETTINGS.repository
+    if settings.backend == "memory":
+        return InMemoryUrlRepository(max_clicks_per_url=settings.memory_max_clicks)
+    if settings.backend == "sqlite":
+        return SqliteUrlRepository(
+            dsn=get_sqlite_dsn(settings.sqlite_path),
+            engine_settings=get_sqlite_engine_settings(settings),
+            session_settings=SETTINGS.postgres.session_settings.model_dump(),
+        )
+    return UrlRepository(
+        dsn=str(SETTINGS.postgres.dsn),
+        engine_settings=SETTINGS.postgres.engine_settings.model_dump(),
+        session_settings=SETTINGS.postgres.session_settings.model_dump(),
+        replica_dsns=[str(dsn) for dsn in SETTINGS.postgres.replica_dsns],
+        replica_max_lag=SETTINGS.postgres.replica_max_lag,
+        replica_check_interval=SETTINGS.postgres.replica_check_interval,
+    )
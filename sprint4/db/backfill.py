@@ -0,0 +1,270 @@
+"""Online backfill of the partitioned `urls` table.
+
+The migration 137d44dc3b6d creates `urls_partitioned` alongside `urls`,
+the writes to `urls` repeated on it by a trigger. The existing rows are
+copied in the id order by chunks, each one a short transaction locking
+its own rows only, so the application keeps serving meanwhile. Then
+the tables are swapped in one short transaction, and the application
+is restarted: it detects the partitioned layout on start.
+
+    python -m sprint4.db.backfill run --chunk-size 10000 --pause 0.05
+    python -m sprint4.db.backfill verify
+    python -m sprint4.db.backfill swap
+    python -m sprint4.db.backfill archive-partitions --ahead 4
+
+The copy is resumed by `--after-id`, the last id it has reported.
+The old table is kept as `urls_unpartitioned` until dropped by hand.
+"""
+
+import asyncio
+from typing import AsyncIterator
+
+import click
+from sqlalchemy.sql import text
+
+from sprint4.core.ptypes import KeywordsType
+from sprint4.core.settings import SETTINGS
+from sprint4.db.orms import Url
+from sprint4.db.utils import get_async_engine
+
+
+_COLUMNS = ", ".join(column.name for column in Url.__table__.columns)
+
+# the chunk rows are locked, an UPDATE of one of them waits for the copy
+# and is then repeated on the copied row by the trigger
+_COPY_CHUNK_QUERY = text(
+    f"""
+    WITH chunk AS (
+        SELECT {_COLUMNS} FROM urls
+        WHERE id > :after_id AND id <= :until_id
+        ORDER BY id LIMIT :chunk_size
+        FOR SHARE
+    ), copied AS (
+        INSERT INTO urls_partitioned ({_COLUMNS})
+        SELECT {_COLUMNS} FROM chunk
+        ON CONFLICT DO NOTHING
+        RETURNING 1
+    )
+    SELECT (SELECT max(id) FROM chunk), (SELECT count(*) FROM copied)
+    """
+)
+
+# one statement, one snapshot: the trigger keeps the counts equal
+_COUNT_QUERY = text(
+    "SELECT (SELECT count(*) FROM urls), (SELECT count(*) FROM urls_partitioned)"
+)
+
+_SWAP_STATEMENTS = (
+    "LOCK TABLE urls IN ACCESS EXCLUSIVE MODE",
+    "DROP TRIGGER urls_mirror ON urls",
+    "DROP FUNCTION urls_mirror()",
+    "ALTER TABLE urls RENAME TO urls_unpartitioned",
+    "ALTER TABLE urls_partitioned RENAME TO urls",
+    "ALTER SEQUENCE urls_id_seq OWNED BY urls.id",
+)
+
+
+class UrlBackfill:
+    """Copies `urls` into the partitioned table and swaps them."""
+
+    def __init__(self, dsn: str, engine_settings: None | KeywordsType = None) -> None:
+        self._engine = get_async_engine(url=dsn, settings=engine_settings)
+
+    async def shutdown(self) -> None:
+        await self._engine.dispose()
+
+    async def get_last_id(self) -> int:
+        async with self._engine.begin() as conn:
+            result = await conn.execute(text("SELECT coalesce(max(id), 0) FROM urls"))
+            return result.scalar_one()
+
+    async def copy_chunk(
+        self, after_id: int, until_id: int, chunk_size: int
+    ) -> tuple[None | int, int]:
+        """Copy the next chunk of rows, return its last id and the copied count.
+
+        The rows copied already, by the trigger or a previous run, are skipped.
+        The last id is None once there are no rows left up to `until_id`.
+        """
+
+        params = {"after_id": after_id, "until_id": until_id, "chunk_size": chunk_size}
+        async with self._engine.begin() as conn:
+            result = await conn.execute(_COPY_CHUNK_QUERY, params)
+            last_id, ncopied = result.one()
+        return last_id, ncopied
+
+    async def run(
+        self, after_id: int = 0, chunk_size: int = 10_000, pause: float = 0.0
+    ) -> AsyncIterator[tuple[int, int]]:
+        """Copy the rows after the id by chunks, yield each last id and count.
+
+        The rows inserted since the start are copied by the trigger.
+        The `pause` seconds between the chunks leave the database some air.
+        """
+
+        until_id = await self.get_last_id()
+        while True:
+            last_id, ncopied = await self.copy_chunk(after_id, until_id, chunk_size)
+            if last_id is None:
+                return
+            yield last_id, ncopied
+            after_id = last_id
+            if pause:
+                await asyncio.sleep(pause)
+
+    async def count_rows(self) -> tuple[int, int]:
+        """Return the numbers of the rows in `urls` and in its partitioned copy."""
+
+        async with self._engine.begin() as conn:
+            result = await conn.execute(_COUNT_QUERY)
+            return tuple(result.one())
+
+    async def swap(self, lock_timeout: float = 5.0) -> None:
+        """Put the partitioned table in the place of `urls`.
+
+        The lock is given up after `lock_timeout` seconds rather than
+        queueing the application queries behind it, the swap is retried.
+        """
+
+        async with self._engine.begin() as conn:
+            await conn.execute(
+                text(f"SET LOCAL lock_timeout = '{int(lock_timeout * 1000)}ms'")
+            )
+            for statement in _SWAP_STATEMENTS:
+                await conn.execute(text(statement))
+
+    async def ensure_archive_partitions(self, ahead: int) -> int:
+        """Create the gone URLs range partitions up to the last id and `ahead` more.
+
+        Returns:
+            int - the number of the partitions created
+        """
+
+        async with self._engine.begin() as conn:
+            result = await conn.execute(
+                text("SELECT urls_gone_ensure_partitions(:ahead)"), {"ahead": ahead}
+            )
+            return result.scalar_one()
+
+
+async def _run(after_id: int, chunk_size: int, pause: float) -> None:
+    backfill = UrlBackfill(str(SETTINGS.postgres.dsn))
+    try:
+        total = 0
+        async for last_id, ncopied in backfill.run(
+            after_id=after_id, chunk_size=chunk_size, pause=pause
+        ):
+            total += ncopied
+            click.echo(f"copied {ncopied} row(s) up to id={last_id}, {total} in all")
+    finally:
+        await backfill.shutdown()
+
+
+async def _verify() -> bool:
+    backfill = UrlBackfill(str(SETTINGS.postgres.dsn))
+    try:
+        nrows, ncopied = await backfill.count_rows()
+    finally:
+        await backfill.shutdown()
+    click.echo(f"urls: {nrows} row(s), urls_partitioned: {ncopied} row(s)")
+    return nrows == ncopied
+
+
+async def _swap(lock_timeout: float) -> None:
+    backfill = UrlBackfill(str(SETTINGS.postgres.dsn))
+    try:
+        await backfill.swap(lock_timeout=lock_timeout)
+    finally:
+        await backfill.shutdown()
+
+
+async def _ensure_archive_partitions(ahead: int) -> int:
+    backfill = UrlBackfill(str(SETTINGS.postgres.dsn))
+    try:
+        return await backfill.ensure_archive_partitions(ahead)
+    finally:
+        await backfill.shutdown()
+
+
+@click.group()
+def cli() -> None:
+    pass
+
+
+@cli.command()
+@click.option(
+    "--after-id",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="id to resume the copy after",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=10_000,
+    show_default=True,
+    help="number of the rows per transaction",
+)
+@click.option(
+    "--pause",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    show_default=True,
+    help="seconds to pause between the chunks",
+)
+def run(after_id: int, chunk_size: int, pause: float) -> None:
+    """Copy the existing rows into the partitioned table."""
+
+    asyncio.run(_run(after_id, chunk_size=chunk_size, pause=pause))
+
+
+@cli.command()
+def verify() -> None:
+    """Compare the row counts of the two tables."""
+
+    if not asyncio.run(_verify()):
+        raise click.ClickException("the tables differ, run the copy (again)")
+
+
+@cli.command()
+@click.option(
+    "--lock-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=5.0,
+    show_default=True,
+    help="seconds to wait for the table lock",
+)
+@click.option(
+    "--verify/--no-verify",
+    "verify_first",
+    default=True,
+    show_default=True,
+    help="compare the row counts first",
+)
+def swap(lock_timeout: float, verify_first: bool) -> None:
+    """Swap `urls` for the partitioned table, the application to be restarted."""
+
+    if verify_first and not asyncio.run(_verify()):
+        raise click.ClickException("the tables differ, run the copy (again)")
+    asyncio.run(_swap(lock_timeout))
+    click.echo("swapped, restart the application")
+
+
+@cli.command("archive-partitions")
+@click.option(
+    "--ahead",
+    type=click.IntRange(min=0),
+    default=4,
+    show_default=True,
+    help="number of the partitions beyond the last id",
+)
+def archive_partitions(ahead: int) -> None:
+    """Create the range partitions of the gone URLs ahead of the ids."""
+
+    created = asyncio.run(_ensure_archive_partitions(ahead))
+    click.echo(f"created {created} partition(s)")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,381 @@
+"""In-memory URL repository module."""
+
+from bisect import bisect_right, insort
+from collections import deque
+from datetime import date, datetime
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy.exc import MultipleResultsFound, NoResultFound
+
+from sprint4.core.exceptions import UrlRepositoryError
+from sprint4.core.hyperloglog import merge_serialized
+from sprint4.db.pool import PoolStatistics
+from sprint4.db.replicas import ReplicaStatistics
+from sprint4.models.clicks import (
+    ClickBucket,
+    ClickBucketDelta,
+    ClickDelta,
+    ClickEvent,
+    ClickRow,
+    RollupGranularity,
+)
+from sprint4.models.urls import (
+    HttpUrlFilter,
+    HttpUrlModel,
+    HttpUrlRow,
+    UrlRecordType,
+    get_url_hash,
+)
+
+
+def _matches(row: HttpUrlRow, url_filter: HttpUrlFilter) -> bool:
+    """Tell if the row is selected by the filter, as by the SQL conditions."""
+
+    if url_filter.id is not None and row.id != url_filter.id:
+        return False
+    if url_filter.url and str(row.url) != str(url_filter.url):
+        return False
+    if url_filter.short_url and str(row.short_url) != str(url_filter.short_url):
+        return False
+    if url_filter.is_gone is not None and row.is_gone != url_filter.is_gone:
+        return False
+    if url_filter.visibility and row.visibility != url_filter.visibility:
+        return False
+    if url_filter.client_info and row.client_info != url_filter.client_info:
+        return False
+    if url_filter.clicked_at and row.clicked_at != url_filter.clicked_at:
+        return False
+    if url_filter.nclicks is not None and row.nclicks != url_filter.nclicks:
+        return False
+    return True
+
+
+class InMemoryUrlRepository:
+    """The URL repository kept in the process memory, indexed as the table is.
+
+    The rows are looked up by the id, short URL and URL hash indexes, and
+    scanned in the id order otherwise. Nothing is persisted nor shared
+    between the processes, so it suits a single worker (an edge redirector
+    fed by the bulk ingestion), the tests and the benchmarks. The click
+    log keeps the latest `max_clicks_per_url` clicks of each URL.
+    """
+
+    def __init__(self, max_clicks_per_url: int = 1000) -> None:
+        self._rows: dict[int, HttpUrlRow] = {}
+        self._ids: list[int] = []  # sorted
+        self._ids_by_short_url: dict[str, int] = {}
+        self._ids_by_hash: dict[bytes, int] = {}
+        self._last_id = 0
+        self._clicks: dict[int, deque[ClickRow]] = {}
+        self._last_click_id = 0
+        self._max_clicks_per_url = max_clicks_per_url
+        self._sketches: dict[int, bytes] = {}
+        # granularity -> url id -> bucket start -> clicks
+        self._rollups: dict[RollupGranularity, dict[int, dict[datetime, int]]] = {
+            granularity: {} for granularity in RollupGranularity
+        }
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(nrows={len(self._rows)})"
+
+    def pool_statistics(self) -> None | PoolStatistics:
+        return None
+
+    def pool_congestion(self) -> float:
+        return 0.0
+
+    def replica_statistics(self) -> None | list[ReplicaStatistics]:
+        return None
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def warm_up(self, connections: None | int = None) -> None:
+        pass
+
+    async def ping(self) -> None:
+        pass
+
+    def _insert(self, model: HttpUrlModel) -> None | HttpUrlRow:
+        url_hash = model.url_hash
+        short_url = str(model.short_url)
+        if (
+            url_hash in self._ids_by_hash
+            or short_url in self._ids_by_short_url
+            or model.id in self._rows
+        ):
+            return None
+        url_id = model.id if model.id is not None else self._last_id + 1
+        self._last_id = max(self._last_id, url_id)
+        row = HttpUrlRow.model_construct(
+            id=url_id,
+            url=model.url,
+            short_url=model.short_url,
+            visibility=model.visibility,
+            is_gone=False,
+            client_info=None,
+            clicked_at=None,
+            nclicks=0,
+        )
+        self._rows[url_id] = row
+        insort(self._ids, url_id)
+        self._ids_by_short_url[short_url] = url_id
+        self._ids_by_hash[url_hash] = url_id
+        return row
+
+    def _remove(self, row: HttpUrlRow) -> None:
+        del self._rows[row.id]
+        self._ids.pop(bisect_right(self._ids, row.id) - 1)
+        self._ids_by_short_url.pop(str(row.short_url), None)
+        self._ids_by_hash.pop(get_url_hash(str(row.url)), None)
+        self._clicks.pop(row.id, None)
+        self._sketches.pop(row.id, None)
+
+    async def add_urls(self, url_models: list[HttpUrlModel]) -> list[HttpUrlRow]:
+        rows = [self._insert(model) for model in url_models]
+        return [row for row in rows if row is not None]
+
+    async def get_urls_by_hashes(
+        self, url_hashes: list[bytes]
+    ) -> dict[bytes, HttpUrlRow]:
+        ids = self._ids_by_hash
+        return {
+            url_hash: self._rows[ids[url_hash]]
+            for url_hash in url_hashes
+            if url_hash in ids
+        }
+
+    async def copy_urls(self, url_models: list[HttpUrlModel]) -> int:
+        return len(await self.add_urls(url_models))
+
+    async def reserve_ids(self, count: int) -> list[int]:
+        first = self._last_id + 1
+        self._last_id += max(count, 0)
+        return list(range(first, self._last_id + 1))
+
+    async def get_existing_short_urls(self, short_urls: list[str]) -> set[str]:
+        return {url for url in short_urls if url in self._ids_by_short_url}
+
+    def _get_candidate_ids(self, url_filter: HttpUrlFilter) -> list[int]:
+        """Return the ids to check in their order, by an index if possible."""
+
+        if url_filter.id is not None:
+            return [url_filter.id] if url_filter.id in self._rows else []
+        if url_filter.short_url:
+            url_id = self._ids_by_short_url.get(str(url_filter.short_url))
+            return [] if url_id is None else [url_id]
+        if url_filter.url:
+            url_id = self._ids_by_hash.get(get_url_hash(str(url_filter.url)))
+            return [] if url_id is None else [url_id]
+        return self._ids
+
+    def _iter_rows(
+        self, url_filter: HttpUrlFilter, after_id: None | int = None
+    ) -> Iterator[HttpUrlRow]:
+        ids = self._get_candidate_ids(url_filter)
+        start = 0 if after_id is None else bisect_right(ids, after_id)
+        # a copy of the ids, for the rows may change in between the batches
+        for url_id in ids[start:]:
+            row = self._rows.get(url_id)
+            if row is not None and _matches(row, url_filter):
+                yield row
+
+    def _select(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+    ) -> list[HttpUrlRow]:
+        rows = []
+        for row in self._iter_rows(url_filter, after_id=after_id):
+            if limit is not None and len(rows) >= limit:
+                break
+            rows.append(row)
+        return rows
+
+    async def get_urls(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+    ) -> list[HttpUrlRow]:
+        return self._select(url_filter, after_id=after_id, limit=limit)
+
+    async def stream_urls(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[HttpUrlRow]]:
+        nrows = 0
+        while limit is None or nrows < limit:
+            size = batch_size if limit is None else min(batch_size, limit - nrows)
+            rows = self._select(url_filter, after_id=after_id, limit=size)
+            if not rows:
+                return
+            yield rows
+            nrows += len(rows)
+            after_id = rows[-1].id
+
+    async def get_url_records(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+    ) -> list[UrlRecordType]:
+        rows = self._select(url_filter, after_id=after_id, limit=limit)
+        return [row.model_dump() for row in rows]
+
+    async def stream_url_records(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[UrlRecordType]]:
+        async for rows in self.stream_urls(
+            url_filter, after_id=after_id, limit=limit, batch_size=batch_size
+        ):
+            yield [row.model_dump() for row in rows]
+
+    async def find_url(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
+        for row in self._iter_rows(url_filter):
+            return row
+        msg = f"No result for the filter:\n{url_filter.model_dump()}"
+        raise NoResultFound(msg)
+
+    async def stream_url_keys(
+        self, after_id: None | int = None, batch_size: int = 10_000
+    ) -> AsyncIterator[list[tuple[int, str]]]:
+        async for rows in self.stream_urls(
+            HttpUrlFilter(), after_id=after_id, batch_size=batch_size
+        ):
+            yield [(row.id, str(row.short_url)) for row in rows]
+
+    async def estimate_url_count(self) -> int:
+        return len(self._rows)
+
+    def _get_one(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
+        rows = self._select(url_filter, limit=2)
+        if not rows:
+            msg = f"No result for the filter:\n{url_filter.model_dump()}"
+            raise NoResultFound(msg)
+        if len(rows) > 1:
+            msg = "Multiple rows were found when one was required"
+            raise MultipleResultsFound(msg)
+        return rows[0]
+
+    async def delete_url(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
+        row = self._get_one(url_filter)
+        self._remove(row)
+        return row
+
+    async def mark_url_gone(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
+        row = self._get_one(url_filter).model_copy(update={"is_gone": True})
+        self._rows[row.id] = row
+        return row
+
+    async def click_url(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
+        if not url_filter.client_info:
+            msg = "the client information is not set"
+            raise UrlRepositoryError(msg)
+        lookup = url_filter.model_copy(update={"client_info": None, "clicked_at": None})
+        row = await self.find_url(lookup)
+        if row.is_gone:
+            return row
+        row = row.model_copy(
+            update={
+                "nclicks": row.nclicks + 1,
+                "client_info": url_filter.client_info,
+                "clicked_at": datetime.now(),
+            }
+        )
+        self._rows[row.id] = row
+        return row
+
+    async def apply_click_deltas(self, deltas: list[ClickDelta]) -> None:
+        for delta in deltas:
+            row = self._rows.get(delta.url_id)
+            if row is None:
+                continue
+            update = {"nclicks": row.nclicks + delta.nclicks}
+            # a delta flushed late leaves the latest click as it is
+            if row.clicked_at is None or row.clicked_at <= delta.clicked_at:
+                update["clicked_at"] = delta.clicked_at
+                update["client_info"] = delta.client_info
+            self._rows[row.id] = row.model_copy(update=update)
+
+    async def add_clicks(self, events: list[ClickEvent]) -> None:
+        for event in events:
+            self._last_click_id += 1
+            clicks = self._clicks.get(event.url_id)
+            if clicks is None:
+                clicks = deque(maxlen=self._max_clicks_per_url)
+                self._clicks[event.url_id] = clicks
+            clicks.append(
+                ClickRow.model_construct(
+                    id=self._last_click_id,
+                    clicked_at=event.clicked_at,
+                    ip=event.ip,
+                    user_agent=event.user_agent,
+                )
+            )
+
+    async def get_clicks(
+        self, url_id: int, limit: int = 10, offset: int = 0
+    ) -> list[ClickRow]:
+        clicks = sorted(
+            self._clicks.get(url_id, ()),
+            key=lambda click: (click.clicked_at, click.id),
+            reverse=True,
+        )
+        return clicks[offset:][:limit]
+
+    async def add_click_rollups(self, deltas: list[ClickBucketDelta]) -> None:
+        for granularity, rollups in self._rollups.items():
+            for delta in deltas:
+                buckets = rollups.setdefault(delta.url_id, {})
+                bucket = granularity.truncate(delta.bucket)
+                buckets[bucket] = buckets.get(bucket, 0) + delta.nclicks
+
+    async def get_click_timeseries(
+        self,
+        url_id: int,
+        granularity: RollupGranularity,
+        since: datetime,
+        until: datetime,
+    ) -> list[ClickBucket]:
+        buckets = self._rollups[granularity].get(url_id, {})
+        return [
+            ClickBucket(bucket=bucket, nclicks=buckets[bucket])
+            for bucket in sorted(buckets)
+            if since <= bucket < until
+        ]
+
+    async def prune_click_rollups(
+        self, granularity: RollupGranularity, before: datetime
+    ) -> int:
+        npruned = 0
+        rollups = self._rollups[granularity]
+        for url_id, buckets in list(rollups.items()):
+            expired = [bucket for bucket in buckets if bucket < before]
+            for bucket in expired:
+                del buckets[bucket]
+            npruned += len(expired)
+            if not buckets:
+                del rollups[url_id]
+        return npruned
+
+    async def merge_visitor_sketches(self, sketches: dict[int, bytes]) -> None:
+        for url_id, sketch in sketches.items():
+            if url_id in self._rows:
+                stored = self._sketches.get(url_id)
+                self._sketches[url_id] = merge_serialized(stored, sketch)
+
+    async def get_visitor_sketches(self, url_ids: list[int]) -> dict[int, bytes]:
+        sketches = self._sketches
+        return {url_id: sketches[url_id] for url_id in url_ids if url_id in sketches}
+
+    async def ensure_click_partitions(self, since: date, months: int) -> list[str]:
+        return []
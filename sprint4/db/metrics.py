@@ -0,0 +1,83 @@
+"""Database statement timing module."""
+
+import inspect
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio.engine import AsyncEngine
+
+from sprint4.core.metrics import DB_STATEMENT_DURATION
+
+
+_STARTED_AT_ATTRIBUTE = "_s4_started_at"
+
+DB_OPERATION: ContextVar[str] = ContextVar("db_operation", default="other")
+
+
+def _observe_async_function(func, name: str):
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = DB_OPERATION.set(name)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            DB_OPERATION.reset(token)
+
+    return wrapper
+
+
+def _observe_async_generator(func, name: str):
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        agen = func(*args, **kwargs)
+        try:
+            while True:
+                # the caller runs between the steps, the label is set per step
+                token = DB_OPERATION.set(name)
+                try:
+                    item = await agen.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    DB_OPERATION.reset(token)
+                yield item
+        finally:
+            await agen.aclose()
+
+    return wrapper
+
+
+def observe_operations(cls: type) -> type:
+    """Label the statements of the public async methods by the method names."""
+
+    for name, func in list(vars(cls).items()):
+        if name.startswith("_"):
+            continue
+        if inspect.isasyncgenfunction(func):
+            setattr(cls, name, _observe_async_generator(func, name))
+        elif inspect.iscoroutinefunction(func):
+            setattr(cls, name, _observe_async_function(func, name))
+    return cls
+
+
+def instrument_statements(engine: AsyncEngine) -> None:
+    """Time the cursor executions of the engine by the current operation."""
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        setattr(context, _STARTED_AT_ATTRIBUTE, time.perf_counter())
+
+    def after_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        started_at = getattr(context, _STARTED_AT_ATTRIBUTE, None)
+        if started_at is not None:
+            DB_STATEMENT_DURATION.labels(DB_OPERATION.get()).observe(
+                time.perf_counter() - started_at
+            )
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
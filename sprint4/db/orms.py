@@ -5,18 +5,33 @@ from typing import Any
 
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.types import Text
+from sqlalchemy.schema import FetchedValue
+from sqlalchemy.types import BigInteger, Integer, LargeBinary, Text
 
+from sprint4.models.clicks import RollupGranularity
 from sprint4.models.urls import UrlVisibilityTypes
 
 
 Base = declarative_base()
 
 
+# SQLite numbers the rows by an INTEGER PRIMARY KEY only, it is 64-bit anyway
+_IdType = BigInteger().with_variant(Integer, "sqlite")
+
+
 class Url(Base):
+    """The shortened URLs.
+
+    Once moved to the partitioned layout in PostgreSQL (`sprint4.db.backfill`),
+    the table is partitioned by `is_gone`: the live URLs by the id hash,
+    the gone ones by the id ranges. Its primary key is (id, is_gone)
+    and the short URLs and the hashes are kept unique by the `ShortUrlKey`
+    and `UrlHashKey` directories.
+    """
+
     __tablename__ = "urls"
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(_IdType, primary_key=True)
     url: Mapped[str] = mapped_column(Text, nullable=False)
     short_url: Mapped[str] = mapped_column(unique=True, nullable=False)
     is_gone: Mapped[bool] = mapped_column(default=False, nullable=False)
@@ -26,6 +41,10 @@ class Url(Base):
     client_info: Mapped[None | str] = mapped_column(Text)
     clicked_at: Mapped[None | datetime]
     nclicks: Mapped[int] = mapped_column(default=0)
+    # NULL for the duplicates inserted before the deduplication
+    url_hash: Mapped[None | bytes] = mapped_column(LargeBinary, unique=True)
+    # the HyperLogLog sketch, up to a few KB, loaded only if asked for
+    visitors_hll: Mapped[None | bytes] = mapped_column(LargeBinary, deferred=True)
 
     def __repr__(self) -> str:
         cls_name = self.__class__.__name__
@@ -36,3 +55,64 @@ class Url(Base):
         return {
             column.name: getattr(self, column.name) for column in self.__table__.columns
         }
+
+
+class ShortUrlKey(Base):
+    """The short URLs directory of the partitioned `urls`, kept by triggers."""
+
+    __tablename__ = "url_short_urls"
+
+    short_url: Mapped[str] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class UrlHashKey(Base):
+    """The URL hashes directory of the partitioned `urls`, kept by triggers."""
+
+    __tablename__ = "url_hashes"
+
+    url_hash: Mapped[bytes] = mapped_column(LargeBinary, primary_key=True)
+    id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class Click(Base):
+    """The append-only click log, range-partitioned by the click time."""
+
+    __tablename__ = "clicks"
+    __table_args__ = {"postgresql_partition_by": "RANGE (clicked_at)"}
+
+    # BIGSERIAL in PostgreSQL, reserved by the SQLite backend
+    id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, server_default=FetchedValue()
+    )
+    clicked_at: Mapped[datetime] = mapped_column(primary_key=True)
+    url_id: Mapped[int] = mapped_column(_IdType, nullable=False)
+    ip: Mapped[None | str] = mapped_column(Text)
+    user_agent: Mapped[None | str] = mapped_column(Text)
+
+
+class _ClickRollup:
+    """The clicks per URL and time bucket, added up by the aggregator."""
+
+    url_id: Mapped[int] = mapped_column(_IdType, primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(primary_key=True, index=True)
+    nclicks: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class ClickRollupMinute(_ClickRollup, Base):
+    __tablename__ = "click_rollups_minute"
+
+
+class ClickRollupHour(_ClickRollup, Base):
+    __tablename__ = "click_rollups_hour"
+
+
+class ClickRollupDay(_ClickRollup, Base):
+    __tablename__ = "click_rollups_day"
+
+
+CLICK_ROLLUPS: dict[RollupGranularity, type[_ClickRollup]] = {
+    RollupGranularity.minute: ClickRollupMinute,
+    RollupGranularity.hour: ClickRollupHour,
+    RollupGranularity.day: ClickRollupDay,
+}
@@ -0,0 +1,122 @@
+"""Connection pool instrumentation module."""
+
+import time
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio.engine import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+
+# the smoothing factor of the moving average wait time
+_WAIT_TIME_ALPHA = 0.1
+
+
+class PoolStatistics(BaseModel):
+    size: int
+    max_overflow: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    waiting: int
+    checkouts: int
+    timeouts: int
+    wait_time_last: float
+    wait_time_avg: float
+    wait_time_max: float
+    wait_time_total: float
+    pre_ping_failures: int
+    invalidations: int
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """The default asyncpg pool measuring how long the checkouts wait.
+
+    SQLAlchemy has no event fired before a checkout starts waiting,
+    so the wait time is measured around the pool's own `_do_get`.
+    The pool is recreated on `Engine.dispose()`, resetting the metrics.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_last = 0.0
+        self.wait_time_avg = 0.0
+        self.wait_time_max = 0.0
+        self.wait_time_total = 0.0
+        self.pre_ping_failures = 0
+        self.invalidations = 0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+            self._observe_wait(time.perf_counter() - started_at)
+
+    def _observe_wait(self, wait_time: float) -> None:
+        self.wait_time_last = wait_time
+        self.wait_time_total += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+        self.wait_time_avg += _WAIT_TIME_ALPHA * (wait_time - self.wait_time_avg)
+
+    def congestion(self) -> float:
+        """Return the average wait while any checkout is waiting, zero otherwise.
+
+        The average alone would stay high once the traffic has been shed.
+        """
+
+        return self.wait_time_avg if self.waiting else 0.0
+
+    def statistics(self) -> PoolStatistics:
+        return PoolStatistics(
+            size=self.size(),
+            max_overflow=self._max_overflow,
+            checked_in=self.checkedin(),
+            checked_out=self.checkedout(),
+            # negative until the pool has opened `size` connections
+            overflow=max(self.overflow(), 0),
+            waiting=self.waiting,
+            checkouts=self.checkouts,
+            timeouts=self.timeouts,
+            wait_time_last=self.wait_time_last,
+            wait_time_avg=self.wait_time_avg,
+            wait_time_max=self.wait_time_max,
+            wait_time_total=self.wait_time_total,
+            pre_ping_failures=self.pre_ping_failures,
+            invalidations=self.invalidations,
+        )
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Count the checkouts, invalidations and pre-ping failures.
+
+    The listeners are registered on the engine once, so that they are
+    carried over to the pool recreated by `Engine.dispose()`.
+    """
+
+    sync_engine = engine.sync_engine
+    if not isinstance(sync_engine.pool, InstrumentedAsyncQueuePool):
+        return
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        sync_engine.pool.checkouts += 1
+
+    def on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        sync_engine.pool.invalidations += 1
+
+    def on_handle_error(context) -> None:
+        if context.is_pre_ping:
+            sync_engine.pool.pre_ping_failures += 1
+
+    event.listen(sync_engine, "checkout", on_checkout)
+    event.listen(sync_engine, "invalidate", on_invalidate)
+    event.listen(sync_engine, "handle_error", on_handle_error)
@@ -0,0 +1,157 @@
+"""Repository protocols module."""
+
+from datetime import date, datetime
+from typing import AsyncIterator, Protocol
+
+from sprint4.db.pool import PoolStatistics
+from sprint4.db.replicas import ReplicaStatistics
+from sprint4.models.clicks import (
+    ClickBucket,
+    ClickBucketDelta,
+    ClickDelta,
+    ClickEvent,
+    ClickRow,
+    RollupGranularity,
+)
+from sprint4.models.urls import (
+    HttpUrlFilter,
+    HttpUrlModel,
+    HttpUrlRow,
+    UrlRecordType,
+)
+
+
+class UrlRepositoryProtocol(Protocol):
+    """The URL storage the service relies on, whatever the backend is.
+
+    The lookups raise `sqlalchemy.exc.NoResultFound` for the missing URLs
+    and the conflicting writes raise `UrlRepositoryError`, as the HTTP
+    layer maps them to the responses. See `UrlRepository` for the
+    reference semantics of each method.
+    """
+
+    def pool_statistics(self) -> None | PoolStatistics:
+        ...
+
+    def pool_congestion(self) -> float:
+        ...
+
+    def replica_statistics(self) -> None | list[ReplicaStatistics]:
+        ...
+
+    async def shutdown(self) -> None:
+        ...
+
+    async def warm_up(self, connections: None | int = None) -> None:
+        ...
+
+    async def ping(self) -> None:
+        ...
+
+    async def add_urls(self, url_models: list[HttpUrlModel]) -> list[HttpUrlRow]:
+        ...
+
+    async def get_urls_by_hashes(
+        self, url_hashes: list[bytes]
+    ) -> dict[bytes, HttpUrlRow]:
+        ...
+
+    async def copy_urls(self, url_models: list[HttpUrlModel]) -> int:
+        ...
+
+    async def reserve_ids(self, count: int) -> list[int]:
+        ...
+
+    async def get_existing_short_urls(self, short_urls: list[str]) -> set[str]:
+        ...
+
+    async def get_urls(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+    ) -> list[HttpUrlRow]:
+        ...
+
+    def stream_urls(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[HttpUrlRow]]:
+        ...
+
+    async def get_url_records(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+    ) -> list[UrlRecordType]:
+        ...
+
+    def stream_url_records(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[UrlRecordType]]:
+        ...
+
+    async def find_url(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
+        ...
+
+    def stream_url_keys(
+        self, after_id: None | int = None, batch_size: int = 10_000
+    ) -> AsyncIterator[list[tuple[int, str]]]:
+        ...
+
+    async def estimate_url_count(self) -> int:
+        ...
+
+    async def delete_url(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
+        ...
+
+    async def mark_url_gone(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
+        ...
+
+    async def click_url(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
+        ...
+
+    async def apply_click_deltas(self, deltas: list[ClickDelta]) -> None:
+        ...
+
+    async def add_clicks(self, events: list[ClickEvent]) -> None:
+        ...
+
+    async def get_clicks(
+        self, url_id: int, limit: int = 10, offset: int = 0
+    ) -> list[ClickRow]:
+        ...
+
+    async def add_click_rollups(self, deltas: list[ClickBucketDelta]) -> None:
+        ...
+
+    async def get_click_timeseries(
+        self,
+        url_id: int,
+        granularity: RollupGranularity,
+        since: datetime,
+        until: datetime,
+    ) -> list[ClickBucket]:
+        ...
+
+    async def prune_click_rollups(
+        self, granularity: RollupGranularity, before: datetime
+    ) -> int:
+        ...
+
+    async def merge_visitor_sketches(self, sketches: dict[int, bytes]) -> None:
+        ...
+
+    async def get_visitor_sketches(self, url_ids: list[int]) -> dict[int, bytes]:
+        ...
+
+    async def ensure_click_partitions(self, since: date, months: int) -> list[str]:
+        ...
@@ -0,0 +1,173 @@
+"""Read replicas module."""
+
+import asyncio
+import logging
+from datetime import datetime
+
+from pydantic import BaseModel
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio.engine import AsyncEngine
+from sqlalchemy.ext.asyncio.session import async_sessionmaker
+from sqlalchemy.sql import text
+
+from sprint4.core.ptypes import KeywordsType
+from sprint4.db.utils import get_async_engine, get_async_session
+
+
+LOGGER = logging.getLogger(__name__)
+
+# the replay lag, zero once the replica has replayed all the WAL received,
+# since the last replayed transaction gets older while the primary is idle
+_LAG_QUERY = text(
+    "SELECT pg_is_in_recovery(), CASE "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaStatistics(BaseModel):
+    name: str
+    healthy: bool
+    lag: None | float  # seconds
+    checked_at: None | datetime
+    reads: int
+    failures: int
+
+
+class Replica:
+    """A read replica engine and its health as of the last check."""
+
+    def __init__(
+        self,
+        dsn: str,
+        engine_settings: None | KeywordsType = None,
+        session_settings: None | KeywordsType = None,
+    ) -> None:
+        # no credentials in the logs and the statistics
+        url = make_url(dsn)
+        self.name = f"{url.host}:{url.port or 5432}/{url.database}"
+        self.engine: AsyncEngine = get_async_engine(url=dsn, settings=engine_settings)
+        self.session: async_sessionmaker = get_async_session(
+            self.engine, settings=session_settings
+        )
+        self.healthy = False  # until checked
+        self.lag: None | float = None
+        self.checked_at: None | datetime = None
+        self.reads = 0
+        self.failures = 0
+
+    async def _query_lag(self) -> tuple[bool, None | float]:
+        async with self.engine.connect() as conn:
+            return tuple((await conn.execute(_LAG_QUERY)).one())
+
+    async def check(self, timeout: float) -> None:
+        """Update the health and the lag, a primary is unhealthy as a replica."""
+
+        try:
+            in_recovery, lag = await asyncio.wait_for(self._query_lag(), timeout)
+        except Exception as e:
+            if self.healthy:
+                LOGGER.warning("the replica %s failed the check: %r", self.name, e)
+            self.healthy = False
+            self.lag = None
+        else:
+            if not in_recovery:
+                LOGGER.warning("the replica %s is not in recovery", self.name)
+            self.healthy = bool(in_recovery)
+            self.lag = float(lag or 0)
+        self.checked_at = datetime.now()
+
+    def statistics(self) -> ReplicaStatistics:
+        return ReplicaStatistics(
+            name=self.name,
+            healthy=self.healthy,
+            lag=self.lag,
+            checked_at=self.checked_at,
+            reads=self.reads,
+            failures=self.failures,
+        )
+
+
+class ReplicaSet:
+    """The read replicas, load-balanced round robin while they keep up.
+
+    The replicas are checked every `check_interval` seconds: those failed
+    the check or lagging behind the primary more than `max_lag` seconds are
+    skipped until the next check shows them fine. A replica failing a read
+    is skipped at once. Without any replica to read from, `choose` returns
+    None, for the reads to go to the primary.
+    """
+
+    def __init__(
+        self,
+        dsns: list[str],
+        engine_settings: None | KeywordsType = None,
+        session_settings: None | KeywordsType = None,
+        max_lag: float = 5.0,
+        check_interval: float = 5.0,
+        check_timeout: float = 2.0,
+    ) -> None:
+        self._replicas = [
+            Replica(
+                dsn, engine_settings=engine_settings, session_settings=session_settings
+            )
+            for dsn in dsns
+        ]
+        self._max_lag = max_lag
+        self._check_interval = check_interval
+        self._check_timeout = check_timeout
+        self._next = 0
+        self._task: None | asyncio.Task = None
+
+    def __len__(self) -> int:
+        return len(self._replicas)
+
+    def choose(self) -> None | Replica:
+        """Return the next replica fit to read from, None if there is none."""
+
+        replicas = self._replicas
+        for offset in range(len(replicas)):
+            replica = replicas[(self._next + offset) % len(replicas)]
+            if replica.healthy and replica.lag <= self._max_lag:
+                self._next = (self._next + offset + 1) % len(replicas)
+                replica.reads += 1
+                return replica
+        return None
+
+    def mark_failed(self, replica: Replica, error: BaseException) -> None:
+        LOGGER.warning("the replica %s failed a read: %r", replica.name, error)
+        replica.healthy = False
+        replica.failures += 1
+
+    async def check(self) -> None:
+        await asyncio.gather(
+            *(replica.check(self._check_timeout) for replica in self._replicas)
+        )
+
+    async def start(self) -> None:
+        if self._task is None:
+            # the replicas are unhealthy until checked, the first check is awaited
+            await self.check()
+            self._task = asyncio.create_task(self._run(), name="replica-checks")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def shutdown(self) -> None:
+        await self.stop()
+        await asyncio.gather(*(replica.engine.dispose() for replica in self._replicas))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._check_interval)
+            await self.check()
+
+    def statistics(self) -> list[ReplicaStatistics]:
+        return [replica.statistics() for replica in self._replicas]
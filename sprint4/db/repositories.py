@@ -1,30 +1,112 @@
 """Database repositories module."""
 
-from datetime import datetime
+import asyncio
+from datetime import date, datetime
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
 
-from sqlalchemy.exc import IntegrityError, NoResultFound
-from sqlalchemy.sql import delete, insert, select, text, update, Delete, Select, Update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError, IntegrityError, NoResultFound
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio.session import async_sessionmaker
+from sqlalchemy.sql import (
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    update,
+    Delete,
+    Select,
+    Update,
+    column,
+    values,
+)
+from sqlalchemy.types import BigInteger, DateTime, Integer, Text
 
 from sprint4.core.exceptions import UrlRepositoryError
+from sprint4.core.hyperloglog import merge_serialized
 from sprint4.core.ptypes import KeywordsType, SettingsType
 from sprint4.core.settings import SETTINGS
-from sprint4.db.orms import Url
+from sprint4.db.metrics import observe_operations
+from sprint4.db.orms import CLICK_ROLLUPS, Click, ShortUrlKey, Url
+from sprint4.db.pool import InstrumentedAsyncQueuePool, PoolStatistics
+from sprint4.db.replicas import ReplicaSet, ReplicaStatistics
 from sprint4.db.utils import get_async_engine, get_async_session
-from sprint4.models.urls import HttpUrlModel, HttpUrlRow, HttpUrlFilter
+from sprint4.models.clicks import (
+    ClickBucket,
+    ClickBucketDelta,
+    ClickDelta,
+    ClickEvent,
+    ClickRow,
+    RollupGranularity,
+)
+from sprint4.models.urls import (
+    URL_RECORD_FIELDS,
+    HttpUrlModel,
+    HttpUrlRow,
+    HttpUrlFilter,
+    UrlRecordType,
+)
 
 
 _FilterableQueryType = Delete | Select | Update
 
+_ResultType = TypeVar("_ResultType")
+
+# the SQLSTATE of the replica reads canceled by the recovery conflicts
+_SERIALIZATION_FAILURE = "40001"
+
+# the columns of the lean reads, neither the hash nor the sketch
+_URL_RECORD_COLUMNS = [getattr(Url, name) for name in URL_RECORD_FIELDS]
+
+
+def _get_paginated_query(
+    query: Select,
+    url_filter: HttpUrlFilter,
+    after_id: None | int = None,
+    limit: None | int = None,
+    prune: bool = False,
+) -> Select:
+    query = _get_conditioned_query_from_url_filter(
+        query, url_filter=url_filter, prune=prune
+    )
+    if after_id is not None:
+        query = query.where(Url.id > after_id)
+    query = query.order_by(Url.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _add_months(month: date, months: int) -> date:
+    total = month.year * 12 + month.month - 1 + months
+    return date(total // 12, total % 12 + 1, 1)
+
 
 def _get_conditioned_query_from_url_filter(
-    query: _FilterableQueryType, url_filter: HttpUrlFilter
+    query: _FilterableQueryType, url_filter: HttpUrlFilter, prune: bool = False
 ):
+    """Add the WHERE clause of the filter.
+
+    With `prune`, for the partitioned `urls`, the short URL is resolved
+    to its id by the key directory, so that the hash partitions are pruned
+    at the execution time, as they are at the planning one by the id.
+    The full URL is not resolved so: its legacy duplicates have no hash.
+    """
+
     if url_filter.id is not None:  # can be 0
         query = query.where(Url.id == url_filter.id)
     if url_filter.url:
         query = query.where(Url.url == str(url_filter.url))
     if url_filter.short_url:
-        query = query.where(Url.short_url == str(url_filter.short_url))
+        short_url = str(url_filter.short_url)
+        query = query.where(Url.short_url == short_url)
+        if prune:
+            url_id = select(ShortUrlKey.id).where(ShortUrlKey.short_url == short_url)
+            query = query.where(Url.id == url_id.scalar_subquery())
     if url_filter.is_gone is not None:  # can be False
         query = query.where(Url.is_gone == url_filter.is_gone)
     if url_filter.visibility:
@@ -38,7 +120,11 @@ def _get_conditioned_query_from_url_filter(
     return query
 
 
+@observe_operations
 class UrlRepository:
+    # the dialect INSERT, for the ON CONFLICT clause
+    _insert = staticmethod(pg_insert)
+
     @classmethod
     def from_dict(cls, state: SettingsType) -> "UrlRepository":
         return cls(**state)
@@ -48,6 +134,9 @@ class UrlRepository:
         dsn: str,
         engine_settings: None | KeywordsType = None,
         session_settings: None | KeywordsType = None,
+        replica_dsns: None | list[str] = None,
+        replica_max_lag: float = 5.0,
+        replica_check_interval: float = 5.0,
     ) -> None:
         self._dsn = dsn
         self._engine_settings = (
@@ -62,6 +151,22 @@ class UrlRepository:
         )
         self._engine = get_async_engine(url=self._dsn, settings=self._engine_settings)
         self._session = get_async_session(self._engine, settings=self._session_settings)
+        self._replica_dsns = list(replica_dsns) if replica_dsns else []
+        self._replica_max_lag = replica_max_lag
+        self._replica_check_interval = replica_check_interval
+        self._replicas = (
+            ReplicaSet(
+                self._replica_dsns,
+                engine_settings=self._engine_settings,
+                session_settings=self._session_settings,
+                max_lag=replica_max_lag,
+                check_interval=replica_check_interval,
+            )
+            if self._replica_dsns
+            else None
+        )
+        # the partitioned layout is detected on the warm-up
+        self._partitioned = False
 
     def __repr__(self) -> str:
         cls_name = self.__class__.__name__
@@ -87,12 +192,99 @@ class UrlRepository:
             "dsn": self.dsn,
             "engine_settings": self.engine_settings,
             "session_settings": self.session_settings,
+            "replica_dsns": self._replica_dsns,
+            "replica_max_lag": self._replica_max_lag,
+            "replica_check_interval": self._replica_check_interval,
         }
 
+    def pool_statistics(self) -> None | PoolStatistics:
+        pool = self._engine.pool
+        if isinstance(pool, InstrumentedAsyncQueuePool):
+            return pool.statistics()
+        return None
+
+    def pool_congestion(self) -> float:
+        pool = self._engine.pool
+        if isinstance(pool, InstrumentedAsyncQueuePool):
+            return pool.congestion()
+        return 0.0
+
+    def replica_statistics(self) -> None | list[ReplicaStatistics]:
+        return self._replicas.statistics() if self._replicas else None
+
     async def shutdown(self):
-        await self._session.close()
+        # the sessions are closed on leaving their contexts, the pool is left
+        if self._replicas:
+            await self._replicas.shutdown()
         await self._engine.dispose()
 
+    async def _read(
+        self, read: Callable[[async_sessionmaker], Awaitable[_ResultType]]
+    ) -> _ResultType:
+        """Run the read on a replica, on the primary without one fit or if it fails.
+
+        Only the reads tolerating the replication lag are routed so:
+        the redirects and the writes stay on the primary, reading their writes.
+        The read canceled by a recovery conflict (the serialization failure)
+        or timed out waiting for a replica connection is retried on the
+        primary too, not marking the replica failed.
+        """
+
+        replica = self._replicas.choose() if self._replicas else None
+        if replica is None:
+            return await read(self._session)
+        try:
+            return await read(replica.session)
+        except (DBAPIError, OSError) as e:
+            if not isinstance(e, DBAPIError) or e.connection_invalidated:
+                self._replicas.mark_failed(replica, e)
+            # the statement errors are not the replica ones, no use retrying
+            # but for the reads canceled by the replay (recovery conflicts)
+            elif getattr(e.orig, "sqlstate", None) != _SERIALIZATION_FAILURE:
+                raise
+        except PoolTimeoutError:
+            pass  # the replica pool is exhausted, the replica is fine
+        return await read(self._session)
+
+    async def warm_up(self, connections: None | int = None) -> None:
+        """Open the pool connections beforehand, sparing the first requests.
+
+        Args:
+            connections: None | int - the number of connections to open,
+                the pool size by default
+        """
+
+        if self._replicas:
+            await self._replicas.start()
+        if connections is None:
+            connections = getattr(self._engine.pool, "size", lambda: 1)()
+        results = await asyncio.gather(
+            *(self._engine.connect().start() for _ in range(connections)),
+            return_exceptions=True,
+        )
+        opened = [conn for conn in results if not isinstance(conn, BaseException)]
+        try:
+            await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in opened))
+        finally:
+            # closing returns the connections to the pool, not closes them
+            await asyncio.gather(*(conn.close() for conn in opened))
+        for error in results:
+            if isinstance(error, BaseException):
+                raise error
+        self._partitioned = await self._is_partitioned()
+
+    async def _is_partitioned(self) -> bool:
+        """Tell whether `urls` has been swapped for the partitioned table."""
+
+        query = text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = 'urls'::regclass)"
+        )
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.execute(query)
+                return result.scalar_one()
+
     async def ping(self) -> None:
         """Check if the database connection is alive.
 
@@ -104,7 +296,10 @@ class UrlRepository:
                 await session.execute(text("SELECT 1"))
 
     async def add_urls(self, url_models: list[HttpUrlModel]) -> list[HttpUrlRow]:
-        """Add the url models into the database.
+        """Add the url models into the database, skipping the conflicting ones.
+
+        The URLs already stored (by their hash) or with the short URLs taken
+        are not inserted and not returned.
 
         Args:
             url_models: list[HttpUrlModel] - the url models to insert
@@ -113,35 +308,355 @@ class UrlRepository:
             list[HttpUrlRow] - the inserted rows
         """
 
+        if not url_models:
+            return []
         try:
             async with self._session() as session:
-                query = insert(Url).returning(Url)
+                query = self._insert(Url).on_conflict_do_nothing().returning(Url)
+                # ids are either reserved for the whole batch or for none of it
+                values = [
+                    {**model.model_dump(exclude_none=True), "url_hash": model.url_hash}
+                    for model in url_models
+                ]
                 async with session.begin():
-                    result = await session.execute(
-                        query, [url_model.model_dump() for url_model in url_models]
-                    )
-                    return [HttpUrlRow.model_validate(row[0]) for row in result]
+                    result = await session.execute(query.values(values))
+                    return [HttpUrlRow.model_validate(row) for row in result.scalars()]
         except IntegrityError as e:
             raise UrlRepositoryError(str(e)) from e
 
-    async def get_urls(self, url_filter: HttpUrlFilter) -> list[HttpUrlRow]:
-        """Get the urls by their filters.
+    async def get_urls_by_hashes(
+        self, url_hashes: list[bytes]
+    ) -> dict[bytes, HttpUrlRow]:
+        """Get the urls by their hashes.
+
+        Args:
+            url_hashes: list[bytes] - the hashes of the normalized URLs
+
+        Returns:
+            dict[bytes, HttpUrlRow] - the found rows by their hashes
+        """
+
+        if not url_hashes:
+            return {}
+        query = select(Url).where(Url.url_hash.in_(url_hashes))
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.execute(query)
+                return {
+                    row.url_hash: HttpUrlRow.model_validate(row)
+                    for row in result.scalars()
+                }
+
+    async def copy_urls(self, url_models: list[HttpUrlModel]) -> int:
+        """Load the url models by COPY through a staging table.
+
+        The rows are copied into a temporary table first, then merged into
+        `urls` skipping the conflicting ones, all in one transaction.
+        The models must have their ids set.
+
+        Args:
+            url_models: list[HttpUrlModel] - the url models to load
+
+        Returns:
+            int - the number of the inserted rows
+        """
+
+        if not url_models:
+            return 0
+        records = [
+            (
+                model.id,
+                str(model.url),
+                str(model.short_url),
+                model.visibility.value,
+                model.url_hash,
+            )
+            for model in url_models
+        ]
+        async with self._engine.connect() as conn:
+            raw_conn = await conn.get_raw_connection()
+            driver_conn = raw_conn.driver_connection  # asyncpg.Connection
+            async with driver_conn.transaction():
+                await driver_conn.execute(
+                    "CREATE TEMPORARY TABLE urls_staging "
+                    "(id bigint, url text, short_url text, visibility text, "
+                    "url_hash bytea) ON COMMIT DROP"
+                )
+                await driver_conn.copy_records_to_table(
+                    "urls_staging",
+                    records=records,
+                    columns=["id", "url", "short_url", "visibility", "url_hash"],
+                )
+                # DISTINCT ON skips the duplicates within the chunk itself
+                status = await driver_conn.execute(
+                    "INSERT INTO urls (id, url, short_url, visibility, url_hash) "
+                    "SELECT DISTINCT ON (url_hash) "
+                    "id, url, short_url, visibility::urlvisibilitytypes, url_hash "
+                    "FROM urls_staging ORDER BY url_hash, id "
+                    "ON CONFLICT DO NOTHING"
+                )
+        # the command status is like "INSERT 0 <rows>"
+        return int(status.rsplit(" ", 1)[-1])
+
+    async def reserve_ids(self, count: int) -> list[int]:
+        """Reserve the ids for the rows to be inserted.
+
+        The ids are taken from the `urls.id` sequence in one round trip,
+        so the short codes can be derived from them before the insert.
+
+        Args:
+            count: int - the number of ids to reserve
+
+        Returns:
+            list[int] - the reserved ids
+        """
+
+        if count < 1:
+            return []
+        query = text(
+            "SELECT nextval(pg_get_serial_sequence('urls', 'id')) "
+            "FROM generate_series(1, :count)"
+        )
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.execute(query, {"count": count})
+                return [row[0] for row in result]
+
+    async def get_existing_short_urls(self, short_urls: list[str]) -> set[str]:
+        """Return those of the short URLs which are already in the database.
+
+        Args:
+            short_urls: list[str] - the short URLs to check
+
+        Returns:
+            set[str] - the short URLs taken
+        """
+
+        if not short_urls:
+            return set()
+        if self._partitioned:
+            # one index instead of one per partition
+            query = select(ShortUrlKey.short_url).where(
+                ShortUrlKey.short_url.in_(short_urls)
+            )
+        else:
+            query = select(Url.short_url).where(Url.short_url.in_(short_urls))
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.execute(query)
+                return set(result.scalars())
+
+    async def get_urls(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+    ) -> list[HttpUrlRow]:
+        """Get the urls by their filters, a page at a time.
+
+        The rows are ordered by id, the next page starts after the last id.
+        Read from a replica if any.
 
         Args:
             url_filter: HttpUrlFilter - The fields for the WHERE clause.
+            after_id: None | int - the id to start after
+            limit: None | int - the page size, no limit if None
 
         Returns:
             list[HttpUrlRow] - the selected rows
         """
 
+        query = _get_paginated_query(
+            select(Url),
+            url_filter=url_filter,
+            after_id=after_id,
+            limit=limit,
+            prune=self._partitioned,
+        )
+
+        async def read(session_factory: async_sessionmaker) -> list[HttpUrlRow]:
+            async with session_factory() as session:
+                async with session.begin():
+                    result = await session.execute(query)
+                return [HttpUrlRow.model_validate(row[0]) for row in result.fetchall()]
+
+        return await self._read(read)
+
+    async def stream_urls(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[HttpUrlRow]]:
+        """Stream the urls by their filters through a server-side cursor.
+
+        Only `batch_size` rows are held in memory at a time. Read from
+        a replica if any, not retried on the primary once started.
+
+        Args:
+            url_filter: HttpUrlFilter - The fields for the WHERE clause.
+            after_id: None | int - the id to start after
+            limit: None | int - the total number of rows, no limit if None
+            batch_size: int - the number of rows per batch
+
+        Yields:
+            list[HttpUrlRow] - the batches of the selected rows
+        """
+
+        query = _get_paginated_query(
+            select(Url),
+            url_filter=url_filter,
+            after_id=after_id,
+            limit=limit,
+            prune=self._partitioned,
+        )
+        query = query.execution_options(yield_per=batch_size)
+        replica = self._replicas.choose() if self._replicas else None
+        session_factory = replica.session if replica else self._session
+        async with session_factory() as session:
+            async with session.begin():
+                result = await session.stream(query)
+                async for partition in result.partitions(batch_size):
+                    yield [HttpUrlRow.model_validate(row[0]) for row in partition]
+
+    async def get_url_records(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+    ) -> list[UrlRecordType]:
+        """Get the urls as the plain records, the lean `get_urls`.
+
+        Only the `HttpUrlRow` columns are selected, as the row mappings,
+        with neither the ORM entities nor the models built: the records
+        are to be serialized as they are.
+
+        Args:
+            url_filter: HttpUrlFilter - The fields for the WHERE clause.
+            after_id: None | int - the id to start after
+            limit: None | int - the page size, no limit if None
+
+        Returns:
+            list[UrlRecordType] - the selected records
+        """
+
+        query = _get_paginated_query(
+            select(*_URL_RECORD_COLUMNS),
+            url_filter=url_filter,
+            after_id=after_id,
+            limit=limit,
+            prune=self._partitioned,
+        )
+
+        async def read(session_factory: async_sessionmaker) -> list[UrlRecordType]:
+            async with session_factory() as session:
+                async with session.begin():
+                    result = await session.execute(query)
+                return [dict(row) for row in result.mappings()]
+
+        return await self._read(read)
+
+    async def stream_url_records(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[UrlRecordType]]:
+        """Stream the urls as the plain records, the lean `stream_urls`.
+
+        Args:
+            url_filter: HttpUrlFilter - The fields for the WHERE clause.
+            after_id: None | int - the id to start after
+            limit: None | int - the total number of rows, no limit if None
+            batch_size: int - the number of rows per batch
+
+        Yields:
+            list[UrlRecordType] - the batches of the selected records
+        """
+
+        query = _get_paginated_query(
+            select(*_URL_RECORD_COLUMNS),
+            url_filter=url_filter,
+            after_id=after_id,
+            limit=limit,
+            prune=self._partitioned,
+        )
+        query = query.execution_options(yield_per=batch_size)
+        replica = self._replicas.choose() if self._replicas else None
+        session_factory = replica.session if replica else self._session
+        async with session_factory() as session:
+            async with session.begin():
+                result = await session.stream(query)
+                async for partition in result.mappings().partitions(batch_size):
+                    yield [dict(row) for row in partition]
+
+    async def find_url(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
+        """Find the first URL by the filter.
+
+        Args:
+            url_filter: HttpUrlFilter - The fields for the WHERE clause.
+
+        Raises:
+            NoResultFound - no URL found by the filter
+
+        Returns:
+            HttpUrlRow - the found row
+        """
+
+        query = _get_conditioned_query_from_url_filter(
+            select(Url), url_filter, prune=self._partitioned
+        )
+        query = query.order_by(Url.id).limit(1)
         async with self._session() as session:
-            query = select(Url)
-            query = _get_conditioned_query_from_url_filter(
-                query=query, url_filter=url_filter
-            )
             async with session.begin():
                 result = await session.execute(query)
-            return [HttpUrlRow.model_validate(row[0]) for row in result.fetchall()]
+                row = result.scalar_one_or_none()
+        if row is None:
+            msg = f"No result for the filter:\n{url_filter.model_dump()}"
+            raise NoResultFound(msg)
+        return HttpUrlRow.model_validate(row)
+
+    async def stream_url_keys(
+        self, after_id: None | int = None, batch_size: int = 10_000
+    ) -> AsyncIterator[list[tuple[int, str]]]:
+        """Stream the ids and short URLs by a server-side cursor.
+
+        Args:
+            after_id: None | int - the id to start after
+            batch_size: int - the number of rows per batch
+
+        Yields:
+            list[tuple[int, str]] - the (id, short_url) pairs in the id order
+        """
+
+        query = select(Url.id, Url.short_url).order_by(Url.id)
+        if after_id is not None:
+            query = query.where(Url.id > after_id)
+        query = query.execution_options(yield_per=batch_size)
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.stream(query)
+                async for partition in result.partitions(batch_size):
+                    yield [(row.id, row.short_url) for row in partition]
+
+    async def estimate_url_count(self) -> int:
+        """Return the planner estimate of the `urls` rows, avoiding COUNT(*).
+
+        The estimates of the partitions are summed, the partitioned parent
+        has none; a plain table is the only leaf of its own tree.
+        """
+
+        query = text(
+            "SELECT coalesce(sum(greatest(c.reltuples, 0)), 0)::bigint "
+            "FROM pg_partition_tree('urls') AS t "
+            "JOIN pg_class AS c ON c.oid = t.relid WHERE t.isleaf"
+        )
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.execute(query)
+                return result.scalar_one()
 
     async def delete_url(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
         """Delete the url by the filter.
@@ -156,12 +671,12 @@ class UrlRepository:
         async with self._session() as session:
             query = delete(Url)
             query = _get_conditioned_query_from_url_filter(
-                query=query, url_filter=url_filter
+                query=query, url_filter=url_filter, prune=self._partitioned
             )
             query = query.returning(Url)
             async with session.begin():
                 response = await session.execute(query)
-                return HttpUrlRow.model_validate(response.one())
+                return HttpUrlRow.model_validate(response.one()[0])
 
     async def mark_url_gone(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
         """Mark the URL gone.
@@ -181,7 +696,9 @@ class UrlRepository:
 
         async with self._session() as session:
             query = update(Url)
-            query = _get_conditioned_query_from_url_filter(query, url_filter=url_filter)
+            query = _get_conditioned_query_from_url_filter(
+                query, url_filter=url_filter, prune=self._partitioned
+            )
             query = query.values(is_gone=True)
             query = query.returning(Url)
             async with session.begin():
@@ -195,14 +712,19 @@ class UrlRepository:
         When a URL is clicked URL, the following attributes are set:
         * client_info -> the information about the client (if found)
         * clicked_at -> the datetime of the click on the URL (if found)
+        * nclicks -> incremented by one
 
         It is like a URL being clicked, redirected to and so forth.
+        The lookup and the increment are a single atomic UPDATE statement,
+        so concurrent clicks are never lost. A URL marked "gone" is returned
+        untouched, for the caller to tell it from the found one.
 
         Args:
             url_filter: HttpUrlFilter - a URL to be visited
 
         Raises:
             UrlRepositoryError - the client information is not set.
+            NoResultFound - no URL found by the filter
 
         Returns:
             HttpUrlRow - the affected record model
@@ -211,27 +733,315 @@ class UrlRepository:
         if not url_filter.client_info:
             msg = "the client information is not set"
             raise UrlRepositoryError(msg)
-        url_filter.clicked_at = datetime.now()
-        async with self._session() as session:
-            ci = url_filter.client_info
-            cat = url_filter.clicked_at
-            # removing filter for query preparation
-            url_filter.client_info = None
-            url_filter.clicked_at = None
-            result = await self.get_urls(url_filter=url_filter)
-            if not result or len(result) != 1:
-                msg = f"No result for the filter:\n{url_filter.model_dump()}"
-                raise NoResultFound(msg)
-            row = result[0]
-            nclicks = row.nclicks + 1
-            # preapre update query
-            query = update(Url)
-            query = _get_conditioned_query_from_url_filter(query, url_filter=url_filter)
-            query = query.values(client_info=ci)
-            query = query.values(clicked_at=cat)
-            query = query.values(nclicks=nclicks)
-            query = query.returning(Url)
+        client_info = url_filter.client_info
+        clicked_at = datetime.now()
+        # removing filter for query preparation
+        lookup = url_filter.model_copy(update={"client_info": None, "clicked_at": None})
+        target_id = _get_conditioned_query_from_url_filter(
+            select(Url.id), url_filter=lookup, prune=self._partitioned
+        )
+        target_id = target_id.order_by(Url.id).limit(1).scalar_subquery()
+        query = (
+            update(Url)
+            .where(Url.id == target_id)
+            .values(
+                nclicks=case((Url.is_gone, Url.nclicks), else_=Url.nclicks + 1),
+                client_info=case((Url.is_gone, Url.client_info), else_=client_info),
+                clicked_at=case((Url.is_gone, Url.clicked_at), else_=clicked_at),
+            )
+            .returning(Url)
+        )
+        async with self._session() as session:
             async with session.begin():
                 result = await session.execute(query)
-                row = result.one()[0]
-                return HttpUrlRow.model_validate(row)
+                row = result.scalar_one_or_none()
+        if row is None:
+            msg = f"No result for the filter:\n{lookup.model_dump()}"
+            raise NoResultFound(msg)
+        return HttpUrlRow.model_validate(row)
+
+    async def apply_click_deltas(self, deltas: list[ClickDelta]) -> None:
+        """Apply the aggregated clicks in one `UPDATE ... FROM (VALUES ...)`.
+
+        The workers flush on their own timers, so an older delta may come
+        late: the last click time never goes back, the client information
+        is that of the latest click.
+
+        Args:
+            deltas: list[ClickDelta] - the clicks per URL to add
+        """
+
+        if not deltas:
+            return
+        deltas_table = values(
+            column("id", BigInteger),
+            column("nclicks", Integer),
+            column("clicked_at", DateTime),
+            column("client_info", Text),
+            name="deltas",
+        ).data(
+            [
+                (delta.url_id, delta.nclicks, delta.clicked_at, delta.client_info)
+                # a stable order keeps the lock order of the workers alike
+                for delta in sorted(deltas, key=lambda delta: delta.url_id)
+            ]
+        )
+        query = (
+            update(Url)
+            .where(Url.id == deltas_table.c.id)
+            .values(
+                nclicks=Url.nclicks + deltas_table.c.nclicks,
+                # GREATEST ignores NULL, the first click sets the time
+                clicked_at=func.greatest(Url.clicked_at, deltas_table.c.clicked_at),
+                client_info=case(
+                    (
+                        or_(
+                            Url.clicked_at.is_(None),
+                            Url.clicked_at <= deltas_table.c.clicked_at,
+                        ),
+                        deltas_table.c.client_info,
+                    ),
+                    else_=Url.client_info,
+                ),
+            )
+        )
+        async with self._session() as session:
+            async with session.begin():
+                await session.execute(query)
+
+    async def add_clicks(self, events: list[ClickEvent]) -> None:
+        """Append the click events to the log in one multi-row INSERT.
+
+        Args:
+            events: list[ClickEvent] - the clicks to log
+        """
+
+        if not events:
+            return
+        values = [
+            {
+                "url_id": event.url_id,
+                "clicked_at": event.clicked_at,
+                "ip": event.ip,
+                "user_agent": event.user_agent,
+            }
+            for event in events
+        ]
+        async with self._session() as session:
+            async with session.begin():
+                await session.execute(insert(Click).values(values))
+
+    async def get_clicks(
+        self, url_id: int, limit: int = 10, offset: int = 0
+    ) -> list[ClickRow]:
+        """Get the logged clicks of the URL, the latest first, from a replica if any.
+
+        Args:
+            url_id: int - the URL id
+            limit: int - the page size
+            offset: int - the number of clicks to skip
+
+        Returns:
+            list[ClickRow] - the page of clicks
+        """
+
+        query = (
+            select(Click)
+            .where(Click.url_id == url_id)
+            .order_by(Click.clicked_at.desc(), Click.id.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+
+        async def read(session_factory: async_sessionmaker) -> list[ClickRow]:
+            async with session_factory() as session:
+                async with session.begin():
+                    result = await session.execute(query)
+                    return [ClickRow.model_validate(row) for row in result.scalars()]
+
+        return await self._read(read)
+
+    async def add_click_rollups(self, deltas: list[ClickBucketDelta]) -> None:
+        """Add the clicks per minute to the minute, hour and day rollups.
+
+        The buckets are upserted in one transaction, in the key order
+        for the concurrent workers to lock the rows alike.
+
+        Args:
+            deltas: list[ClickBucketDelta] - the clicks per URL and minute
+        """
+
+        if not deltas:
+            return
+        async with self._session() as session:
+            async with session.begin():
+                for granularity, rollup in CLICK_ROLLUPS.items():
+                    counts: dict[tuple[int, datetime], int] = {}
+                    for delta in deltas:
+                        key = (delta.url_id, granularity.truncate(delta.bucket))
+                        counts[key] = counts.get(key, 0) + delta.nclicks
+                    table = rollup.__table__
+                    query = self._insert(table)
+                    query = query.on_conflict_do_update(
+                        index_elements=[table.c.url_id, table.c.bucket],
+                        set_={"nclicks": table.c.nclicks + query.excluded.nclicks},
+                    )
+                    params = [
+                        {"url_id": url_id, "bucket": bucket, "nclicks": nclicks}
+                        for (url_id, bucket), nclicks in sorted(counts.items())
+                    ]
+                    await session.execute(query, params)
+
+    async def get_click_timeseries(
+        self,
+        url_id: int,
+        granularity: RollupGranularity,
+        since: datetime,
+        until: datetime,
+    ) -> list[ClickBucket]:
+        """Get the rolled up clicks of the URL, from a replica if any.
+
+        Args:
+            url_id: int - the URL id
+            granularity: RollupGranularity - the bucket size
+            since: datetime - the first bucket start
+            until: datetime - the end of the series, exclusive
+
+        Returns:
+            list[ClickBucket] - the buckets with clicks, in the time order
+        """
+
+        rollup = CLICK_ROLLUPS[granularity]
+        query = (
+            select(rollup.bucket, rollup.nclicks)
+            .where(
+                rollup.url_id == url_id,
+                rollup.bucket >= since,
+                rollup.bucket < until,
+            )
+            .order_by(rollup.bucket)
+        )
+
+        async def read(session_factory: async_sessionmaker) -> list[ClickBucket]:
+            async with session_factory() as session:
+                async with session.begin():
+                    result = await session.execute(query)
+                    return [ClickBucket.model_validate(row) for row in result]
+
+        return await self._read(read)
+
+    async def prune_click_rollups(
+        self, granularity: RollupGranularity, before: datetime
+    ) -> int:
+        """Delete the rollup buckets started before the moment.
+
+        Args:
+            granularity: RollupGranularity - the rollups to prune
+            before: datetime - the first bucket start to keep
+
+        Returns:
+            int - the number of the deleted buckets
+        """
+
+        rollup = CLICK_ROLLUPS[granularity]
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.execute(
+                    delete(rollup).where(rollup.bucket < before)
+                )
+                return result.rowcount
+
+    async def merge_visitor_sketches(self, sketches: dict[int, bytes]) -> None:
+        """Merge the unique visitor sketches into the stored ones.
+
+        The stored sketches are locked, merged with and written back in one
+        transaction, in the id order for the concurrent workers to lock
+        the rows alike. The sketches of the deleted URLs are skipped.
+
+        Args:
+            sketches: dict[int, bytes] - the serialized sketches by URL ids
+        """
+
+        if not sketches:
+            return
+        ids = sorted(sketches)
+        query = (
+            select(Url.id, Url.visitors_hll)
+            .where(Url.id.in_(ids))
+            .order_by(Url.id)
+            .with_for_update()
+        )
+        table = Url.__table__
+        merge_query = (
+            update(table)
+            .where(table.c.id == bindparam("sketch_id"))
+            .values(visitors_hll=bindparam("sketch"))
+        )
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.execute(query)
+                params = [
+                    {
+                        "sketch_id": url_id,
+                        "sketch": merge_serialized(stored, sketches[url_id]),
+                    }
+                    for url_id, stored in result
+                ]
+                if params:
+                    await session.execute(merge_query, params)
+
+    async def get_visitor_sketches(self, url_ids: list[int]) -> dict[int, bytes]:
+        """Get the unique visitor sketches of the URLs, from a replica if any.
+
+        Args:
+            url_ids: list[int] - the URL ids
+
+        Returns:
+            dict[int, bytes] - the serialized sketches of the visited URLs
+        """
+
+        if not url_ids:
+            return {}
+        query = select(Url.id, Url.visitors_hll).where(
+            Url.id.in_(url_ids), Url.visitors_hll.is_not(None)
+        )
+
+        async def read(session_factory: async_sessionmaker) -> dict[int, bytes]:
+            async with session_factory() as session:
+                async with session.begin():
+                    result = await session.execute(query)
+                    return {url_id: sketch for url_id, sketch in result}
+
+        return await self._read(read)
+
+    async def ensure_click_partitions(self, since: date, months: int) -> list[str]:
+        """Create the monthly partitions of the click log if missing.
+
+        A partition cannot be created once the default partition holds rows
+        of its range, so the partitions are meant to be created in advance.
+
+        Args:
+            since: date - the first month to have a partition for
+            months: int - the number of the months
+
+        Returns:
+            list[str] - the partitions failed to be created
+        """
+
+        failed = []
+        first = since.replace(day=1)
+        for idx in range(months):
+            lower = _add_months(first, idx)
+            upper = _add_months(first, idx + 1)
+            name = f"clicks_y{lower.year}m{lower.month:02d}"
+            query = text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF clicks "
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+            try:
+                async with self._session() as session:
+                    async with session.begin():
+                        await session.execute(query)
+            except DBAPIError:
+                failed.append(name)
+        return failed
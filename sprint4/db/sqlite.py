@@ -0,0 +1,239 @@
+"""SQLite URL repository module."""
+
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql import bindparam, case, func, insert, or_, select, text, update
+from sqlalchemy.types import DateTime
+
+from sprint4.core.ptypes import KeywordsType
+from sprint4.core.settings import SETTINGS, RepositorySettings
+from sprint4.db.metrics import observe_operations
+from sprint4.db.orms import Base, Click, ShortUrlKey, Url, UrlHashKey
+from sprint4.db.repositories import UrlRepository
+from sprint4.models.clicks import ClickDelta, ClickEvent
+from sprint4.models.urls import HttpUrlModel, HttpUrlRow
+
+
+# the default SQLITE_MAX_VARIABLE_NUMBER is 32766, five columns a row
+_MAX_ROWS_PER_INSERT = 5000
+
+# the key directories serve the partitioned PostgreSQL table only
+_SCHEMA_TABLES = [
+    table
+    for table in Base.metadata.sorted_tables
+    if table not in (ShortUrlKey.__table__, UrlHashKey.__table__)
+]
+
+
+def get_sqlite_dsn(path: Path) -> str:
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def get_sqlite_engine_settings(settings: RepositorySettings) -> KeywordsType:
+    """Return the `create_async_engine` keywords for the SQLite file."""
+
+    return {
+        "hide_parameters": True,
+        "pool_size": settings.sqlite_pool_size,
+        "max_overflow": 0,
+        # the seconds a connection waits for the database lock
+        "connect_args": {"timeout": settings.sqlite_busy_timeout},
+    }
+
+
+def _set_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    # the readers do not block the writer, the WAL is synced on checkpoints
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+@observe_operations
+class SqliteUrlRepository(UrlRepository):
+    """The URL repository in a SQLite file, by the aiosqlite driver.
+
+    The schema is created on the warm-up. SQLite has neither sequences
+    nor COPY, so the ids are reserved from the `sequences` table and
+    the URLs are loaded by `executemany`. A writer at a time holds
+    the database lock, so it suits a single host (an edge redirector,
+    the CI), not the write-heavy loads. Requires SQLite 3.35+ (RETURNING).
+    """
+
+    _insert = staticmethod(sqlite_insert)
+
+    def __init__(
+        self,
+        dsn: str,
+        engine_settings: None | KeywordsType = None,
+        session_settings: None | KeywordsType = None,
+    ) -> None:
+        super().__init__(
+            dsn=dsn,
+            engine_settings=(
+                engine_settings
+                if engine_settings
+                else get_sqlite_engine_settings(SETTINGS.repository)
+            ),
+            session_settings=session_settings,
+        )
+        event.listen(self._engine.sync_engine, "connect", _set_pragmas)
+        self._schema_created = False
+
+    async def create_schema(self) -> None:
+        """Create the missing tables, seeding the id sequences from them."""
+
+        async with self._engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=_SCHEMA_TABLES)
+            await conn.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS sequences "
+                    "(name TEXT PRIMARY KEY, last_value INTEGER NOT NULL)"
+                )
+            )
+            await conn.execute(
+                text(
+                    "INSERT OR IGNORE INTO sequences (name, last_value) "
+                    "SELECT 'urls', coalesce(max(id), 0) FROM urls "
+                    "UNION ALL SELECT 'clicks', coalesce(max(id), 0) FROM clicks"
+                )
+            )
+        self._schema_created = True
+
+    async def warm_up(self, connections: None | int = None) -> None:
+        if not self._schema_created:
+            await self.create_schema()
+        await super().warm_up(connections)
+
+    async def _is_partitioned(self) -> bool:
+        return False
+
+    async def _reserve(self, session: AsyncSession, name: str, count: int) -> list[int]:
+        # the UPDATE takes the write lock, so the ranges never overlap
+        result = await session.execute(
+            text(
+                "UPDATE sequences SET last_value = last_value + :count "
+                "WHERE name = :name RETURNING last_value"
+            ),
+            {"count": count, "name": name},
+        )
+        last_id = result.scalar_one()
+        return list(range(last_id - count + 1, last_id + 1))
+
+    async def reserve_ids(self, count: int) -> list[int]:
+        if count < 1:
+            return []
+        async with self._session() as session:
+            async with session.begin():
+                return await self._reserve(session, "urls", count)
+
+    async def add_urls(self, url_models: list[HttpUrlModel]) -> list[HttpUrlRow]:
+        # the rowid would be taken otherwise, possibly one reserved already
+        nmissing = sum(model.id is None for model in url_models)
+        if nmissing:
+            ids = iter(await self.reserve_ids(nmissing))
+            url_models = [
+                (
+                    model
+                    if model.id is not None
+                    else model.model_copy(update={"id": next(ids)})
+                )
+                for model in url_models
+            ]
+        rows = []
+        for start in range(0, len(url_models), _MAX_ROWS_PER_INSERT):
+            stop = start + _MAX_ROWS_PER_INSERT
+            chunk = url_models[start:stop]
+            rows.extend(await super().add_urls(chunk))
+        return rows
+
+    async def copy_urls(self, url_models: list[HttpUrlModel]) -> int:
+        if not url_models:
+            return 0
+        records = [
+            {
+                "id": model.id,
+                "url": str(model.url),
+                "short_url": str(model.short_url),
+                "visibility": model.visibility,
+                "url_hash": model.url_hash,
+            }
+            for model in url_models
+        ]
+        # the duplicates within the chunk conflict with the rows inserted first
+        query = self._insert(Url.__table__).on_conflict_do_nothing()
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.execute(query, records)
+                return result.rowcount
+
+    async def estimate_url_count(self) -> int:
+        async with self._session() as session:
+            async with session.begin():
+                result = await session.execute(select(func.count()).select_from(Url))
+                return result.scalar_one()
+
+    async def apply_click_deltas(self, deltas: list[ClickDelta]) -> None:
+        if not deltas:
+            return
+        table = Url.__table__
+        # the parameters are named apart from the columns, as the SET binds them;
+        # the SQLite max() is NULL with a NULL argument, hence the CASE
+        is_newer = or_(
+            table.c.clicked_at.is_(None),
+            table.c.clicked_at <= bindparam("delta_clicked_at", type_=DateTime),
+        )
+        query = (
+            update(table)
+            .where(table.c.id == bindparam("delta_id"))
+            .values(
+                nclicks=table.c.nclicks + bindparam("delta_nclicks"),
+                clicked_at=case(
+                    (is_newer, bindparam("delta_clicked_at", type_=DateTime)),
+                    else_=table.c.clicked_at,
+                ),
+                client_info=case(
+                    (is_newer, bindparam("delta_client_info")),
+                    else_=table.c.client_info,
+                ),
+            )
+        )
+        params = [
+            {
+                "delta_id": delta.url_id,
+                "delta_nclicks": delta.nclicks,
+                "delta_clicked_at": delta.clicked_at,
+                "delta_client_info": delta.client_info,
+            }
+            for delta in deltas
+        ]
+        async with self._session() as session:
+            async with session.begin():
+                await session.execute(query, params)
+
+    async def add_clicks(self, events: list[ClickEvent]) -> None:
+        if not events:
+            return
+        async with self._session() as session:
+            async with session.begin():
+                # the composite primary key is not an alias of the rowid
+                ids = await self._reserve(session, "clicks", len(events))
+                values = [
+                    {
+                        "id": click_id,
+                        "url_id": event.url_id,
+                        "clicked_at": event.clicked_at,
+                        "ip": event.ip,
+                        "user_agent": event.user_agent,
+                    }
+                    for click_id, event in zip(ids, events)
+                ]
+                await session.execute(insert(Click.__table__), values)
+
+    async def ensure_click_partitions(self, since: date, months: int) -> list[str]:
+        # the click log is a plain table
+        return []
@@ -4,11 +4,16 @@ from sqlalchemy.ext.asyncio.engine import AsyncEngine, create_async_engine
 from sqlalchemy.ext.asyncio.session import AsyncSession, async_sessionmaker
 
 from sprint4.core.ptypes import KeywordsType
+from sprint4.db.metrics import instrument_statements
+from sprint4.db.pool import InstrumentedAsyncQueuePool, instrument_engine
 
 
 def get_async_engine(url: str, settings: None | KeywordsType = None) -> AsyncEngine:
-    settings = settings if settings else {}
-    return create_async_engine(url=url, **settings)
+    settings = {"poolclass": InstrumentedAsyncQueuePool, **(settings or {})}
+    engine = create_async_engine(url=url, **settings)
+    instrument_engine(engine)
+    instrument_statements(engine)
+    return engine
 
 
 def get_async_session(
@@ -4,6 +4,7 @@ import click
 import uvloop
 from uvicorn import run as run_asgi
 
+from sprint4.core.metrics import prepare_multiproc_dir
 from sprint4.core.settings import SETTINGS
 from sprint4.api.rest.app import APP
 
@@ -31,12 +32,93 @@ app = APP
     show_default=True,
     help="application port",
 )
-def main(host: str, port: int) -> None:
+@click.option(
+    "-m",
+    "--mode",
+    type=click.Choice(["dev", "prod"]),
+    default=SETTINGS.server.mode,
+    show_default=True,
+    help="`dev` reloads on changes, `prod` runs the worker processes",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=SETTINGS.server.workers,
+    show_default=True,
+    help="number of the worker processes (prod)",
+)
+@click.option(
+    "--backlog",
+    type=click.IntRange(min=1),
+    default=SETTINGS.server.backlog,
+    show_default=True,
+    help="maximum number of the pending connections (prod)",
+)
+@click.option(
+    "--keep-alive",
+    type=click.IntRange(min=0),
+    default=SETTINGS.server.keep_alive,
+    show_default=True,
+    help="seconds to keep the idle connections alive (prod)",
+)
+@click.option(
+    "--limit-concurrency",
+    type=click.IntRange(min=1),
+    default=SETTINGS.server.limit_concurrency,
+    show_default=True,
+    help="maximum number of the concurrent connections per worker (prod)",
+)
+@click.option(
+    "--limit-max-requests",
+    type=click.IntRange(min=1),
+    default=SETTINGS.server.limit_max_requests,
+    show_default=True,
+    help="number of the requests to restart a worker after (prod)",
+)
+@click.option(
+    "--graceful-shutdown",
+    type=click.IntRange(min=0),
+    default=SETTINGS.server.graceful_shutdown,
+    show_default=True,
+    help="seconds to wait for the requests to complete on shutdown (prod)",
+)
+def main(
+    host: str,
+    port: int,
+    mode: str,
+    workers: int,
+    backlog: int,
+    keep_alive: int,
+    limit_concurrency: None | int,
+    limit_max_requests: None | int,
+    graceful_shutdown: int,
+) -> None:
+    if mode == "dev":
+        run_asgi(
+            app="main:app",
+            host=host,
+            port=port,
+            reload=True,
+        )
+        return
+    if workers > 1:
+        # the workers are spawned, so they import the metrics anew
+        prepare_multiproc_dir(SETTINGS.metrics.multiproc_dir)
     run_asgi(
         app="main:app",
         host=host,
         port=port,
-        reload=True,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        backlog=backlog,
+        timeout_keep_alive=keep_alive,
+        limit_concurrency=limit_concurrency,
+        limit_max_requests=limit_max_requests,
+        timeout_graceful_shutdown=graceful_shutdown,
+        access_log=False,
+        proxy_headers=True,
     )
 
 
@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, NonNegativeInt
+
+from sprint4.models.urls import HttpUrlRow
+
+
+@dataclass(frozen=True, slots=True)
+class ClickEvent:
+    """A click queued for the log, deliberately not a pydantic model."""
+
+    url_id: int
+    clicked_at: datetime
+    ip: None | str
+    user_agent: None | str
+
+
+@dataclass(slots=True)
+class ClickDelta:
+    """The clicks of a URL counted, but not yet written."""
+
+    url_id: int
+    nclicks: int
+    clicked_at: datetime
+    client_info: None | str
+
+
+ClickOverflowPolicy = Literal["drop", "block"]
+
+
+class ClickQueueStatistics(BaseModel):
+    pending: int
+    max_pending: int
+    overflow: ClickOverflowPolicy
+    applied: int
+    dropped: int
+    failed: int
+
+
+class RollupGranularity(str, Enum):
+    minute = "minute"
+    hour = "hour"
+    day = "day"
+
+    @property
+    def step(self) -> timedelta:
+        return _ROLLUP_STEPS[self]
+
+    def truncate(self, moment: datetime) -> datetime:
+        """Return the start of the bucket the moment falls in."""
+
+        if self is RollupGranularity.minute:
+            return moment.replace(second=0, microsecond=0)
+        if self is RollupGranularity.hour:
+            return moment.replace(minute=0, second=0, microsecond=0)
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+_ROLLUP_STEPS = {
+    RollupGranularity.minute: timedelta(minutes=1),
+    RollupGranularity.hour: timedelta(hours=1),
+    RollupGranularity.day: timedelta(days=1),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ClickBucketDelta:
+    """The clicks of a URL counted within a minute, but not yet rolled up."""
+
+    url_id: int
+    bucket: datetime  # the minute start
+    nclicks: int
+
+
+class ClickBucket(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    bucket: datetime
+    nclicks: NonNegativeInt
+
+
+class ClickTimeseries(BaseModel):
+    """The clicks of a URL per bucket, the buckets without clicks omitted."""
+
+    url_id: NonNegativeInt
+    granularity: RollupGranularity
+    since: datetime
+    until: datetime  # exclusive
+    buckets: list[ClickBucket]
+
+
+class TopWindow(str, Enum):
+    minute = "1m"
+    hour = "1h"
+    day = "24h"
+
+
+class HotUrl(BaseModel):
+    id: NonNegativeInt
+    nclicks: NonNegativeInt  # overestimated by `error` at most
+    error: NonNegativeInt
+
+
+class TopUrls(BaseModel):
+    """The most clicked URLs over the sliding window, by a worker process."""
+
+    window: TopWindow
+    urls: list[HotUrl]
+
+
+class ClickRow(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: NonNegativeInt
+    clicked_at: datetime
+    ip: None | str
+    user_agent: None | str
+
+
+class HttpUrlStatus(HttpUrlRow):
+    clicks: None | list[ClickRow] = None
+    unique_visitors: None | NonNegativeInt = None  # estimated, about 1% off
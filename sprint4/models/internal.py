@@ -2,6 +2,12 @@ from datetime import datetime
 
 import pydantic
 
+from sprint4.core.bloom import BloomFilterStatistics
+from sprint4.core.caches import CacheStatistics
+from sprint4.db.pool import PoolStatistics
+from sprint4.db.replicas import ReplicaStatistics
+from sprint4.models.clicks import ClickQueueStatistics
+
 
 START_TIME: datetime = datetime.now()
 
@@ -13,3 +19,8 @@ class BaseStatistics(pydantic.BaseModel):
 
 class ServiceStatistics(BaseStatistics):
     started_at: datetime = START_TIME
+    redirect_cache: None | CacheStatistics = None
+    url_filter: None | BloomFilterStatistics = None
+    db_pool: None | PoolStatistics = None
+    db_replicas: None | list[ReplicaStatistics] = None
+    click_queue: None | ClickQueueStatistics = None
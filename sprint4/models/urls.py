@@ -1,5 +1,7 @@
 from datetime import datetime
 from enum import Enum
+from hashlib import sha256
+from typing import Any, Literal
 
 from pydantic import AnyHttpUrl, BaseModel, ConfigDict, NonNegativeInt, field_serializer
 
@@ -11,10 +13,21 @@ class UrlVisibilityTypes(str, Enum):
     private = "private"
 
 
+def get_url_hash(url: str) -> bytes:
+    """Return the content address of the normalized URL."""
+
+    return sha256(url.encode()).digest()
+
+
 class HttpUrlBase(BaseModel):
     url: AnyHttpUrl
     visibility: UrlVisibilityTypes = UrlVisibilityTypes.public
 
+    @property
+    def url_hash(self) -> bytes:
+        # the URL has been normalized by the validation
+        return get_url_hash(str(self.url))
+
     @field_serializer("url")
     def serialize_url(self, url: AnyHttpUrl, _info) -> str:
         return str(url)
@@ -25,6 +38,7 @@ class HttpUrlBase(BaseModel):
 
 
 class HttpUrlModel(HttpUrlBase):
+    id: None | NonNegativeInt = None  # set when reserved beforehand
     short_url: AnyHttpUrl
 
     @field_serializer("short_url")
@@ -42,6 +56,11 @@ class HttpUrlRow(HttpUrlModel):
     nclicks: NonNegativeInt
 
 
+# the HttpUrlRow fields as plain values, read and serialized without validation
+UrlRecordType = dict[str, Any]
+URL_RECORD_FIELDS = tuple(HttpUrlRow.model_fields)
+
+
 class HttpUrlFilter(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -71,3 +90,9 @@ class HttpUrlFilter(BaseModel):
 
 class HttpUrlAddRequest(HttpUrlBase):
     shortener_code: ShortenersEnum = ShortenersEnum.clckru
+
+
+class HttpUrlAddResult(BaseModel):
+    status: Literal["created", "existing", "failed"]
+    row: None | HttpUrlRow = None
+    error: None | str = None
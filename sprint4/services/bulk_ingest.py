@@ -0,0 +1,156 @@
+"""Bulk URL ingestion from the streamed NDJSON or CSV bodies."""
+
+import csv
+import re
+from enum import Enum
+from pathlib import Path
+from typing import AsyncIterator, IO
+from uuid import uuid4
+
+import orjson
+from pydantic import BaseModel, ValidationError
+
+from sprint4.core.url_shorteners import LocalShortener
+from sprint4.db.protocols import UrlRepositoryProtocol
+from sprint4.models.urls import HttpUrlBase, HttpUrlModel
+
+
+REJECTS_FILE_PATTERN = re.compile(r"rejects-[0-9a-f]{32}\.ndjson")
+
+
+class BulkIngestFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class BulkIngestSummary(BaseModel):
+    received: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    rejects_file: None | str = None
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int
+) -> AsyncIterator[bytes]:
+    """Split the streamed body into lines, whatever the chunk boundaries are.
+
+    The overlong lines are yielded truncated, for the validation to fail.
+    """
+
+    tail = b""
+    async for chunk in chunks:
+        tail += chunk
+        *lines, tail = tail.split(b"\n")
+        for line in lines:
+            yield line[: max_line_bytes + 1]
+        if len(tail) > max_line_bytes:
+            # dropping the rest of the overlong line
+            tail = tail[: max_line_bytes + 1]
+    if tail:
+        yield tail
+
+
+class BulkUrlIngestor:
+    """Validates the streamed rows, shortens and COPYies them by chunks.
+
+    The short codes are made from the ids reserved for each chunk, so they
+    are unique by construction. Each row is either inserted, found to be
+    a duplicate or rejected with the reason written to the rejects file.
+    """
+
+    def __init__(
+        self,
+        repo: UrlRepositoryProtocol,
+        shortener: LocalShortener,
+        chunk_size: int = 10_000,
+        max_line_bytes: int = 65_536,
+        rejects_dir: None | Path = None,
+    ) -> None:
+        self._repo = repo
+        self._shortener = shortener
+        self._chunk_size = chunk_size
+        self._max_line_bytes = max_line_bytes
+        self._rejects_dir = rejects_dir
+        self._rejects: None | IO[bytes] = None
+        self.summary = BulkIngestSummary()
+
+    async def ingest(
+        self, chunks: AsyncIterator[bytes], fmt: BulkIngestFormat
+    ) -> AsyncIterator[list[HttpUrlModel]]:
+        """Ingest the streamed body, yielding the chunks of the loaded rows."""
+
+        if self._rejects_dir is not None:
+            self._rejects_dir.mkdir(parents=True, exist_ok=True)
+            name = f"rejects-{uuid4().hex}.ndjson"
+            self._rejects = open(self._rejects_dir / name, mode="wb")
+            self.summary.rejects_file = name
+        try:
+            chunk: list[HttpUrlBase] = []
+            lines = iter_lines(chunks, max_line_bytes=self._max_line_bytes)
+            async for url in self._validate(lines, fmt):
+                chunk.append(url)
+                if len(chunk) >= self._chunk_size:
+                    yield await self._load(chunk)
+                    chunk = []
+            if chunk:
+                yield await self._load(chunk)
+        finally:
+            if self._rejects is not None:
+                self._rejects.close()
+
+    async def _validate(
+        self, lines: AsyncIterator[bytes], fmt: BulkIngestFormat
+    ) -> AsyncIterator[HttpUrlBase]:
+        columns: None | list[str] = None
+        lineno = 0
+        async for line in lines:
+            lineno += 1
+            line = line.strip()
+            if not line:
+                continue
+            if fmt == BulkIngestFormat.csv and columns is None:
+                columns = next(csv.reader([line.decode(errors="replace")]))
+                continue
+            self.summary.received += 1
+            try:
+                if len(line) > self._max_line_bytes:
+                    msg = f"the line exceeds {self._max_line_bytes} bytes"
+                    raise ValueError(msg)
+                if fmt == BulkIngestFormat.csv:
+                    values = next(csv.reader([line.decode()]))
+                    record = dict(zip(columns, values))
+                else:
+                    record = orjson.loads(line)
+                url = HttpUrlBase.model_validate(record)
+            except (ValueError, ValidationError) as e:
+                # orjson.JSONDecodeError and UnicodeDecodeError are ValueErrors
+                self._reject(lineno, line, str(e))
+                continue
+            self.summary.accepted += 1
+            yield url
+
+    def _reject(self, lineno: int, line: bytes, error: str) -> None:
+        self.summary.rejected += 1
+        if self._rejects is not None:
+            data = line.decode(errors="replace")
+            reject = {"line": lineno, "error": error, "data": data}
+            self._rejects.write(orjson.dumps(reject) + b"\n")
+
+    async def _load(self, urls: list[HttpUrlBase]) -> list[HttpUrlModel]:
+        ids = await self._repo.reserve_ids(len(urls))
+        models = [
+            HttpUrlModel.model_construct(
+                id=url_id,
+                url=url.url,
+                visibility=url.visibility,
+                short_url=self._shortener.encode_id(url_id),
+            )
+            for url_id, url in zip(ids, urls)
+        ]
+        inserted = await self._repo.copy_urls(models)
+        self.summary.inserted += inserted
+        self.summary.duplicates += len(models) - inserted
+        return models
@@ -0,0 +1,75 @@
+"""Write-behind click counter."""
+
+from datetime import datetime
+
+from sprint4.db.protocols import UrlRepositoryProtocol
+from sprint4.models.clicks import ClickDelta
+from sprint4.services.flusher import PeriodicFlusher
+
+
+class ClickCounter(PeriodicFlusher[int, ClickDelta]):
+    """Aggregates the clicks per URL in memory and applies them in bulk.
+
+    Instead of an UPDATE per click, the counters are flushed every
+    `flush_interval` seconds, or as soon as `max_pending` clicks have been
+    counted, in one statement for all the URLs. A crash loses at most
+    the clicks of one such window, a failed flush is retried later.
+    """
+
+    _task_name = "click-counter"
+    _pending_name = "click counter(s)"
+
+    def __init__(
+        self,
+        repo: UrlRepositoryProtocol,
+        flush_interval: float = 0.5,
+        max_pending: int = 10_000,
+    ) -> None:
+        super().__init__(flush_interval=flush_interval, max_pending=max_pending)
+        self._repo = repo
+        self._npending = 0
+        self.flushed = 0
+
+    def add(self, url_id: int, clicked_at: datetime, client_info: None | str) -> None:
+        delta = self._pending.get(url_id)
+        if delta is None:
+            self._pending[url_id] = ClickDelta(url_id, 1, clicked_at, client_info)
+        else:
+            delta.nclicks += 1
+            delta.clicked_at = clicked_at
+            delta.client_info = client_info
+        self._npending += 1
+        if self._npending >= self._max_pending:
+            self._flush_needed.set()
+
+    def pending(self, url_id: int) -> None | ClickDelta:
+        """Return the clicks of the URL not yet in the database, if any."""
+
+        queued = self._pending.get(url_id)
+        flushing = self._flushing.get(url_id)
+        if queued is None or flushing is None:
+            return queued or flushing
+        return ClickDelta(
+            url_id,
+            queued.nclicks + flushing.nclicks,
+            queued.clicked_at,
+            queued.client_info,
+        )
+
+    def _swap(self) -> dict[int, ClickDelta]:
+        self._npending = 0
+        return super()._swap()
+
+    async def _write(self, batch: dict[int, ClickDelta]) -> None:
+        await self._repo.apply_click_deltas(list(batch.values()))
+        self.flushed += sum(delta.nclicks for delta in batch.values())
+
+    def _restore(self, batch: dict[int, ClickDelta]) -> None:
+        for url_id, delta in batch.items():
+            queued = self._pending.get(url_id)
+            if queued is not None:
+                delta.nclicks += queued.nclicks
+                delta.clicked_at = queued.clicked_at
+                delta.client_info = queued.client_info
+            self._pending[url_id] = delta
+            self._npending += delta.nclicks
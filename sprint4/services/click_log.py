@@ -0,0 +1,115 @@
+"""Buffered click log writer."""
+
+import asyncio
+import logging
+from collections import deque
+from datetime import date
+
+from sprint4.db.protocols import UrlRepositoryProtocol
+from sprint4.models.clicks import ClickEvent
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ClickLogWriter:
+    """Queues the click events in memory and writes them by batches.
+
+    `record` never waits: when the queue is full, the event is dropped and
+    counted. The background task flushes the queue once it holds
+    `batch_size` events or every `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        repo: UrlRepositoryProtocol,
+        batch_size: int = 1000,
+        flush_interval: float = 1.0,
+        max_pending: int = 100_000,
+        partitions_ahead: int = 2,
+    ) -> None:
+        self._repo = repo
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._partitions_ahead = partitions_ahead
+        self._pending: deque[ClickEvent] = deque()
+        self._batch_ready = asyncio.Event()
+        self._task: None | asyncio.Task = None
+        self._stopping = False
+        self._partitions_checked_on: None | date = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def record(self, event: ClickEvent) -> bool:
+        """Queue the click event, return False if it was dropped."""
+
+        if len(self._pending) >= self._max_pending:
+            self.dropped += 1
+            return False
+        self._pending.append(event)
+        if len(self._pending) >= self._batch_size:
+            self._batch_ready.set()
+        return True
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self._ensure_partitions()
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="click-log-writer")
+
+    async def stop(self) -> None:
+        """Stop the background task, flushing the queued events."""
+
+        if self._task is None:
+            return
+        self._stopping = True
+        self._batch_ready.set()
+        await self._task
+        self._task = None
+
+    async def _ensure_partitions(self) -> None:
+        today = date.today()
+        if self._partitions_checked_on == today:
+            return
+        self._partitions_checked_on = today
+        try:
+            failed = await self._repo.ensure_click_partitions(
+                since=today, months=self._partitions_ahead
+            )
+        except Exception:
+            LOGGER.exception("failed to create the click log partitions")
+            return
+        if failed:
+            LOGGER.warning("the click log partitions not created: %s", failed)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._batch_ready.wait(), timeout=self._flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self._ensure_partitions()
+            await self.flush()
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write all the queued events."""
+
+        while self._pending:
+            size = min(self._batch_size, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(size)]
+            try:
+                await self._repo.add_clicks(batch)
+                self.written += size
+            except Exception:
+                self.failed += size
+                LOGGER.exception("failed to write %d click(s) to the log", size)
@@ -0,0 +1,122 @@
+"""Fire-and-forget click queue."""
+
+import asyncio
+import logging
+
+from sprint4.db.protocols import UrlRepositoryProtocol
+from sprint4.models.clicks import (
+    ClickDelta,
+    ClickOverflowPolicy,
+    ClickQueueStatistics,
+)
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ClickQueue:
+    """Hands the clicks over to the background workers writing them.
+
+    The redirect is sent without waiting for the database: the click is
+    queued, and `workers` tasks apply the queued clicks, up to `batch_size`
+    at a time, in one statement per batch. Once `max_pending` clicks are
+    queued, the "drop" overflow policy drops (and counts) the click, the
+    "block" one makes the redirect wait for a free slot. The queue is
+    drained on stop, a failed batch is counted and dropped.
+    """
+
+    def __init__(
+        self,
+        repo: UrlRepositoryProtocol,
+        workers: int = 4,
+        max_pending: int = 10_000,
+        batch_size: int = 100,
+        overflow: ClickOverflowPolicy = "drop",
+    ) -> None:
+        self._repo = repo
+        self._nworkers = workers
+        self._max_pending = max_pending
+        self._batch_size = batch_size
+        self._overflow = overflow
+        self._queue: asyncio.Queue[ClickDelta] = asyncio.Queue(maxsize=max_pending)
+        self._workers: list[asyncio.Task] = []
+        self.applied = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def put(self, click: ClickDelta) -> bool:
+        """Queue the click, return False if it was dropped."""
+
+        if self._overflow == "block":
+            await self._queue.put(click)
+            return True
+        try:
+            self._queue.put_nowait(click)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    async def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._work(), name=f"click-queue-{idx}")
+                for idx in range(self._nworkers)
+            ]
+
+    async def stop(self) -> None:
+        """Drain the queue, then stop the workers."""
+
+        if not self._workers:
+            return
+        await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self._batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._repo.apply_click_deltas(_merge_clicks(batch))
+                self.applied += len(batch)
+            except Exception:
+                self.failed += len(batch)
+                LOGGER.exception("failed to apply %d queued click(s)", len(batch))
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def statistics(self) -> ClickQueueStatistics:
+        return ClickQueueStatistics(
+            pending=self.pending,
+            max_pending=self._max_pending,
+            overflow=self._overflow,
+            applied=self.applied,
+            dropped=self.dropped,
+            failed=self.failed,
+        )
+
+
+def _merge_clicks(clicks: list[ClickDelta]) -> list[ClickDelta]:
+    # one delta per URL, the UPDATE ... FROM would apply a single one of them
+    merged: dict[int, ClickDelta] = {}
+    for click in clicks:
+        delta = merged.get(click.url_id)
+        if delta is None:
+            merged[click.url_id] = ClickDelta(
+                click.url_id, click.nclicks, click.clicked_at, click.client_info
+            )
+        else:
+            delta.nclicks += click.nclicks
+            delta.clicked_at = click.clicked_at
+            delta.client_info = click.client_info
+    return list(merged.values())
@@ -0,0 +1,105 @@
+"""Periodic write-behind flusher."""
+
+import asyncio
+import logging
+from typing import Generic, Hashable, TypeVar
+
+
+LOGGER = logging.getLogger(__name__)
+
+_KeyType = TypeVar("_KeyType", bound=Hashable)
+_ValueType = TypeVar("_ValueType")
+
+
+class PeriodicFlusher(Generic[_KeyType, _ValueType]):
+    """Keeps the writes pending in memory and flushes them in bulk.
+
+    The pending writes are flushed by the background task every
+    `flush_interval` seconds, or as soon as the subclass sets `_flush_needed`
+    (having counted `max_pending` writes). A failed flush is restored into
+    the pending writes and retried after `flush_interval` seconds, stopping
+    the task flushes whatever is pending.
+
+    The subclasses write the batch by `_write` and merge a failed one
+    back by `_restore`, `_swap` takes the pending writes to flush.
+    """
+
+    _task_name = "periodic-flusher"
+    _pending_name = "pending write(s)"
+
+    def __init__(self, flush_interval: float, max_pending: int) -> None:
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._pending: dict[_KeyType, _ValueType] = {}
+        self._flushing: dict[_KeyType, _ValueType] = {}
+        self._flush_needed = asyncio.Event()
+        self._task: None | asyncio.Task = None
+        self._stopping = False
+        self.failed_flushes = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name=self._task_name)
+
+    async def stop(self) -> None:
+        """Stop the background task, flushing the pending writes."""
+
+        if self._task is None:
+            return
+        self._stopping = True
+        self._flush_needed.set()
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._flush_needed.wait(), timeout=self._flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            if not await self.flush():
+                # not hammering the database while it is failing
+                await asyncio.sleep(self._flush_interval)
+            else:
+                await self._after_flush()
+        await self.flush()
+
+    async def flush(self) -> bool:
+        """Write the pending writes to the database, return False on failure."""
+
+        if not self._pending or self._flushing:
+            return True
+        self._flushing = self._swap()
+        try:
+            await self._write(self._flushing)
+            return True
+        except Exception:
+            self.failed_flushes += 1
+            LOGGER.exception(
+                "failed to flush %d %s", len(self._flushing), self._pending_name
+            )
+            self._restore(self._flushing)
+            return False
+        finally:
+            self._flushing = {}
+
+    def _swap(self) -> dict[_KeyType, _ValueType]:
+        """Take the pending writes to flush, the new ones are pending anew."""
+
+        batch, self._pending = self._pending, {}
+        return batch
+
+    def _restore(self, batch: dict[_KeyType, _ValueType]) -> None:
+        """Merge the batch failed to flush back into the pending writes."""
+
+        raise NotImplementedError
+
+    async def _write(self, batch: dict[_KeyType, _ValueType]) -> None:
+        raise NotImplementedError
+
+    async def _after_flush(self) -> None:
+        """Run by the background task after a successful flush."""
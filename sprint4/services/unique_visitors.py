@@ -0,0 +1,67 @@
+"""Unique visitors counter."""
+
+from sprint4.core.hyperloglog import HyperLogLog
+from sprint4.db.protocols import UrlRepositoryProtocol
+from sprint4.services.flusher import PeriodicFlusher
+
+
+class UniqueVisitorCounter(PeriodicFlusher[int, HyperLogLog]):
+    """Sketches the distinct visitors per URL in memory, merged in bulk.
+
+    A visitor is told by its IP and user agent, hashed into the HyperLogLog
+    sketch of the URL. The sketches are merged into the stored ones every
+    `flush_interval` seconds, or as soon as `max_pending` URLs have been
+    visited, and dropped from memory. A failed flush is retried later.
+    """
+
+    _task_name = "unique-visitors"
+    _pending_name = "visitor sketch(es)"
+
+    def __init__(
+        self,
+        repo: UrlRepositoryProtocol,
+        precision: int = 13,
+        flush_interval: float = 10.0,
+        max_pending: int = 1000,
+    ) -> None:
+        super().__init__(flush_interval=flush_interval, max_pending=max_pending)
+        self._repo = repo
+        self._precision = precision
+
+    @property
+    def precision(self) -> int:
+        return self._precision
+
+    def add(self, url_id: int, ip: None | str, user_agent: None | str) -> None:
+        if ip is None and user_agent is None:
+            return
+        sketch = self._pending.get(url_id)
+        if sketch is None:
+            sketch = self._pending[url_id] = HyperLogLog(self._precision)
+            if len(self._pending) >= self._max_pending:
+                self._flush_needed.set()
+        sketch.add(f"{ip}\0{user_agent}".encode())
+
+    def pending(self, url_id: int) -> None | HyperLogLog:
+        """Return the visitors of the URL not yet merged into the database."""
+
+        queued = self._pending.get(url_id)
+        flushing = self._flushing.get(url_id)
+        if queued is None or flushing is None:
+            return queued or flushing
+        sketch = HyperLogLog(self._precision)
+        sketch.merge(queued)
+        sketch.merge(flushing)
+        return sketch
+
+    async def _write(self, batch: dict[int, HyperLogLog]) -> None:
+        await self._repo.merge_visitor_sketches(
+            {url_id: sketch.to_bytes() for url_id, sketch in batch.items()}
+        )
+
+    def _restore(self, batch: dict[int, HyperLogLog]) -> None:
+        for url_id, sketch in batch.items():
+            queued = self._pending.get(url_id)
+            if queued is not None:
+                sketch.merge(queued)
+            self._pending[url_id] = sketch
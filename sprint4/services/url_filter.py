@@ -0,0 +1,167 @@
+"""Negative lookup filter for the short URLs and ids."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from sprint4.core.bloom import BloomFilterStatistics, CountingBloomFilter
+from sprint4.db.protocols import UrlRepositoryProtocol
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _get_id_key(url_id: int) -> str:
+    return f"i:{url_id}"
+
+
+def _get_short_url_key(short_url: str) -> str:
+    return f"s:{short_url}"
+
+
+class UrlExistenceFilter:
+    """Tells the URLs definitely missing from those which may exist.
+
+    The filter is built at startup by a streamed scan of the `urls` table,
+    kept up to date by the service on adding and deleting URLs, refreshed
+    every `refresh_interval` seconds with the rows inserted by the other
+    workers and rebuilt from scratch every `rebuild_interval` seconds.
+    The ids are reserved before the rows are committed, so the refresh
+    rescans the ids which have appeared within the last `lookback` seconds.
+
+    Until the first build is done, every URL is considered existing.
+    """
+
+    def __init__(
+        self,
+        repo: UrlRepositoryProtocol,
+        capacity: int = 1_000_000,
+        fp_rate: float = 0.01,
+        max_bytes: None | int = None,
+        refresh_interval: float = 5.0,
+        lookback: float = 60.0,
+        rebuild_interval: float = 3600.0,
+        scan_batch_size: int = 10_000,
+    ) -> None:
+        self._repo = repo
+        self._capacity = capacity
+        self._fp_rate = fp_rate
+        self._max_bytes = max_bytes
+        self._refresh_interval = refresh_interval
+        self._lookback = lookback
+        self._rebuild_interval = rebuild_interval
+        self._scan_batch_size = scan_batch_size
+        self._filter: None | CountingBloomFilter = None
+        self._building: None | CountingBloomFilter = None
+        self._watermarks: deque[tuple[float, int]] = deque()
+        self._recent_ids: dict[int, float] = {}
+        self._built_at = 0.0
+        self._task: None | asyncio.Task = None
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def may_contain_id(self, url_id: int) -> bool:
+        return self._filter is None or _get_id_key(url_id) in self._filter
+
+    def may_contain_short_url(self, short_url: str) -> bool:
+        return self._filter is None or _get_short_url_key(short_url) in self._filter
+
+    def add(self, url_id: int, short_url: str) -> None:
+        self._recent_ids[url_id] = time.monotonic()
+        for bloom in (self._filter, self._building):
+            if bloom is not None:
+                bloom.add(_get_id_key(url_id))
+                bloom.add(_get_short_url_key(short_url))
+
+    def remove(self, url_id: int, short_url: str) -> None:
+        # the filter being built may have scanned the row, a stale positive
+        if self._filter is not None:
+            self._filter.remove(_get_id_key(url_id))
+            self._filter.remove(_get_short_url_key(short_url))
+
+    def statistics(self) -> None | BloomFilterStatistics:
+        return self._filter.statistics() if self._filter else None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="url-existence-filter")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if time.monotonic() - self._built_at >= self._rebuild_interval:
+                    await self.rebuild()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                LOGGER.exception("failed to update the URL existence filter")
+            await asyncio.sleep(self._refresh_interval)
+
+    async def _scan(self, bloom: CountingBloomFilter, after_id: None | int) -> int:
+        """Add the scanned rows to the filter, return the max id seen."""
+
+        max_id = after_id or 0
+        now = time.monotonic()
+        recent_ids = self._recent_ids
+        async for batch in self._repo.stream_url_keys(
+            after_id=after_id, batch_size=self._scan_batch_size
+        ):
+            for url_id, short_url in batch:
+                if after_id is not None and url_id in recent_ids:
+                    continue
+                if after_id is not None:
+                    recent_ids[url_id] = now
+                bloom.add(_get_id_key(url_id))
+                bloom.add(_get_short_url_key(short_url))
+            max_id = max(max_id, batch[-1][0])
+        return max_id
+
+    async def rebuild(self) -> None:
+        """Build the new filter from scratch and swap the current one."""
+
+        nrows = await self._repo.estimate_url_count()
+        capacity = max(self._capacity, 2 * nrows)
+        self._building = CountingBloomFilter(
+            capacity=capacity, fp_rate=self._fp_rate, max_bytes=self._max_bytes
+        )
+        started_at = time.monotonic()
+        try:
+            max_id = await self._scan(self._building, after_id=None)
+            self._filter, self._built_at = self._building, started_at
+        finally:
+            self._building = None
+        self._watermarks = deque([(started_at, max_id)])
+        self._recent_ids.clear()
+
+    async def refresh(self) -> None:
+        """Add the rows inserted lately, by the other workers in particular."""
+
+        if self._filter is None:
+            return await self.rebuild()
+        now = time.monotonic()
+        horizon = now - self._lookback
+        watermarks = self._watermarks
+        while len(watermarks) > 1 and watermarks[1][0] <= horizon:
+            watermarks.popleft()
+        self._recent_ids = {
+            url_id: seen_at
+            for url_id, seen_at in self._recent_ids.items()
+            if seen_at > horizon
+        }
+        max_id = await self._scan(self._filter, after_id=watermarks[0][1])
+        watermarks.append((now, max(max_id, watermarks[-1][1])))
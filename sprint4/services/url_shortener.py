@@ -1,55 +1,769 @@
 """Service Business/Core Logic Layer."""
 
-from sprint4.core.exceptions import UrlServiceError, UrlRepositoryError
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator
+
+from sqlalchemy.exc import NoResultFound
+
+from sprint4.core.caches import LruTtlCache
+from sprint4.core.heavy_hitters import SlidingTopK
+from sprint4.core.hyperloglog import HyperLogLog
+from sprint4.core.exceptions import UrlGoneError, UrlServiceError, UrlRepositoryError
 from sprint4.core.settings import SETTINGS
-from sprint4.core.url_shorteners import get_shortener
-from sprint4.db.repositories import UrlRepository
+from sprint4.core.ptypes import HttpUrlType
+from sprint4.core.url_shorteners import (
+    ExternalShortenerPool,
+    LocalShortener,
+    ShortenersEnum,
+)
+from sprint4.db.backends import get_url_repository
+from sprint4.models.clicks import (
+    ClickDelta,
+    ClickEvent,
+    ClickTimeseries,
+    HotUrl,
+    HttpUrlStatus,
+    RollupGranularity,
+    TopUrls,
+    TopWindow,
+)
 from sprint4.models.internal import ServiceStatistics
 from sprint4.models.urls import (
     HttpUrlAddRequest,
+    HttpUrlAddResult,
     HttpUrlFilter,
     HttpUrlModel,
     HttpUrlRow,
+    UrlRecordType,
 )
+from sprint4.services.bulk_ingest import (
+    REJECTS_FILE_PATTERN,
+    BulkIngestFormat,
+    BulkIngestSummary,
+    BulkUrlIngestor,
+)
+from sprint4.services.click_counter import ClickCounter
+from sprint4.services.click_log import ClickLogWriter
+from sprint4.services.click_queue import ClickQueue
+from sprint4.services.click_rollups import ClickRollupAggregator
+from sprint4.services.unique_visitors import UniqueVisitorCounter
+from sprint4.services.url_filter import UrlExistenceFilter
+
+
+LOGGER = logging.getLogger(__name__)
+
+_RedirectCacheKeyType = tuple[str, int | str]
+
+# the window seconds and slots, a window slides by a slot
+_TOP_WINDOWS: dict[TopWindow, tuple[float, int]] = {
+    TopWindow.minute: (60.0, 6),
+    TopWindow.hour: (3600.0, 12),
+    TopWindow.day: (86400.0, 24),
+}
+
+
+def _get_redirect_cache_key(url_filter: HttpUrlFilter) -> None | _RedirectCacheKeyType:
+    """Return the cache key for the filter looking a URL up by a single field."""
+
+    if (
+        url_filter.is_gone is not None
+        or url_filter.visibility is not None
+        or url_filter.nclicks is not None
+    ):
+        return None
+    keys = []
+    if url_filter.id is not None:
+        keys.append(("id", url_filter.id))
+    if url_filter.short_url:
+        keys.append(("short_url", str(url_filter.short_url)))
+    if url_filter.url:
+        keys.append(("url", str(url_filter.url)))
+    return keys[0] if len(keys) == 1 else None
+
+
+def _to_local_time(moment: None | datetime) -> None | datetime:
+    """Return the moment as the naive local time, the clicks are timed by."""
+
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone().replace(tzinfo=None)
+
+
+def _get_first_new_idxs(
+    hashes: list[bytes], existing: dict[bytes, HttpUrlRow]
+) -> dict[bytes, int]:
+    """Return the index of the first occurrence of each URL not stored yet."""
+
+    new_idxs: dict[bytes, int] = {}
+    for idx, url_hash in enumerate(hashes):
+        if url_hash not in existing and url_hash not in new_idxs:
+            new_idxs[url_hash] = idx
+    return new_idxs
+
+
+def _get_add_results(
+    hashes: list[bytes],
+    new_idxs: dict[bytes, int],
+    created: dict[bytes, HttpUrlRow],
+    existing: dict[bytes, HttpUrlRow],
+    errors: dict[bytes, str],
+) -> list[HttpUrlAddResult]:
+    """Report each posted URL: created by its first occurrence, else existing."""
+
+    results = []
+    for idx, url_hash in enumerate(hashes):
+        row = created.get(url_hash) or existing.get(url_hash)
+        if row is None:
+            error = errors.get(url_hash, "the short URL conflicts with another URL")
+            results.append(HttpUrlAddResult(status="failed", error=error))
+            continue
+        is_created = url_hash in created and new_idxs[url_hash] == idx
+        status = "created" if is_created else "existing"
+        results.append(HttpUrlAddResult(status=status, row=row))
+    return results
 
 
 class UrlShortenerService:
     def __init__(self) -> None:
-        self._repo = UrlRepository(
-            dsn=str(SETTINGS.postgres.dsn),
-            engine_settings=SETTINGS.postgres.engine_settings.model_dump(),
-            session_settings=SETTINGS.postgres.session_settings.model_dump(),
+        self._repo = get_url_repository(SETTINGS.repository)
+        self._local_shortener = LocalShortener(
+            domain=SETTINGS.shortener.domain,
+            code_length=SETTINGS.shortener.code_length,
+        )
+        self._external_shorteners = ExternalShortenerPool(
+            max_workers=SETTINGS.shortener.max_workers,
+            concurrency=SETTINGS.shortener.concurrency,
+            timeout=SETTINGS.shortener.timeout,
+            retries=SETTINGS.shortener.retries,
+            backoff=SETTINGS.shortener.backoff,
+        )
+        self._click_log = (
+            ClickLogWriter(
+                repo=self._repo,
+                batch_size=SETTINGS.clicks.log_batch_size,
+                flush_interval=SETTINGS.clicks.log_flush_interval,
+                max_pending=SETTINGS.clicks.log_max_pending,
+                partitions_ahead=SETTINGS.clicks.log_partitions_ahead,
+            )
+            if SETTINGS.clicks.log_enabled
+            else None
+        )
+        self._redirect_cache: LruTtlCache[_RedirectCacheKeyType, HttpUrlRow] = (
+            LruTtlCache(
+                maxsize=SETTINGS.cache.redirect_size,
+                ttl=SETTINGS.cache.redirect_ttl,
+            )
+        )
+        self._url_filter = (
+            UrlExistenceFilter(
+                repo=self._repo,
+                capacity=SETTINGS.url_filter.capacity,
+                fp_rate=SETTINGS.url_filter.fp_rate,
+                max_bytes=SETTINGS.url_filter.max_bytes,
+                refresh_interval=SETTINGS.url_filter.refresh_interval,
+                lookback=SETTINGS.url_filter.lookback,
+                rebuild_interval=SETTINGS.url_filter.rebuild_interval,
+                scan_batch_size=SETTINGS.url_filter.scan_batch_size,
+            )
+            if SETTINGS.url_filter.enabled
+            else None
         )
+        self._missing_urls: LruTtlCache[_RedirectCacheKeyType, bool] = LruTtlCache(
+            maxsize=SETTINGS.url_filter.missing_size,
+            ttl=SETTINGS.url_filter.missing_ttl,
+        )
+        self._click_counter = (
+            ClickCounter(
+                repo=self._repo,
+                flush_interval=SETTINGS.clicks.counter_flush_interval,
+                max_pending=SETTINGS.clicks.counter_max_pending,
+            )
+            if SETTINGS.clicks.write_behind
+            else None
+        )
+        # the write-behind counters do not wait for the database already
+        self._click_queue = (
+            ClickQueue(
+                repo=self._repo,
+                workers=SETTINGS.clicks.queue_workers,
+                max_pending=SETTINGS.clicks.queue_max_pending,
+                batch_size=SETTINGS.clicks.queue_batch_size,
+                overflow=SETTINGS.clicks.queue_overflow,
+            )
+            if not SETTINGS.clicks.write_behind and SETTINGS.clicks.queue_workers
+            else None
+        )
+        self._click_rollups = (
+            ClickRollupAggregator(
+                repo=self._repo,
+                flush_interval=SETTINGS.clicks.rollups_flush_interval,
+                max_pending=SETTINGS.clicks.rollups_max_pending,
+                retentions={
+                    RollupGranularity.minute: timedelta(
+                        days=SETTINGS.clicks.rollups_minute_retention
+                    ),
+                    RollupGranularity.hour: timedelta(
+                        days=SETTINGS.clicks.rollups_hour_retention
+                    ),
+                },
+            )
+            if SETTINGS.clicks.rollups_enabled
+            else None
+        )
+        self._unique_visitors = (
+            UniqueVisitorCounter(
+                repo=self._repo,
+                precision=SETTINGS.clicks.visitors_precision,
+                flush_interval=SETTINGS.clicks.visitors_flush_interval,
+                max_pending=SETTINGS.clicks.visitors_max_pending,
+            )
+            if SETTINGS.clicks.visitors_enabled
+            else None
+        )
+        self._top_urls: dict[TopWindow, SlidingTopK[int]] = (
+            {
+                window: SlidingTopK(
+                    window=seconds, slots=slots, capacity=SETTINGS.clicks.top_capacity
+                )
+                for window, (seconds, slots) in _TOP_WINDOWS.items()
+            }
+            if SETTINGS.clicks.top_enabled
+            else {}
+        )
+
+    async def startup(self) -> None:
+        """Warm the database pool up and start the service background tasks."""
+
+        try:
+            await self._repo.warm_up()
+        except Exception:
+            LOGGER.exception("failed to warm the database connection pool up")
+        if self._click_log:
+            await self._click_log.start()
+        if self._click_counter:
+            await self._click_counter.start()
+        if self._click_queue:
+            await self._click_queue.start()
+        if self._click_rollups:
+            await self._click_rollups.start()
+        if self._unique_visitors:
+            await self._unique_visitors.start()
+        if self._url_filter:
+            await self._url_filter.start()
+
+    async def shutdown(self) -> None:
+        """Release the service resources."""
+
+        if self._url_filter:
+            await self._url_filter.stop()
+        if self._unique_visitors:
+            await self._unique_visitors.stop()
+        if self._click_rollups:
+            await self._click_rollups.stop()
+        if self._click_queue:
+            await self._click_queue.stop()
+        if self._click_counter:
+            await self._click_counter.stop()
+        if self._click_log:
+            await self._click_log.stop()
+        self._external_shorteners.shutdown()
+        await self._repo.shutdown()
 
     async def get_stats(self) -> ServiceStatistics:
         """Return the service statistics."""
 
-        return ServiceStatistics()
+        return ServiceStatistics(
+            redirect_cache=self._redirect_cache.statistics(),
+            url_filter=self._url_filter.statistics() if self._url_filter else None,
+            db_pool=self._repo.pool_statistics(),
+            db_replicas=self._repo.replica_statistics(),
+            click_queue=self._click_queue.statistics() if self._click_queue else None,
+        )
+
+    def db_congestion(self) -> float:
+        """Return the average database pool wait while the pool is exhausted."""
+
+        return self._repo.pool_congestion()
 
     async def ping_db(self) -> None:
         """Ping the service database."""
 
         return await self._repo.ping()
 
-    async def add_urls(self, requests: list[HttpUrlAddRequest]) -> list[HttpUrlRow]:
+    def _cache_url(self, row: HttpUrlRow, key: None | _RedirectCacheKeyType) -> None:
+        self._redirect_cache.set(("id", row.id), row)
+        self._redirect_cache.set(("short_url", str(row.short_url)), row)
+        # the full URL is not unique, cached only as it has been looked up
+        if key and key[0] == "url":
+            self._redirect_cache.set(key, row)
+
+    def _may_exist(self, key: None | _RedirectCacheKeyType) -> bool:
+        """Return False if the URL looked up by the key is definitely missing."""
+
+        if self._url_filter is None or key is None:
+            return True
+        kind, value = key
+        if kind == "id":
+            return self._url_filter.may_contain_id(value)
+        if kind == "short_url":
+            return self._url_filter.may_contain_short_url(value)
+        return True
+
+    def _learn_url(self, url_id: int, short_url: str) -> None:
+        if self._url_filter:
+            self._url_filter.add(url_id, short_url)
+        self._missing_urls.pop(("id", url_id))
+        self._missing_urls.pop(("short_url", short_url))
+
+    async def _find_filtered_out(self, key: _RedirectCacheKeyType) -> HttpUrlRow:
+        """Look up the URL missed by the filter, remembering it if missing.
+
+        The other workers' URLs get into the filter on its refresh only,
+        a miss is not trusted until the database confirms it.
+        """
+
+        if self._missing_urls.get(key):
+            raise NoResultFound(f"No result for the {key[0]}={key[1]}")
+        try:
+            row = await self._repo.find_url(
+                url_filter=HttpUrlFilter(**{key[0]: key[1]})
+            )
+        except NoResultFound:
+            self._missing_urls.set(key, True)
+            raise
+        self._learn_url(row.id, str(row.short_url))
+        self._cache_url(row, key)
+        return row
+
+    def _invalidate_url(self, row: HttpUrlRow) -> None:
+        self._redirect_cache.pop(("id", row.id))
+        self._redirect_cache.pop(("short_url", str(row.short_url)))
+        self._redirect_cache.pop(("url", str(row.url)))
+
+    async def _count_click(
+        self, url_id: int, clicked_at: datetime, client_info: None | str
+    ) -> None:
+        """Count the click in memory or queue it, not waiting for the database."""
+
+        if self._click_counter:
+            self._click_counter.add(url_id, clicked_at, client_info)
+        else:
+            await self._click_queue.put(ClickDelta(url_id, 1, clicked_at, client_info))
+
+    def _record_click(
+        self,
+        url_id: int,
+        clicked_at: datetime,
+        ip: None | str,
+        user_agent: None | str,
+    ) -> None:
+        """Pass the click on to the click log and the statistics, never waiting."""
+
+        if self._click_log:
+            self._click_log.record(ClickEvent(url_id, clicked_at, ip, user_agent))
+        if self._click_rollups:
+            self._click_rollups.add(url_id, clicked_at)
+        if self._unique_visitors:
+            self._unique_visitors.add(url_id, ip, user_agent)
+        for top_urls in self._top_urls.values():
+            top_urls.add(url_id)
+
+    def _with_pending_clicks(self, row: HttpUrlRow) -> HttpUrlRow:
+        """Return the row with the clicks not yet flushed merged in."""
+
+        pending = self._click_counter.pending(row.id) if self._click_counter else None
+        if pending is None:
+            return row
+        return row.model_copy(
+            update={
+                "nclicks": row.nclicks + pending.nclicks,
+                "clicked_at": pending.clicked_at,
+                "client_info": pending.client_info,
+            }
+        )
+
+    def _add_pending_clicks(self, record: UrlRecordType) -> UrlRecordType:
+        """Merge the clicks not yet flushed into the record, in place."""
+
+        pending = (
+            self._click_counter.pending(record["id"]) if self._click_counter else None
+        )
+        if pending is not None:
+            record["nclicks"] += pending.nclicks
+            record["clicked_at"] = pending.clicked_at
+            record["client_info"] = pending.client_info
+        return record
+
+    async def _shorten_by_hash(self, urls: list[HttpUrlType]) -> list[str]:
+        """Return the collision-free hash-based short URLs.
+
+        A code colliding either with the database or with the batch itself
+        is regenerated with another salt.
+        """
+
+        salts = [0] * len(urls)
+        short_urls = [self._local_shortener.shorten(url) for url in urls]
+        accepted: set[str] = set()
+        pending = list(range(len(urls)))
+        for _ in range(SETTINGS.shortener.max_hash_attempts):
+            candidates = [short_urls[idx] for idx in pending]
+            taken = await self._repo.get_existing_short_urls(candidates)
+            collided = []
+            for idx in pending:
+                if short_urls[idx] in taken or short_urls[idx] in accepted:
+                    salts[idx] += 1
+                    short_urls[idx] = self._local_shortener.shorten(
+                        urls[idx], salt=salts[idx]
+                    )
+                    collided.append(idx)
+                else:
+                    accepted.add(short_urls[idx])
+            if not collided:
+                return short_urls
+            pending = collided
+        msg = f"failed to generate unique short URLs for {len(pending)} URL(s)"
+        raise UrlServiceError(msg)
+
+    async def _shorten(
+        self, requests: list[HttpUrlAddRequest]
+    ) -> tuple[list[None | int], list[str | BaseException]]:
+        """Return the reserved ids (if any) and the short URLs or failures."""
+
+        local_idxs = [
+            idx
+            for idx, request in enumerate(requests)
+            if request.shortener_code == ShortenersEnum.local
+        ]
+        ids: list[None | int] = [None] * len(requests)
+        short_urls: list[None | str | BaseException] = [None] * len(requests)
+        if local_idxs and SETTINGS.shortener.strategy == "id":
+            # reserving for the whole batch keeps the insert homogeneous
+            ids = list(await self._repo.reserve_ids(len(requests)))
+            for idx in local_idxs:
+                short_urls[idx] = self._local_shortener.encode_id(ids[idx])
+        elif local_idxs:
+            hashed = await self._shorten_by_hash([requests[i].url for i in local_idxs])
+            for idx, short_url in zip(local_idxs, hashed):
+                short_urls[idx] = short_url
+        external_idxs = [idx for idx, url in enumerate(short_urls) if url is None]
+        if external_idxs:
+            items = [
+                (requests[idx].shortener_code, requests[idx].url)
+                for idx in external_idxs
+            ]
+            shortened = await self._external_shorteners.shorten_many(
+                items, return_exceptions=True
+            )
+            for idx, short_url in zip(external_idxs, shortened):
+                short_urls[idx] = short_url
+        return ids, short_urls
+
+    async def add_urls(
+        self, requests: list[HttpUrlAddRequest]
+    ) -> list[HttpUrlAddResult]:
+        """Add the URLs, each one stored once whatever times it is posted.
+
+        The URLs already stored are looked up by their hashes first and are
+        neither shortened nor inserted again, so a retried batch costs one
+        statement. The result is reported per URL.
+        """
+
+        hashes = [request.url_hash for request in requests]
+        existing = await self._repo.get_urls_by_hashes(list(set(hashes)))
+        new_idxs = _get_first_new_idxs(hashes, existing)
+        new_requests = [requests[idx] for idx in new_idxs.values()]
+        ids, short_urls = await self._shorten(new_requests)
+        errors: dict[bytes, str] = {}
         urls: list[HttpUrlModel] = []
-        for request in requests:
-            sh = get_shortener(shortener_code=request.shortener_code)
-            url = request.url
-            urls.append(HttpUrlModel(url=url, short_url=sh.shorten(url)))
+        for request, url_id, short_url in zip(new_requests, ids, short_urls):
+            if isinstance(short_url, BaseException):
+                errors[request.url_hash] = str(short_url)
+                continue
+            urls.append(
+                HttpUrlModel(
+                    id=url_id,
+                    url=request.url,
+                    visibility=request.visibility,
+                    short_url=short_url,
+                )
+            )
         try:
-            return await self._repo.add_urls(url_models=urls)
+            rows = await self._repo.add_urls(url_models=urls)
         except UrlRepositoryError as e:
             raise UrlServiceError(str(e)) from e
+        created = {row.url_hash: row for row in rows}
+        for row in rows:
+            self._learn_url(row.id, str(row.short_url))
+        # the URLs skipped on conflict were inserted concurrently, most likely
+        skipped = [model.url_hash for model in urls if model.url_hash not in created]
+        existing.update(await self._repo.get_urls_by_hashes(skipped))
+        return _get_add_results(hashes, new_idxs, created, existing, errors)
+
+    async def ingest_urls(
+        self,
+        chunks: AsyncIterator[bytes],
+        fmt: BulkIngestFormat,
+        keep_rejects: bool = False,
+    ) -> BulkIngestSummary:
+        """Ingest the URLs from the streamed NDJSON or CSV body.
+
+        The short URLs are always made by the local shortener from the ids.
+        """
+
+        ingestor = BulkUrlIngestor(
+            repo=self._repo,
+            shortener=self._local_shortener,
+            chunk_size=SETTINGS.bulk.chunk_size,
+            max_line_bytes=SETTINGS.bulk.max_line_bytes,
+            rejects_dir=SETTINGS.bulk.rejects_dir if keep_rejects else None,
+        )
+        async for url_models in ingestor.ingest(chunks, fmt=fmt):
+            for model in url_models:
+                self._learn_url(model.id, str(model.short_url))
+        return ingestor.summary
+
+    def get_rejects_file(self, name: str) -> Path:
+        """Return the path of the bulk ingestion rejects file.
+
+        Raises:
+            UrlServiceError - if there is no such file
+        """
+
+        path = SETTINGS.bulk.rejects_dir / name
+        if not REJECTS_FILE_PATTERN.fullmatch(name) or not path.is_file():
+            raise UrlServiceError(f"no rejects file {name!r}")
+        return path
+
+    async def click_url(
+        self,
+        url_filter: HttpUrlFilter,
+        ip: None | str = None,
+        user_agent: None | str = None,
+    ) -> HttpUrlRow:
+        """Click the URL, raising `UrlGoneError` if it is marked "gone".
+
+        The click is queued for the click log, not written in place.
+        With the write-behind counters or the click queue, the URL is only
+        looked up (unless cached) and the click is counted in memory
+        or queued for the background workers, not yet in the returned row.
+        """
+
+        key = _get_redirect_cache_key(url_filter)
+        cached = self._redirect_cache.get(key) if key else None
+        if cached is None and not self._may_exist(key):
+            cached = await self._find_filtered_out(key)
+        if self._click_counter or self._click_queue:
+            if cached:
+                row = cached
+            else:
+                lookup = url_filter.model_copy(
+                    update={"client_info": None, "clicked_at": None}
+                )
+                row = await self._repo.find_url(url_filter=lookup)
+                self._cache_url(row, key)
+            if not row.is_gone:
+                clicked_at = datetime.now()
+                await self._count_click(row.id, clicked_at, url_filter.client_info)
+                self._record_click(row.id, clicked_at, ip, user_agent)
+                return self._with_pending_clicks(row)
+        elif cached and cached.is_gone:
+            row = cached
+        else:
+            if cached:  # the primary key is the cheapest lookup
+                url_filter = HttpUrlFilter(
+                    id=cached.id, client_info=url_filter.client_info
+                )
+            row = await self._repo.click_url(url_filter=url_filter)
+            self._cache_url(row, key)
+        if row.is_gone:
+            raise UrlGoneError(f"the URL id={row.id} is gone")
+        self._record_click(row.id, row.clicked_at, ip, user_agent)
+        return row
 
-    async def click_url(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
-        return await self._repo.click_url(url_filter=url_filter)
+    async def redirect(
+        self,
+        kind: str,
+        value: int | str,
+        client_info: None | str = None,
+        ip: None | str = None,
+        user_agent: None | str = None,
+    ) -> str:
+        """Click the URL looked up by `id`, `short_url` or `url`, return it.
+
+        The redirect fast path: a cached URL is clicked by the write-behind
+        counters (or the click queue) without the database nor the models.
+        The raw values may miss the cache keyed by the normalized ones,
+        then the URL is looked up and clicked by the validated filter.
+        """
+
+        cached = self._redirect_cache.get((kind, value))
+        if (
+            cached is not None
+            and (self._click_counter or self._click_queue)
+            and not cached.is_gone
+        ):
+            clicked_at = datetime.now()
+            await self._count_click(cached.id, clicked_at, client_info)
+            self._record_click(cached.id, clicked_at, ip, user_agent)
+            return str(cached.url)
+        url_filter = HttpUrlFilter.model_validate(
+            {kind: value, "client_info": client_info}
+        )
+        row = await self.click_url(url_filter=url_filter, ip=ip, user_agent=user_agent)
+        return str(row.url)
 
     async def delete_url(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
-        return await self._repo.delete_url(url_filter=url_filter)
+        row = await self._repo.delete_url(url_filter=url_filter)
+        self._invalidate_url(row)
+        if self._url_filter:
+            self._url_filter.remove(row.id, str(row.short_url))
+        return row
+
+    async def get_url_stats(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+        full_info: bool = False,
+        clicks_limit: int = 10,
+        clicks_offset: int = 0,
+        unique_visitors: bool = False,
+    ) -> list[HttpUrlStatus]:
+        """Return a page of the URL statuses.
+
+        With the `full_info`, each status lists a page of its clicks.
+        With the `unique_visitors`, each status has the distinct visitors
+        estimated, those not yet merged into the database included.
+        """
+
+        rows = await self._repo.get_urls(
+            url_filter=url_filter, after_id=after_id, limit=limit
+        )
+        statuses = [
+            HttpUrlStatus.model_validate(self._with_pending_clicks(row)) for row in rows
+        ]
+        if full_info:
+            for status in statuses:
+                status.clicks = await self._repo.get_clicks(
+                    url_id=status.id, limit=clicks_limit, offset=clicks_offset
+                )
+        if unique_visitors and self._unique_visitors:
+            await self._estimate_unique_visitors(statuses)
+        return statuses
+
+    async def _estimate_unique_visitors(self, statuses: list[HttpUrlStatus]) -> None:
+        counter = self._unique_visitors
+        url_ids = [status.id for status in statuses]
+        stored = await self._repo.get_visitor_sketches(url_ids)
+        for status in statuses:
+            sketch = HyperLogLog(counter.precision)
+            if status.id in stored:
+                # the sketch of another precision is replaced on the next merge
+                try:
+                    sketch.merge(HyperLogLog.from_bytes(stored[status.id]))
+                except ValueError:
+                    LOGGER.warning("skipped the visitor sketch of URL id=%d", status.id)
+            pending = counter.pending(status.id)
+            if pending is not None:
+                sketch.merge(pending)
+            status.unique_visitors = sketch.count()
+
+    async def get_url_records(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+    ) -> list[UrlRecordType]:
+        """Return a page of the URL statuses as the plain records.
+
+        The lean `get_url_stats`, with neither the clicks nor the visitors:
+        the records are not validated, but serialized as they are.
+        """
+
+        records = await self._repo.get_url_records(
+            url_filter=url_filter, after_id=after_id, limit=limit
+        )
+        return [self._add_pending_clicks(record) for record in records]
 
-    async def get_url_stats(self, url_filter: HttpUrlFilter) -> list[HttpUrlRow]:
-        return await self._repo.get_urls(url_filter=url_filter)
+    async def stream_url_stats(
+        self,
+        url_filter: HttpUrlFilter,
+        after_id: None | int = None,
+        limit: None | int = None,
+    ) -> AsyncIterator[list[UrlRecordType]]:
+        """Stream the URL statuses as the plain records, one batch at a time."""
+
+        async for records in self._repo.stream_url_records(
+            url_filter=url_filter,
+            after_id=after_id,
+            limit=limit,
+            batch_size=SETTINGS.statuses.stream_batch_size,
+        ):
+            yield [self._add_pending_clicks(record) for record in records]
+
+    def get_top_urls(self, n: int, window: TopWindow) -> TopUrls:
+        """Return the `n` URLs most clicked within the window, from memory.
+
+        The URLs are tracked by each worker process apart, so the counts
+        are those of the clicks served by this worker.
+
+        Raises:
+            UrlServiceError - if the tracking is disabled
+        """
+
+        top_urls = self._top_urls.get(window)
+        if top_urls is None:
+            raise UrlServiceError("the top URLs are not tracked")
+        return TopUrls(
+            window=window,
+            urls=[
+                HotUrl(id=url_id, nclicks=nclicks, error=error)
+                for url_id, nclicks, error in top_urls.top(n)
+            ],
+        )
+
+    async def get_click_timeseries(
+        self,
+        url_id: int,
+        granularity: RollupGranularity,
+        since: None | datetime = None,
+        until: None | datetime = None,
+    ) -> ClickTimeseries:
+        """Return the clicks of the URL per bucket, read from the rollups only.
+
+        The series ends now and spans `timeseries_max_buckets` buckets
+        by default. The bounds are widened to the buckets they fall in,
+        the end remaining exclusive.
+
+        Raises:
+            UrlServiceError - if the series is empty or too long
+        """
+
+        step = granularity.step
+        max_buckets = SETTINGS.clicks.timeseries_max_buckets
+        since = _to_local_time(since)
+        until = _to_local_time(until) or datetime.now()
+        if granularity.truncate(until) != until:
+            until = granularity.truncate(until) + step
+        since = granularity.truncate(since) if since else until - step * max_buckets
+        if since >= until:
+            raise UrlServiceError("the series start is past its end")
+        if (until - since) / step > max_buckets:
+            raise UrlServiceError(f"the series exceeds {max_buckets} buckets")
+        buckets = await self._repo.get_click_timeseries(
+            url_id, granularity=granularity, since=since, until=until
+        )
+        return ClickTimeseries(
+            url_id=url_id,
+            granularity=granularity,
+            since=since,
+            until=until,
+            buckets=buckets,
+        )
 
     async def mark_url_gone(self, url_filter: HttpUrlFilter) -> HttpUrlRow:
-        return await self._repo.mark_url_gone(url_filter=url_filter)
+        row = await self._repo.mark_url_gone(url_filter=url_filter)
+        self._invalidate_url(row)
+        return row
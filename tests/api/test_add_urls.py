@@ -0,0 +1,96 @@
+import pytest
+
+from sprint4.api import URL_SHORTENER_SERVICE
+from sprint4.core.url_shorteners import ShortenerError
+
+
+class FakeShortenerPool:
+    async def shorten_many(self, items, return_exceptions=False):
+        return [
+            (
+                ShortenerError(f"cannot shorten {url}")
+                if "fail" in str(url)
+                else f"https://short.invalid/{idx}"
+            )
+            for idx, (_, url) in enumerate(items)
+        ]
+
+
+@pytest.fixture
+def external_shorteners(monkeypatch):
+    monkeypatch.setattr(
+        URL_SHORTENER_SERVICE, "_external_shorteners", FakeShortenerPool()
+    )
+
+
+def _post(client, *urls: str, shortener_code: str = "local") -> list[dict]:
+    response = client.post(
+        "/urls/", json=[{"url": url, "shortener_code": shortener_code} for url in urls]
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_add_urls(client, unique_url):
+    first, second = _post(client, unique_url(), unique_url())
+
+    assert first["status"] == second["status"] == "created"
+    assert first["row"]["id"] != second["row"]["id"]
+    assert first["error"] is None
+
+
+def test_duplicates_within_batch(client, unique_url):
+    url = unique_url()
+
+    first, other, second = _post(client, url, unique_url(), url)
+
+    assert [first["status"], other["status"], second["status"]] == [
+        "created",
+        "created",
+        "existing",
+    ]
+    assert first["row"] == second["row"]
+
+
+def test_existing_url(client, add_url):
+    row = add_url()
+
+    (result,) = _post(client, row["url"])
+
+    assert result["status"] == "existing"
+    assert result["row"]["id"] == row["id"]
+    assert result["row"]["short_url"] == row["short_url"]
+
+
+def test_existing_url_normalized(client, unique_url):
+    url = unique_url().replace("https://example.com", "https://EXAMPLE.com:443")
+
+    (created,) = _post(client, url)
+    (existing,) = _post(client, url.lower().replace(":443", ""))
+
+    assert existing["status"] == "existing"
+    assert existing["row"]["id"] == created["row"]["id"]
+
+
+def test_retried_batch_not_duplicated(client, unique_url):
+    urls = [unique_url() for _ in range(3)]
+
+    created = _post(client, *urls)
+    retried = _post(client, *urls)
+
+    assert [result["status"] for result in retried] == ["existing"] * 3
+    assert [result["row"] for result in retried] == [
+        result["row"] for result in created
+    ]
+
+
+def test_failed_external_shortener(client, unique_url, external_shorteners):
+    ok, failed = _post(
+        client, unique_url(), unique_url("/fail"), shortener_code="clckru"
+    )
+
+    assert ok["status"] == "created"
+    assert ok["row"]["short_url"].startswith("https://short.invalid/")
+    assert failed["status"] == "failed"
+    assert failed["row"] is None
+    assert "cannot shorten" in failed["error"]
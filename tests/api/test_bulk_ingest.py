@@ -0,0 +1,70 @@
+import orjson
+
+
+def _ndjson(*records) -> bytes:
+    return b"".join(
+        (record if isinstance(record, bytes) else orjson.dumps(record)) + b"\n"
+        for record in records
+    )
+
+
+def test_ingest_ndjson(client, unique_url):
+    first, second = unique_url(), unique_url()
+    body = _ndjson(
+        {"url": first},
+        {"url": second, "visibility": "private"},
+        {"url": first},  # a duplicate within the body
+        {"url": "not a url"},
+        b"{broken json",
+    )
+
+    response = client.post("/urls/bulk", content=body)
+
+    assert response.status_code == 201
+    summary = response.json()
+    assert summary["received"] == 5
+    assert summary["accepted"] == 3
+    assert summary["rejected"] == 2
+    assert summary["inserted"] == 2
+    assert summary["duplicates"] == 1
+    assert summary["rejects_file"] is None
+    response = client.get(f"/statuses/full-url/{second}")
+    (status,) = response.json()
+    assert status["visibility"] == "private"
+    assert client.get(f"/urls/{status['id']}").status_code == 307
+
+
+def test_ingest_existing_urls(client, add_url):
+    row = add_url()
+
+    response = client.post("/urls/bulk", content=_ndjson({"url": row["url"]}))
+
+    assert response.json()["duplicates"] == 1
+
+
+def test_ingest_csv(client, unique_url):
+    body = f"url,visibility\n{unique_url()},public\n{unique_url()},private\n"
+
+    response = client.post("/urls/bulk", params={"format": "csv"}, content=body)
+
+    assert response.status_code == 201
+    assert response.json()["inserted"] == 2
+
+
+def test_ingest_rejects_file(client, unique_url):
+    body = _ndjson({"url": unique_url()}, {"url": "not a url"})
+
+    response = client.post("/urls/bulk", params={"rejects": True}, content=body)
+
+    name = response.json()["rejects_file"]
+    response = client.get(f"/urls/bulk/rejects/{name}")
+    assert response.status_code == 200
+    (reject,) = [orjson.loads(line) for line in response.content.splitlines()]
+    assert reject["line"] == 2
+    assert reject["data"] == '{"url":"not a url"}'
+
+
+def test_unknown_rejects_file(client):
+    response = client.get("/urls/bulk/rejects/..%2Fpasswd")
+
+    assert response.status_code == 404
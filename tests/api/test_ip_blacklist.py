@@ -0,0 +1,87 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from sprint4.api.rest.middlewares import IpBlacklistMiddleware
+
+
+async def _ok(request):
+    return PlainTextResponse("ok")
+
+
+APP = Starlette(routes=[Route("/", _ok)])
+
+
+async def _get(app, ip: str, headers: None | dict = None) -> int:
+    transport = httpx.ASGITransport(app=app, client=(ip, 12345))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/", headers=headers)
+    return response.status_code
+
+
+@pytest.fixture
+def blacklist(tmp_path):
+    path = tmp_path / "blacklist.txt"
+    path.write_text("10.0.0.0/8\nnot a network\n")
+    return path
+
+
+async def test_static_networks():
+    app = IpBlacklistMiddleware(APP, networks=["192.168.0.0/16", "2001:db8::/32"])
+
+    assert await _get(app, "192.168.1.1") == 400
+    assert await _get(app, "2001:db8::1") == 400
+    assert await _get(app, "127.0.0.1") == 200
+
+
+async def test_networks_file(blacklist):
+    app = IpBlacklistMiddleware(APP, networks=["192.168.0.0/16"], path=blacklist)
+
+    assert await _get(app, "10.1.2.3") == 400
+    assert await _get(app, "192.168.1.1") == 400
+    assert await _get(app, "127.0.0.1") == 200
+
+
+async def test_networks_file_reloaded(blacklist):
+    app = IpBlacklistMiddleware(APP, path=blacklist, reload_interval=0)
+    blacklist.write_text("127.0.0.0/8\n")
+    # the modification time may not change within the clock resolution
+    stat = os.stat(blacklist)
+    os.utime(blacklist, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    # the request triggering the reload is checked against the old list
+    assert await _get(app, "10.1.2.3") == 400
+    for _ in range(100):
+        if await _get(app, "127.0.0.1") == 400:
+            break
+        await asyncio.sleep(0.01)
+    assert await _get(app, "127.0.0.1") == 400
+    assert await _get(app, "10.1.2.3") == 200
+
+
+async def test_missing_networks_file(tmp_path):
+    app = IpBlacklistMiddleware(APP, networks=["10.0.0.0/8"], path=tmp_path / "none")
+
+    assert await _get(app, "10.1.2.3") == 400
+    assert await _get(app, "127.0.0.1") == 200
+
+
+async def test_forwarded_client_behind_trusted_proxy():
+    app = IpBlacklistMiddleware(
+        APP, networks=["10.0.0.0/8"], trusted_proxies=["172.16.0.0/12"]
+    )
+    forwarded = {"X-Forwarded-For": "10.1.2.3, 172.16.0.2"}
+
+    assert await _get(app, "172.16.0.1", headers=forwarded) == 400
+    assert await _get(app, "172.16.0.1", headers={"X-Forwarded-For": "1.2.3.4"}) == 200
+
+
+async def test_forwarded_for_ignored_from_untrusted_peer():
+    app = IpBlacklistMiddleware(APP, networks=["10.0.0.0/8"])
+
+    assert await _get(app, "1.2.3.4", headers={"X-Forwarded-For": "10.1.2.3"}) == 200
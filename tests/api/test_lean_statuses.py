@@ -0,0 +1,69 @@
+from functools import partial
+
+import pytest
+
+from sprint4.api import URL_SHORTENER_SERVICE
+from sprint4.api.rest.routes.urls import NEXT_AFTER_ID_HEADER
+from sprint4.models.urls import HttpUrlFilter
+
+
+@pytest.fixture
+def rows(client, add_url):
+    rows = [add_url() for _ in range(3)]
+    for row, nclicks in zip(rows, (2, 0, 1)):
+        for _ in range(nclicks):
+            client.get(f"/urls/{row['id']}", headers={"User-Agent": "curl"})
+    return rows
+
+
+def _get_page(client, rows: list[dict]) -> list[dict]:
+    response = client.get(
+        "/statuses/all", params={"after_id": rows[0]["id"] - 1, "limit": len(rows)}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers[NEXT_AFTER_ID_HEADER] == str(rows[-1]["id"])
+    return response.json()
+
+
+def test_lean_statuses_as_models(client, rows):
+    statuses = client.portal.call(
+        partial(
+            URL_SHORTENER_SERVICE.get_url_stats,
+            url_filter=HttpUrlFilter(),
+            after_id=rows[0]["id"] - 1,
+            limit=len(rows),
+        )
+    )
+
+    assert _get_page(client, rows) == [
+        status.model_dump(mode="json") for status in statuses
+    ]
+
+
+def test_lean_statuses_with_pending_clicks(client, rows):
+    page = _get_page(client, rows)
+
+    assert [status["nclicks"] for status in page] == [2, 0, 1]
+    assert [bool(status["client_info"]) for status in page] == [True, False, True]
+    assert page[1]["clicked_at"] is None
+    assert {(status["clicks"], status["unique_visitors"]) for status in page} == {
+        (None, None)
+    }
+
+
+def test_lean_statuses_after_flush(client, rows):
+    before = _get_page(client, rows)
+    assert client.portal.call(URL_SHORTENER_SERVICE._click_counter.flush)
+
+    assert _get_page(client, rows) == before
+
+
+def test_full_statuses_not_lean(client, rows):
+    response = client.get(f"/statuses/{rows[0]['id']}", params={"full_info": True})
+
+    (status,) = response.json()
+    assert status["nclicks"] == 2
+    # the clicks are logged in the background
+    assert isinstance(status["clicks"], list)
+    assert status["unique_visitors"] == 1
@@ -0,0 +1,54 @@
+from prometheus_client import REGISTRY
+
+
+def _get_count(route: str, status: str, method: str = "GET") -> float:
+    labels = {"method": method, "route": route, "status": status}
+    return REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+
+
+def _get_duration_count(route: str, method: str = "GET") -> float:
+    labels = {"method": method, "route": route}
+    value = REGISTRY.get_sample_value("http_request_duration_seconds_count", labels)
+    return value or 0.0
+
+
+def test_requests_counted_by_route_template(client, add_url):
+    row = add_url()
+    before = _get_count("/urls/{url_id}", "307")
+    durations_before = _get_duration_count("/urls/{url_id}")
+
+    for _ in range(2):
+        client.get(f"/urls/{row['id']}")
+
+    assert _get_count("/urls/{url_id}", "307") == before + 2
+    assert _get_duration_count("/urls/{url_id}") == durations_before + 2
+
+
+def test_api_routes_counted(client, add_url):
+    row = add_url()
+    before = _get_count("/statuses/{url_id}", "200")
+
+    client.get(f"/statuses/{row['id']}")
+
+    assert _get_count("/statuses/{url_id}", "200") == before + 1
+
+
+def test_unmatched_requests_counted(client):
+    before = _get_count("<unmatched>", "404")
+
+    client.get("/no/such/route")
+
+    assert _get_count("<unmatched>", "404") == before + 1
+
+
+def test_metrics_endpoint(client):
+    client.get("/stats")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert b'http_requests_total{method="GET",route="/stats",status="200"}' in (
+        response.content
+    )
+    assert b"http_requests_in_progress" in response.content
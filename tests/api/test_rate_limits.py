@@ -0,0 +1,104 @@
+import httpx
+import pytest
+from starlette.routing import Route
+
+from sprint4.api.rest.app import APP
+from sprint4.api.rest.middlewares import RateLimitMiddleware, get_route_class
+from sprint4.core.rate_limits import TokenBucketLimiter
+
+
+_CLIENT = ("203.0.113.7", 40000)
+
+
+@pytest.fixture
+def row_paths(add_url):
+    row = add_url()
+    return [
+        f"/urls/{row['id']}",
+        f"/urls/short-url/{row['short_url']}",
+        f"/urls/full-url/{row['url']}",
+    ]
+
+
+def _request_all(client, app, paths: list[str]) -> list[httpx.Response]:
+    """Send the requests one by one through the app, from the same client IP."""
+
+    async def request_all() -> list[httpx.Response]:
+        transport = httpx.ASGITransport(app=app, client=_CLIENT)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as http_client:
+            return [await http_client.get(path) for path in paths]
+
+    # the session client's event loop, the service runs in
+    return client.portal.call(request_all)
+
+
+def _limit(burst: int, **kwargs) -> RateLimitMiddleware:
+    limiters = {
+        route_class: TokenBucketLimiter(rate=0.001, burst=burst)
+        for route_class in ("redirects", "uploads", "scans")
+    }
+    kwargs.setdefault("get_db_congestion", lambda: 0.0)
+    return RateLimitMiddleware(APP, limiters=limiters, **kwargs)
+
+
+def test_redirect_routes_are_limited_as_redirects(row_paths):
+    for path in row_paths:
+        assert get_route_class("GET", path) == "redirects"
+
+
+def test_every_redirect_route_is_classified():
+    redirect_routes = [
+        route
+        for route in APP.routes
+        if isinstance(route, Route)
+        and route.path.startswith("/urls/")
+        and "GET" in (route.methods or ())
+        and "bulk" not in route.path
+    ]
+
+    assert len(redirect_routes) == 3
+    for route in redirect_routes:
+        path = route.path_format.format(url_id=1, short_url="x", url="x")
+        assert get_route_class("GET", path) == "redirects", route.path
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "route_class"),
+    [
+        ("POST", "/urls/", "uploads"),
+        ("POST", "/urls/bulk", "uploads"),
+        ("GET", "/urls/bulk/rejects/rejects.ndjson", None),
+        ("GET", "/statuses/all", "scans"),
+        ("DELETE", "/urls/1", None),
+        ("GET", "/metrics", None),
+    ],
+)
+def test_route_classes(method, path, route_class):
+    assert get_route_class(method, path) == route_class
+
+
+def test_redirects_over_the_limit_rejected(client, row_paths):
+    app = _limit(burst=3)
+
+    responses = _request_all(client, app, row_paths + row_paths)
+
+    statuses = [response.status_code for response in responses]
+    assert statuses == [307] * 3 + [429] * 3
+    assert int(responses[-1].headers["retry-after"]) >= 1
+
+
+def test_redirects_shed_while_db_congested(client, row_paths):
+    app = _limit(
+        burst=100,
+        get_db_congestion=lambda: 1.0,
+        shed_wait_time=0.5,
+        shed_classes=["redirects"],
+        shed_retry_after=2,
+    )
+
+    responses = _request_all(client, app, row_paths)
+
+    assert [response.status_code for response in responses] == [503] * 3
+    assert responses[0].headers["retry-after"] == "2"
@@ -0,0 +1,89 @@
+import pytest
+
+
+@pytest.fixture
+def row(add_url):
+    return add_url()
+
+
+def test_redirect_by_id(client, row):
+    response = client.get(f"/urls/{row['id']}")
+
+    assert response.status_code == 307
+    assert response.headers["location"] == row["url"]
+    assert response.content == b""
+
+
+def test_redirect_by_short_url(client, row):
+    response = client.get(f"/urls/short-url/{row['short_url']}")
+
+    assert response.status_code == 307
+    assert response.headers["location"] == row["url"]
+
+
+def test_redirect_by_full_url(client, row):
+    response = client.get(f"/urls/full-url/{row['url']}")
+
+    assert response.status_code == 307
+    assert response.headers["location"] == row["url"]
+
+
+def test_redirect_counts_clicks(client, row):
+    for _ in range(3):
+        client.get(f"/urls/{row['id']}")
+
+    response = client.get(f"/statuses/{row['id']}")
+
+    assert response.json()[0]["nclicks"] == 3
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/1", "/short-url/http://localhost:8080/abc", "/full-url/https://example.com"],
+)
+def test_redirects_not_served_at_root(client, path):
+    response = client.get(path)
+
+    assert response.status_code == 404
+
+
+def test_redirect_unknown_id(client):
+    response = client.get("/urls/999999999")
+
+    assert response.status_code == 404
+
+
+def test_redirect_invalid_id(client):
+    response = client.get("/urls/not-a-number")
+
+    assert response.status_code == 422
+
+
+def test_redirect_gone_url(client, row):
+    response = client.delete(f"/urls/{row['id']}", params={"mark_gone": True})
+    assert response.status_code == 200
+
+    response = client.get(f"/urls/{row['id']}")
+
+    assert response.status_code == 410
+
+
+def test_redirect_deleted_url(client, row):
+    # cached by the first redirect, dropped from the cache by the deletion
+    assert client.get(f"/urls/short-url/{row['short_url']}").status_code == 307
+    response = client.delete(f"/urls/{row['id']}")
+    assert response.status_code == 410
+
+    response = client.get(f"/urls/short-url/{row['short_url']}")
+
+    assert response.status_code == 404
+
+
+def test_redirect_cache_statistics(client, row):
+    client.get(f"/urls/{row['id']}")
+    client.get(f"/urls/{row['id']}")
+
+    statistics = client.get("/stats").json()["redirect_cache"]
+
+    assert statistics["hits"] >= 1
+    assert statistics["size"] >= 1
@@ -0,0 +1,84 @@
+import orjson
+import pytest
+
+from sprint4.api.rest.routes.urls import NEXT_AFTER_ID_HEADER
+
+
+@pytest.fixture
+def rows(add_url):
+    return [add_url() for _ in range(5)]
+
+
+def _get_all_pages(client, limit: int) -> list[dict]:
+    statuses = []
+    params = {"limit": limit}
+    while True:
+        response = client.get("/statuses/all", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= limit
+        statuses.extend(page)
+        after_id = response.headers.get(NEXT_AFTER_ID_HEADER)
+        if after_id is None:
+            return statuses
+        assert after_id == str(page[-1]["id"])
+        params["after_id"] = after_id
+
+
+def test_statuses_by_pages(client, rows):
+    statuses = _get_all_pages(client, limit=2)
+
+    ids = [status["id"] for status in statuses]
+    assert ids == sorted(set(ids))
+    assert {row["id"] for row in rows} <= set(ids)
+
+
+def test_statuses_after_id(client, rows):
+    response = client.get(
+        "/statuses/all", params={"after_id": rows[1]["id"], "limit": 2}
+    )
+
+    assert [status["id"] for status in response.json()] == [
+        rows[2]["id"],
+        rows[3]["id"],
+    ]
+    assert response.headers[NEXT_AFTER_ID_HEADER] == str(rows[3]["id"])
+
+
+def test_statuses_last_page(client, rows):
+    response = client.get(
+        "/statuses/all", params={"after_id": rows[-1]["id"], "limit": 2}
+    )
+
+    assert response.json() == []
+    assert NEXT_AFTER_ID_HEADER not in response.headers
+
+
+def test_statuses_stream(client, rows):
+    response = client.get("/statuses/all", params={"stream": True})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    streamed = [orjson.loads(line) for line in response.content.splitlines()]
+    # the rows alone are streamed, with neither clicks nor visitors
+    paged = [
+        {key: value for key, value in status.items() if key in streamed[0]}
+        for status in _get_all_pages(client, limit=3)
+    ]
+    assert streamed == paged
+
+
+def test_statuses_stream_after_id(client, rows):
+    response = client.get(
+        "/statuses/all", params={"stream": True, "after_id": rows[2]["id"]}
+    )
+
+    streamed = [orjson.loads(line) for line in response.content.splitlines()]
+    assert [status["id"] for status in streamed] == [rows[3]["id"], rows[4]["id"]]
+
+
+@pytest.mark.parametrize("params", [{"limit": 0}, {"after_id": -1}])
+def test_statuses_invalid_page(client, params):
+    response = client.get("/statuses/all", params=params)
+
+    assert response.status_code == 422
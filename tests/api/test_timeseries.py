@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from sprint4.core.settings import SETTINGS
+from sprint4.api import URL_SHORTENER_SERVICE
+
+
+@pytest.fixture
+def row(add_url):
+    return add_url()
+
+
+def _flush_rollups(client) -> None:
+    # the rollups are flushed every few seconds otherwise
+    assert client.portal.call(URL_SHORTENER_SERVICE._click_rollups.flush)
+
+
+@pytest.mark.parametrize("granularity", ["minute", "hour", "day"])
+def test_timeseries(client, row, granularity):
+    for _ in range(3):
+        client.get(f"/urls/{row['id']}")
+    _flush_rollups(client)
+
+    response = client.get(
+        f"/statuses/{row['id']}/timeseries", params={"granularity": granularity}
+    )
+
+    assert response.status_code == 200
+    series = response.json()
+    assert series["url_id"] == row["id"]
+    assert series["granularity"] == granularity
+    # the clicks may straddle a bucket boundary
+    assert sum(bucket["nclicks"] for bucket in series["buckets"]) == 3
+    for bucket in series["buckets"]:
+        assert series["since"] <= bucket["bucket"] < series["until"]
+
+
+def test_timeseries_window(client, row):
+    client.get(f"/urls/{row['id']}")
+    _flush_rollups(client)
+    now = datetime.now()
+
+    response = client.get(
+        f"/statuses/{row['id']}/timeseries",
+        params={
+            "granularity": "minute",
+            "from": (now - timedelta(minutes=30)).isoformat(),
+            "to": (now - timedelta(minutes=10)).isoformat(),
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json()["buckets"] == []
+
+
+def test_timeseries_without_clicks(client, row):
+    response = client.get(f"/statuses/{row['id']}/timeseries")
+
+    assert response.status_code == 200
+    assert response.json()["buckets"] == []
+
+
+def test_timeseries_start_past_end(client, row):
+    now = datetime.now()
+
+    response = client.get(
+        f"/statuses/{row['id']}/timeseries",
+        params={
+            "from": now.isoformat(),
+            "to": (now - timedelta(days=1)).isoformat(),
+        },
+    )
+
+    assert response.status_code == 422
+
+
+def test_timeseries_too_long(client, row):
+    max_buckets = SETTINGS.clicks.timeseries_max_buckets
+
+    response = client.get(
+        f"/statuses/{row['id']}/timeseries",
+        params={
+            "granularity": "minute",
+            "from": (datetime.now() - timedelta(minutes=max_buckets + 2)).isoformat(),
+        },
+    )
+
+    assert response.status_code == 422
+    assert str(max_buckets) in response.json()["detail"]
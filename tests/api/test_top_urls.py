@@ -0,0 +1,46 @@
+import pytest
+
+from sprint4.core.settings import SETTINGS
+
+
+def _click(client, row: dict, count: int) -> None:
+    for _ in range(count):
+        assert client.get(f"/urls/{row['id']}").status_code == 307
+
+
+def test_top_urls(client, add_url):
+    # more than any other test clicks a URL
+    first, second = add_url(), add_url()
+    _click(client, first, 30)
+    _click(client, second, 20)
+
+    response = client.get("/statuses/top", params={"n": 2, "window": "1m"})
+
+    assert response.status_code == 200
+    top = response.json()
+    assert top["window"] == "1m"
+    assert top["urls"] == [
+        {"id": first["id"], "nclicks": 30, "error": 0},
+        {"id": second["id"], "nclicks": 20, "error": 0},
+    ]
+
+
+@pytest.mark.parametrize("window", ["1m", "1h", "24h"])
+def test_top_urls_windows(client, add_url, window):
+    row = add_url()
+    _click(client, row, 1)
+
+    response = client.get("/statuses/top", params={"n": 100, "window": window})
+
+    assert response.status_code == 200
+    assert row["id"] in {url["id"] for url in response.json()["urls"]}
+
+
+@pytest.mark.parametrize(
+    "params",
+    [{"n": 0}, {"n": SETTINGS.clicks.top_max_n + 1}, {"window": "2m"}],
+)
+def test_top_urls_invalid(client, params):
+    response = client.get("/statuses/top", params=params)
+
+    assert response.status_code == 422
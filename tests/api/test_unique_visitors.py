@@ -0,0 +1,47 @@
+import pytest
+
+from sprint4.api import URL_SHORTENER_SERVICE
+
+
+@pytest.fixture
+def row(add_url):
+    return add_url()
+
+
+def _visit(client, row: dict, agents: list[str]) -> None:
+    for agent in agents:
+        response = client.get(f"/urls/{row['id']}", headers={"User-Agent": agent})
+        assert response.status_code == 307
+
+
+def _get_unique_visitors(client, row: dict) -> int:
+    (status,) = client.get(f"/statuses/{row['id']}").json()
+    return status["unique_visitors"]
+
+
+def test_unique_visitors(client, row):
+    _visit(client, row, ["curl", "wget", "curl", "httpie", "curl"])
+
+    assert _get_unique_visitors(client, row) == 3
+
+
+def test_unique_visitors_merged(client, row):
+    _visit(client, row, ["curl", "wget"])
+    # the stored sketch and the pending one are counted together
+    assert client.portal.call(URL_SHORTENER_SERVICE._unique_visitors.flush)
+    _visit(client, row, ["wget", "httpie"])
+
+    assert _get_unique_visitors(client, row) == 3
+
+
+def test_no_visitors(client, row):
+    assert _get_unique_visitors(client, row) == 0
+
+
+def test_unique_visitors_per_url(client, add_url):
+    first, second = add_url(), add_url()
+    _visit(client, first, ["curl", "wget"])
+    _visit(client, second, ["curl"])
+
+    assert _get_unique_visitors(client, first) == 2
+    assert _get_unique_visitors(client, second) == 1
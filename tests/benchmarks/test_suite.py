@@ -0,0 +1,128 @@
+import asyncio
+
+import click
+import httpx
+import orjson
+import pytest
+from click.testing import CliRunner
+
+from benchmarks.suite import _check_redirect, _measure, _summarize, cli
+
+
+def _response(status_code: int, headers: None | dict = None) -> httpx.Response:
+    request = httpx.Request("GET", "http://test/urls/1")
+    return httpx.Response(status_code, headers=headers, request=request)
+
+
+def test_check_redirect():
+    _check_redirect(_response(307, {"Location": "https://example.com"}))
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        _response(404),
+        _response(405),
+        _response(200, {"Location": "https://example.com"}),
+        _response(307),
+    ],
+)
+def test_check_not_redirect(response):
+    with pytest.raises(click.ClickException, match="/urls/1"):
+        _check_redirect(response)
+
+
+async def test_measure():
+    called: list[int] = []
+    running = peak = 0
+
+    async def call(idx: int) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        called.append(idx)
+        running -= 1
+
+    latencies, elapsed = await _measure(call, count=20, concurrency=4)
+
+    assert sorted(called) == list(range(20))
+    assert len(latencies) == 20
+    assert peak == 4
+    assert elapsed >= max(latencies)
+
+
+def test_summarize():
+    latencies = [idx / 1000 for idx in range(1, 101)]
+
+    result = _summarize("redirects", {"by": "id"}, latencies, elapsed=2.0)
+
+    assert result["scenario"] == "redirects"
+    assert result["calls"] == 100
+    assert result["p50_ms"] == pytest.approx(50.5)
+    assert result["p99_ms"] == pytest.approx(99.99)
+    assert result["throughput"] == 50
+    assert result["unit"] == "requests/s"
+
+
+def test_summarize_single_call():
+    result = _summarize("add_urls", {}, [0.01], elapsed=0.01, items_per_call=100)
+
+    assert result["p50_ms"] == result["p99_ms"] == pytest.approx(10)
+    assert result["throughput"] == pytest.approx(10_000)
+
+
+def _write_results(path, *results) -> str:
+    path.write_bytes(orjson.dumps({"results": list(results)}))
+    return str(path)
+
+
+def _result(scenario: str, p99_ms: float, throughput: float) -> dict:
+    return {
+        "scenario": scenario,
+        "params": {"concurrency": 16},
+        "p99_ms": p99_ms,
+        "throughput": throughput,
+    }
+
+
+def test_compare_no_regression(tmp_path):
+    baseline = _write_results(tmp_path / "old.json", _result("redirects", 10, 1000))
+    current = _write_results(tmp_path / "new.json", _result("redirects", 10.5, 980))
+
+    result = CliRunner().invoke(cli, ["compare", baseline, current])
+
+    assert result.exit_code == 0, result.output
+    assert "REGRESSED" not in result.output
+
+
+@pytest.mark.parametrize("p99_ms, throughput", [(12, 1000), (10, 850)])
+def test_compare_regression(tmp_path, p99_ms, throughput):
+    baseline = _write_results(tmp_path / "old.json", _result("redirects", 10, 1000))
+    current = _write_results(
+        tmp_path / "new.json", _result("redirects", p99_ms, throughput)
+    )
+
+    result = CliRunner().invoke(cli, ["compare", baseline, current])
+
+    assert result.exit_code == 1
+    assert "REGRESSED" in result.output
+
+
+def test_compare_threshold(tmp_path):
+    baseline = _write_results(tmp_path / "old.json", _result("redirects", 10, 1000))
+    current = _write_results(tmp_path / "new.json", _result("redirects", 12, 1000))
+
+    result = CliRunner().invoke(cli, ["compare", baseline, current, "-t", "0.25"])
+
+    assert result.exit_code == 0, result.output
+
+
+def test_compare_unpaired(tmp_path):
+    baseline = _write_results(tmp_path / "old.json", _result("redirects", 10, 1000))
+    current = _write_results(tmp_path / "new.json", _result("statuses", 10, 1000))
+
+    result = CliRunner().invoke(cli, ["compare", baseline, current])
+
+    assert result.exit_code == 0
+    assert result.output.count("unpaired") == 2
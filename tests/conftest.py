@@ -0,0 +1,44 @@
+import os
+from uuid import uuid4
+
+# set before the settings are imported: no database nor external shortener
+os.environ.setdefault("S4_REPOSITORY_BACKEND", "memory")
+os.environ.setdefault("S4_RATE_LIMIT_ENABLED", "false")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from sprint4.api.rest.app import APP  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    # one event loop for the session: the service is started once
+    with TestClient(APP, follow_redirects=False) as client:
+        yield client
+
+
+@pytest.fixture
+def unique_url():
+    """Return a function making a URL no other test uses."""
+
+    def make(path: str = "") -> str:
+        return f"https://example.com/{uuid4().hex}{path}"
+
+    return make
+
+
+@pytest.fixture
+def add_url(client, unique_url):
+    """Return a function adding a new URL by the local shortener."""
+
+    def add(url: None | str = None) -> dict:
+        response = client.post(
+            "/urls/", json=[{"url": url or unique_url(), "shortener_code": "local"}]
+        )
+        assert response.status_code == 200, response.text
+        (result,) = response.json()
+        assert result["status"] == "created", result
+        return result["row"]
+
+    return add
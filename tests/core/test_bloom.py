@@ -0,0 +1,75 @@
+import pytest
+
+from sprint4.core.bloom import CountingBloomFilter, get_bloom_filter_size
+
+
+@pytest.mark.parametrize(
+    "capacity, fp_rate, expected",
+    [(1000, 0.01, (9586, 7)), (1000, 0.1, (4793, 3)), (0, 0.01, (10, 7))],
+)
+def test_bloom_filter_size(capacity, fp_rate, expected):
+    assert get_bloom_filter_size(capacity, fp_rate) == expected
+
+
+def test_bloom_filter_size_budget():
+    ncounters, nhashes = get_bloom_filter_size(1000, 0.01, max_bytes=1000)
+
+    assert ncounters == 1000
+    assert nhashes == 1
+
+
+def test_no_false_negatives():
+    bloom = CountingBloomFilter(capacity=1000, fp_rate=0.01)
+    keys = [f"key-{idx}" for idx in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    assert len(bloom) == 1000
+
+
+def test_false_positive_rate():
+    bloom = CountingBloomFilter(capacity=1000, fp_rate=0.01)
+    for idx in range(1000):
+        bloom.add(f"key-{idx}")
+
+    nfalse = sum(f"other-{idx}" in bloom for idx in range(10_000))
+
+    assert nfalse / 10_000 < 0.02
+    assert bloom.expected_fp_rate() == pytest.approx(0.01, rel=0.1)
+
+
+def test_remove():
+    bloom = CountingBloomFilter(capacity=100, fp_rate=0.01)
+    bloom.add("a")
+    bloom.add("b")
+
+    assert bloom.remove("a")
+    assert "a" not in bloom
+    assert "b" in bloom
+    assert not bloom.remove("a")
+    assert len(bloom) == 1
+
+
+def test_saturated_counters_kept():
+    bloom = CountingBloomFilter(capacity=1, fp_rate=0.5, max_bytes=8)
+    for _ in range(300):
+        bloom.add("a")
+    for _ in range(300):
+        bloom.remove("a")
+
+    # a saturated counter never decreases: a false positive, not a negative
+    assert "a" in bloom
+
+
+def test_statistics():
+    bloom = CountingBloomFilter(capacity=1000, fp_rate=0.01)
+    bloom.add("a")
+
+    statistics = bloom.statistics()
+
+    assert statistics.capacity == 1000
+    assert statistics.size == 1
+    assert statistics.nbytes == 9586
+    assert statistics.nhashes == 7
+    assert statistics.expected_fp_rate < 0.01
@@ -0,0 +1,96 @@
+import pytest
+
+from sprint4.core.caches import LruTtlCache
+
+
+class FakeTimer:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def timer():
+    return FakeTimer()
+
+
+def test_get_set(timer):
+    cache = LruTtlCache(maxsize=2, ttl=10, timer=timer)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_evicted(timer):
+    cache = LruTtlCache(maxsize=2, ttl=10, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_entries_expire(timer):
+    cache = LruTtlCache(maxsize=2, ttl=10, timer=timer)
+    cache.set("a", 1)
+
+    timer.now = 9.9
+    assert cache.get("a") == 1
+    timer.now = 10
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert len(cache) == 0
+
+
+def test_set_renews_expiration(timer):
+    cache = LruTtlCache(maxsize=2, ttl=10, timer=timer)
+    cache.set("a", 1)
+    timer.now = 5
+    cache.set("a", 2)
+
+    timer.now = 12
+    assert cache.get("a") == 2
+
+
+def test_pop_and_clear(timer):
+    cache = LruTtlCache(maxsize=2, ttl=10, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_disabled_cache(timer):
+    cache = LruTtlCache(maxsize=0, ttl=10, timer=timer)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_statistics(timer):
+    cache = LruTtlCache(maxsize=1, ttl=10, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("b")
+    cache.get("a")
+
+    statistics = cache.statistics()
+
+    assert statistics.size == 1
+    assert statistics.maxsize == 1
+    assert (statistics.hits, statistics.misses) == (1, 1)
+    assert statistics.evictions == 1
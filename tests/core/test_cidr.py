@@ -0,0 +1,83 @@
+from ipaddress import IPv4Address
+
+import pytest
+
+from sprint4.core.cidr import CidrIndex, parse_ip, read_networks
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("10.0.0.1", "10.0.0.1"),
+        (" 10.0.0.1 ", "10.0.0.1"),
+        ("::ffff:10.0.0.1", "10.0.0.1"),
+        ("2001:db8::1", "2001:db8::1"),
+        ("10.0.0.256", None),
+        ("unknown", None),
+    ],
+)
+def test_parse_ip(value, expected):
+    addr = parse_ip(value)
+
+    assert (str(addr) if addr else addr) == expected
+
+
+@pytest.fixture
+def index():
+    return CidrIndex(["10.0.0.0/8", "192.168.1.7", "2001:db8::/32"])
+
+
+@pytest.mark.parametrize(
+    "addr",
+    ["10.0.0.1", "10.255.255.255", "192.168.1.7", "2001:db8::1", "::ffff:10.1.1.1"],
+)
+def test_contains(index, addr):
+    assert addr in index
+
+
+@pytest.mark.parametrize(
+    "addr", ["11.0.0.1", "192.168.1.8", "2001:db9::1", "::1", "invalid"]
+)
+def test_not_contains(index, addr):
+    assert addr not in index
+
+
+def test_contains_address_objects(index):
+    assert IPv4Address("10.1.2.3") in index
+    assert IPv4Address("127.0.0.1") not in index
+
+
+def test_host_bits_ignored():
+    index = CidrIndex(["10.1.2.3/8"])
+
+    assert "10.200.0.1" in index
+
+
+def test_duplicates_counted_once(index):
+    index.add("10.0.0.0/8")
+    index.add("10.9.9.9/8")
+
+    assert len(index) == 3
+
+
+def test_nested_networks():
+    index = CidrIndex(["10.0.0.0/24", "10.0.0.0/8"])
+
+    assert "10.1.0.1" in index
+    assert len(index) == 2
+
+
+def test_empty_index():
+    assert "10.0.0.1" not in CidrIndex()
+
+
+def test_invalid_network():
+    with pytest.raises(ValueError):
+        CidrIndex().add("10.0.0.0/33")
+
+
+def test_read_networks(tmp_path):
+    path = tmp_path / "blacklist.txt"
+    path.write_text("# the black list\n10.0.0.0/8  # office\n\n  2001:db8::/32\n")
+
+    assert list(read_networks(path)) == ["10.0.0.0/8", "2001:db8::/32"]
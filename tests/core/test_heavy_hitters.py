@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from sprint4.core.heavy_hitters import SlidingTopK, SpaceSaving
+
+
+class FakeTimer:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def timer():
+    return FakeTimer()
+
+
+def test_space_saving_exact_within_capacity():
+    summary = SpaceSaving(capacity=3)
+    for key in "abacab":
+        summary.add(key)
+    summary.add("c", count=5)
+
+    assert sorted(summary.items()) == [("a", 3, 0), ("b", 2, 0), ("c", 6, 0)]
+    assert summary.total == 11
+
+
+def test_space_saving_replaces_least_counted():
+    summary = SpaceSaving(capacity=2)
+    for key in "aaab":
+        summary.add(key)
+
+    summary.add("c")
+
+    assert sorted(summary.items()) == [("a", 3, 0), ("c", 2, 1)]
+    assert len(summary) == 2
+
+
+def test_space_saving_heavy_hitters_kept():
+    rng = random.Random(42)
+    summary = SpaceSaving(capacity=50)
+    stream = [key for key in range(5) for _ in range(1000)]
+    stream += [rng.randrange(5, 100_000) for _ in range(20_000)]
+    rng.shuffle(stream)
+    for key in stream:
+        summary.add(key)
+
+    counts = {key: (count, error) for key, count, error in summary.items()}
+    # counted more than total / capacity times
+    for key in range(5):
+        count, error = counts[key]
+        assert count - error <= 1000 <= count
+    assert len(summary) == 50
+
+
+def test_sliding_top(timer):
+    top = SlidingTopK(window=60, slots=6, capacity=10, timer=timer)
+    for key, count in [("a", 5), ("b", 3), ("c", 8)]:
+        top.add(key, count)
+    top.add("a")
+
+    assert top.top(2) == [("c", 8, 0), ("a", 6, 0)]
+    assert top.top(10) == [("c", 8, 0), ("a", 6, 0), ("b", 3, 0)]
+
+
+def test_sliding_top_sums_slots(timer):
+    top = SlidingTopK(window=60, slots=6, capacity=10, timer=timer)
+    for _ in range(3):
+        top.add("a", 2)
+        top.add("b")
+        timer.now += 10
+
+    assert top.top(2) == [("a", 6, 0), ("b", 3, 0)]
+
+
+def test_sliding_top_expires(timer):
+    top = SlidingTopK(window=60, slots=6, capacity=10, timer=timer)
+    top.add("old", 10)
+    timer.now = 30
+    top.add("new", 2)
+
+    assert top.top(2) == [("old", 10, 0), ("new", 2, 0)]
+
+    # the slot of "old" leaves the window, the window slides by a slot
+    timer.now = 60
+    assert top.top(2) == [("new", 2, 0)]
+    timer.now = 90
+    assert top.top(2) == []
+
+
+def test_sliding_top_errors_summed(timer):
+    top = SlidingTopK(window=60, slots=2, capacity=1, timer=timer)
+    top.add("a", 2)
+    top.add("b")
+    timer.now = 30
+    top.add("b", 4)
+
+    assert top.top(1) == [("b", 7, 2)]
@@ -0,0 +1,116 @@
+import pytest
+
+from sprint4.core.hyperloglog import HyperLogLog, merge_serialized
+
+
+def _sketch(items: range, precision: int = 13) -> HyperLogLog:
+    sketch = HyperLogLog(precision)
+    for item in items:
+        sketch.add(str(item).encode())
+    return sketch
+
+
+@pytest.mark.parametrize("count", [0, 1, 10, 100])
+def test_count_small(count):
+    # the linear counting is nearly exact while most registers are zero
+    assert _sketch(range(count)).count() == pytest.approx(count, abs=count // 50)
+
+
+@pytest.mark.parametrize("count", [1_000, 20_000, 100_000])
+def test_count_large(count):
+    # 4 standard errors of 1.15% at the precision 13
+    assert _sketch(range(count)).count() == pytest.approx(count, rel=0.05)
+
+
+def test_duplicates_not_counted():
+    sketch = _sketch(range(500))
+    for _ in range(3):
+        for item in range(500):
+            sketch.add(str(item).encode())
+
+    assert sketch.count() == pytest.approx(500, rel=0.02)
+
+
+@pytest.mark.parametrize("count", [10, 5_000])
+def test_merge_is_union(count):
+    first = _sketch(range(count))
+    second = _sketch(range(count // 2, count * 3 // 2))
+
+    first.merge(second)
+
+    assert first.count() == _sketch(range(count * 3 // 2)).count()
+
+
+def test_merge_sparse_into_dense():
+    dense, sparse = _sketch(range(5_000)), _sketch(range(5_000, 5_010))
+    assert "dense" in repr(dense) and "sparse" in repr(sparse)
+
+    dense.merge(sparse)
+    sparse.merge(_sketch(range(5_000)))
+
+    assert dense.to_bytes() == sparse.to_bytes()
+
+
+def test_merge_other_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(13))
+
+
+@pytest.mark.parametrize("precision", [3, 17])
+def test_precision_out_of_range(precision):
+    with pytest.raises(ValueError):
+        HyperLogLog(precision)
+
+
+@pytest.mark.parametrize("count", [0, 10, 100, 5_000])
+def test_serialization_round_trip(count):
+    sketch = _sketch(range(count), precision=10)
+
+    data = sketch.to_bytes()
+    restored = HyperLogLog.from_bytes(data)
+
+    assert restored.precision == 10
+    assert restored.count() == sketch.count()
+    assert restored.to_bytes() == data
+
+
+def test_serialized_sparse_while_smaller():
+    sparse = _sketch(range(10)).to_bytes()
+    dense = _sketch(range(10_000)).to_bytes()
+
+    assert len(sparse) == 2 + 3 * 10
+    assert len(dense) == 2 + 2**13
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"\x0d",
+        bytes((13, 2)),  # unknown format
+        bytes((13, 1)) + bytes(100),  # too few registers
+        bytes((13, 0)) + b"\x00\x01",  # truncated entry
+        bytes((4, 0)) + b"\x00\x20\x01",  # register out of range
+        bytes((20, 0)),  # precision out of range
+    ],
+)
+def test_from_invalid_bytes(data):
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(data)
+
+
+def test_merge_serialized():
+    stored, added = _sketch(range(100)), _sketch(range(50, 150))
+
+    merged = HyperLogLog.from_bytes(
+        merge_serialized(stored.to_bytes(), added.to_bytes())
+    )
+
+    assert merged.count() == _sketch(range(150)).count()
+
+
+@pytest.mark.parametrize("stored", [None, b"", b"garbage", HyperLogLog(12).to_bytes()])
+def test_merge_serialized_replaces_invalid(stored):
+    added = _sketch(range(10)).to_bytes()
+
+    assert merge_serialized(stored, added) == added
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from sprint4.core import url_shorteners
+from sprint4.core.url_shorteners import (
+    ExternalShortenerPool,
+    ShortenerError,
+    ShortenersEnum,
+)
+
+
+class FakeShortener:
+    """Blocks like an HTTP call, fails to connect the first `failures` calls per URL.
+
+    The URLs with "fail" in them are rejected by the shortener.
+    """
+
+    def __init__(self, delay: float = 0.0, failures: int = 0) -> None:
+        self.delay = delay
+        self.failures = failures
+        self.calls: dict[str, int] = {}
+        self.threads: set[str] = set()
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def shorten(self, url: str) -> str:
+        with self._lock:
+            ncalls = self.calls[url] = self.calls.get(url, 0) + 1
+            self.threads.add(threading.current_thread().name)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.running -= 1
+        if ncalls <= self.failures:
+            raise requests.exceptions.ConnectionError(f"cannot connect for {url}")
+        if "fail" in url:
+            raise RuntimeError(f"cannot shorten {url}")
+        return f"https://short.invalid/{url.rsplit('/', 1)[1]}"
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeShortener()
+    monkeypatch.setattr(url_shorteners, "get_shortener", lambda *_, **__: fake)
+    return fake
+
+
+@pytest.fixture
+def pool():
+    pool = ExternalShortenerPool(timeout=1.0, retries=2, backoff=0.001)
+    yield pool
+    pool.shutdown()
+
+
+async def test_shorten_off_the_event_loop(pool, fake):
+    short_url = await pool.shorten(ShortenersEnum.clckru, "https://example.com/a")
+
+    assert short_url == "https://short.invalid/a"
+    assert all(name.startswith("shortener") for name in fake.threads)
+
+
+async def test_shorten_many_concurrently(pool, fake):
+    fake.delay = 0.1
+    items = [(ShortenersEnum.clckru, f"https://example.com/{idx}") for idx in range(16)]
+
+    started_at = time.perf_counter()
+    short_urls = await pool.shorten_many(items)
+    elapsed = time.perf_counter() - started_at
+
+    assert short_urls == [f"https://short.invalid/{idx}" for idx in range(16)]
+    assert elapsed < 16 * fake.delay / 2
+
+
+async def test_shorten_retries(pool, fake):
+    fake.failures = 2
+
+    short_url = await pool.shorten(ShortenersEnum.osdb, "https://example.com/a")
+
+    assert short_url == "https://short.invalid/a"
+    assert fake.calls["https://example.com/a"] == 3
+
+
+async def test_shorten_fails_after_retries(pool, fake):
+    fake.failures = 3
+
+    with pytest.raises(ShortenerError):
+        await pool.shorten(ShortenersEnum.osdb, "https://example.com/a")
+    assert fake.calls["https://example.com/a"] == 3
+
+
+async def test_rejected_url_not_retried(pool, fake):
+    with pytest.raises(ShortenerError):
+        await pool.shorten(ShortenersEnum.clckru, "https://example.com/fail")
+    assert fake.calls["https://example.com/fail"] == 1
+
+
+async def test_timed_out_call_holds_its_slot(fake):
+    fake.delay = 0.2
+    pool = ExternalShortenerPool(concurrency=2, timeout=0.05, retries=2, backoff=0.001)
+    try:
+        with pytest.raises(ShortenerError):
+            await pool.shorten(ShortenersEnum.clckru, "https://example.com/a")
+        # the retries wait for the timed out calls to finish
+        assert fake.calls["https://example.com/a"] == 3
+        assert fake.peak == 2
+    finally:
+        pool.shutdown()
+
+
+async def test_slot_released_after_timed_out_call(fake):
+    fake.delay = 0.1
+    pool = ExternalShortenerPool(concurrency=1, timeout=0.02, retries=0)
+    try:
+        with pytest.raises(ShortenerError):
+            await pool.shorten(ShortenersEnum.clckru, "https://example.com/a")
+        fake.delay = 0.0
+        pool._timeout = 1.0
+
+        short_url = await pool.shorten(ShortenersEnum.clckru, "https://example.com/b")
+
+        assert short_url == "https://short.invalid/b"
+        assert fake.peak == 1
+    finally:
+        pool.shutdown()
+
+
+async def test_shorten_timeout(fake):
+    fake.delay = 0.2
+    pool = ExternalShortenerPool(timeout=0.05, retries=0)
+    try:
+        with pytest.raises(ShortenerError):
+            await pool.shorten(ShortenersEnum.clckru, "https://example.com/a")
+    finally:
+        pool.shutdown()
+
+
+async def test_shorten_many_return_exceptions(pool, fake):
+    items = [
+        (ShortenersEnum.clckru, "https://example.com/a"),
+        (ShortenersEnum.clckru, "https://example.com/fail"),
+        (ShortenersEnum.clckru, "https://example.com/b"),
+    ]
+
+    first, failed, last = await pool.shorten_many(items, return_exceptions=True)
+
+    assert first == "https://short.invalid/a"
+    assert isinstance(failed, ShortenerError)
+    assert last == "https://short.invalid/b"
+
+
+async def test_shortener_created_once(pool, monkeypatch):
+    created = []
+
+    def get_shortener(code, **kwargs):
+        created.append((code, kwargs))
+        return FakeShortener()
+
+    monkeypatch.setattr(url_shorteners, "get_shortener", get_shortener)
+    for _ in range(3):
+        await pool.shorten(ShortenersEnum.clckru, "https://example.com/a")
+
+    assert created == [(ShortenersEnum.clckru, {"timeout": 1.0})]
+
+
+async def test_local_shortener_rejected(pool):
+    with pytest.raises(ShortenerError):
+        await pool.shorten(ShortenersEnum.local, "https://example.com/a")
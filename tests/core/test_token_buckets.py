@@ -0,0 +1,86 @@
+import pytest
+
+from sprint4.core.rate_limits import TokenBucketLimiter
+
+
+class FakeTimer:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def timer():
+    return FakeTimer()
+
+
+def test_burst_then_wait(timer):
+    limiter = TokenBucketLimiter(rate=2, burst=3, timer=timer)
+
+    waits = [limiter.acquire("a") for _ in range(4)]
+
+    assert waits == [0, 0, 0, 0.5]
+
+
+def test_refill(timer):
+    limiter = TokenBucketLimiter(rate=2, burst=3, timer=timer)
+    for _ in range(3):
+        limiter.acquire("a")
+
+    timer.now = 0.5
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") == pytest.approx(0.5)
+
+
+def test_refill_capped_by_burst(timer):
+    limiter = TokenBucketLimiter(rate=2, burst=3, idle_ttl=1000, timer=timer)
+    limiter.acquire("a")
+
+    timer.now = 100
+    waits = [limiter.acquire("a") for _ in range(4)]
+
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3] > 0
+
+
+def test_rejected_requests_take_no_token(timer):
+    limiter = TokenBucketLimiter(rate=1, burst=1, timer=timer)
+    limiter.acquire("a")
+
+    # the waits do not grow: a rejected request consumes nothing
+    assert limiter.acquire("a") == limiter.acquire("a") == 1
+
+
+def test_keys_limited_apart(timer):
+    limiter = TokenBucketLimiter(rate=1, burst=1, timer=timer)
+
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("b") == 0
+    assert limiter.acquire("a") > 0
+
+
+def test_least_recently_used_evicted(timer):
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2, timer=timer)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    limiter.acquire("a")
+
+    limiter.acquire("c")
+
+    assert len(limiter) == 2
+    assert limiter.evictions == 1
+    # evicted, "b" starts with a full bucket again
+    assert limiter.acquire("b") == 0
+
+
+def test_idle_buckets_evicted(timer):
+    limiter = TokenBucketLimiter(rate=1, burst=2, timer=timer)
+    limiter.acquire("a")
+    limiter.acquire("b")
+
+    timer.now = 2
+    limiter.acquire("c")
+
+    assert len(limiter) == 1
@@ -0,0 +1,117 @@
+from collections import Counter
+
+import pytest
+
+from sprint4.core.url_shorteners import (
+    LocalShortener,
+    ShortenerError,
+    decode_base62,
+    encode_base62,
+    get_shortener,
+)
+
+
+DOMAIN = "http://localhost:8080"
+
+
+@pytest.fixture
+def shortener():
+    return LocalShortener(domain=DOMAIN, code_length=7)
+
+
+@pytest.mark.parametrize("number", [0, 1, 61, 62, 3843, 3844, 2**63 - 1])
+def test_base62_round_trip(number):
+    assert decode_base62(encode_base62(number)) == number
+
+
+def test_base62_negative_number():
+    with pytest.raises(ShortenerError):
+        encode_base62(-1)
+
+
+def test_base62_invalid_code():
+    with pytest.raises(ShortenerError):
+        decode_base62("abc-")
+
+
+@pytest.mark.parametrize("url_id", [0, 1, 2, 1000, 62**7 - 1, 62**7, 3_000_000_001])
+def test_encode_id_round_trip(shortener, url_id):
+    short_url = shortener.encode_id(url_id)
+
+    assert short_url.startswith(f"{DOMAIN}/")
+    assert shortener.decode_id(short_url) == url_id
+
+
+def test_encode_id_code_length(shortener):
+    codes = [shortener.encode_id(url_id).rsplit("/", 1)[1] for url_id in range(100)]
+
+    assert {len(code) for code in codes} == {7}
+    assert len(set(codes)) == 100
+
+
+def test_encode_id_scrambles_consecutive_ids(shortener):
+    first, second = (shortener.encode_id(url_id) for url_id in (1, 2))
+
+    assert first[:-1] != second[:-1]
+
+
+@pytest.mark.parametrize(
+    "short_url",
+    [
+        "https://example.com/0000001",
+        f"{DOMAIN}/abc",  # shorter than the code length
+        f"{DOMAIN}/abc-def",  # not a base62 code
+        f"{DOMAIN}/00000000",  # longer, yet within the scrambled range
+    ],
+)
+def test_decode_id_foreign_short_url(shortener, short_url):
+    assert shortener.decode_id(short_url) is None
+
+
+def test_shorten_is_deterministic(shortener):
+    url = "https://example.com/path"
+
+    assert shortener.shorten(url) == shortener.shorten(url)
+    assert shortener.shorten(url) != shortener.shorten(url, salt=1)
+    assert len(shortener.shorten(url).rsplit("/", 1)[1]) == 7
+
+
+def test_shorten_spreads_leading_chars(shortener):
+    codes = [
+        shortener.shorten(f"https://example.com/{idx}").rsplit("/", 1)[1]
+        for idx in range(62 * 100)
+    ]
+
+    counts = Counter(code[0] for code in codes)
+    # 100 expected per character, the binomial deviation is about 10
+    assert len(counts) == 62
+    assert 50 < min(counts.values()) <= max(counts.values()) < 150
+
+
+def test_domain_trailing_slash():
+    shortener = LocalShortener(domain=f"{DOMAIN}/")
+
+    assert shortener.encode_id(1).startswith(f"{DOMAIN}/")
+    assert "//" not in shortener.encode_id(1).removeprefix("http://")
+
+
+def test_non_positive_code_length():
+    with pytest.raises(ShortenerError):
+        LocalShortener(domain=DOMAIN, code_length=0)
+
+
+def test_get_local_shortener():
+    shortener = get_shortener("local", domain=DOMAIN, code_length=5)
+
+    assert isinstance(shortener, LocalShortener)
+    assert shortener.code_length == 5
+
+
+def test_get_local_shortener_unknown_option():
+    with pytest.raises(TypeError):
+        get_shortener("local", domain=DOMAIN, timeout=5)
+
+
+def test_get_unknown_shortener():
+    with pytest.raises(ShortenerError):
+        get_shortener("unknown")
@@ -0,0 +1,55 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from sprint4.core.settings import SETTINGS
+from sprint4.core.url_shorteners import LocalShortener
+from sprint4.db.repositories import UrlRepository
+from sprint4.models.urls import HttpUrlFilter, HttpUrlModel
+
+
+@pytest.fixture
+async def repo():
+    """Return the PostgreSQL repository, skip the test if it is not up."""
+
+    repo = UrlRepository(
+        dsn=str(SETTINGS.postgres.dsn), engine_settings={"pool_size": 2}
+    )
+    try:
+        await repo.warm_up(connections=1)
+    except Exception as e:
+        await repo.shutdown()
+        pytest.skip(f"PostgreSQL is not available: {e!r}")
+    yield repo
+    await repo.shutdown()
+
+
+@pytest.fixture
+async def add_urls(repo):
+    """Return a function adding new URLs, deleted after the test."""
+
+    shortener = LocalShortener(domain="http://localhost:8080")
+    added: list[int] = []
+
+    async def add(count: int = 1) -> list:
+        ids = await repo.reserve_ids(count)
+        rows = await repo.add_urls(
+            [
+                HttpUrlModel(
+                    id=url_id,
+                    url=f"https://example.com/{uuid4().hex}",
+                    short_url=shortener.encode_id(url_id),
+                )
+                for url_id in ids
+            ]
+        )
+        added.extend(row.id for row in rows)
+        return rows
+
+    yield add
+    for url_id in added:
+        try:
+            await repo.delete_url(HttpUrlFilter(id=url_id))
+        except NoResultFound:
+            pass
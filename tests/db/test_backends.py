@@ -0,0 +1,286 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from sprint4.core.exceptions import UrlRepositoryError
+from sprint4.core.settings import RepositorySettings
+from sprint4.core.url_shorteners import LocalShortener
+from sprint4.db.backends import get_url_repository
+from sprint4.db.memory import InMemoryUrlRepository
+from sprint4.db.repositories import UrlRepository
+from sprint4.db.sqlite import SqliteUrlRepository
+from sprint4.models.clicks import ClickDelta, ClickEvent
+from sprint4.models.urls import HttpUrlFilter, HttpUrlModel, get_url_hash
+
+
+SHORTENER = LocalShortener(domain="http://localhost:8080")
+
+
+def _settings(**kwargs) -> RepositorySettings:
+    return RepositorySettings.model_validate(
+        {f"s4_repository_{key}": value for key, value in kwargs.items()}
+    )
+
+
+def _model(url_id: int, path: str = "") -> HttpUrlModel:
+    return HttpUrlModel(
+        id=url_id,
+        url=f"https://example.com/{path or url_id}",
+        short_url=SHORTENER.encode_id(url_id),
+    )
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def repo(request, tmp_path):
+    """Return the repository of each of the embedded backends, a fresh one."""
+
+    repo = get_url_repository(
+        _settings(backend=request.param, sqlite_path=tmp_path / "urls.sqlite3")
+    )
+    await repo.warm_up()
+    yield repo
+    await repo.shutdown()
+
+
+async def _add_urls(repo, count: int) -> list:
+    ids = await repo.reserve_ids(count)
+    return await repo.add_urls([_model(url_id) for url_id in ids])
+
+
+@pytest.mark.parametrize(
+    "backend, repo_type",
+    [
+        ("memory", InMemoryUrlRepository),
+        ("sqlite", SqliteUrlRepository),
+        ("postgres", UrlRepository),
+    ],
+)
+async def test_get_url_repository(tmp_path, backend, repo_type):
+    repo = get_url_repository(
+        _settings(backend=backend, sqlite_path=tmp_path / "urls.sqlite3")
+    )
+    try:
+        assert type(repo) is repo_type
+    finally:
+        await repo.shutdown()
+
+
+async def test_reserve_ids(repo):
+    first = await repo.reserve_ids(3)
+    second = await repo.reserve_ids(2)
+
+    assert len(set(first + second)) == 5
+    assert min(second) > max(first)
+    assert await repo.reserve_ids(0) == []
+
+
+async def test_add_urls(repo):
+    rows = await _add_urls(repo, 3)
+    row = rows[0]
+
+    assert (row.is_gone, row.nclicks, row.clicked_at) == (False, 0, None)
+    assert await repo.find_url(HttpUrlFilter(short_url=row.short_url)) == row
+    assert await repo.find_url(HttpUrlFilter(url=row.url)) == row
+    assert await repo.estimate_url_count() == 3
+
+
+async def test_add_urls_without_ids(repo):
+    (reserved,) = await repo.reserve_ids(1)
+    model = _model(reserved + 1).model_copy(update={"id": None})
+
+    (row,) = await repo.add_urls([model])
+
+    # the reserved id is never taken by the insert
+    assert row.id > reserved
+    assert await repo.reserve_ids(1) == [row.id + 1]
+
+
+async def test_add_urls_skip_duplicates(repo):
+    (row,) = await _add_urls(repo, 1)
+    ids = await repo.reserve_ids(2)
+    same_url = _model(ids[0], path=str(row.id))
+    same_short_url = _model(ids[1]).model_copy(update={"short_url": row.short_url})
+
+    assert await repo.add_urls([same_url, same_short_url]) == []
+    assert await repo.copy_urls([same_url, same_short_url]) == 0
+    assert await repo.estimate_url_count() == 1
+
+
+async def test_copy_urls(repo):
+    ids = await repo.reserve_ids(3)
+
+    assert await repo.copy_urls([_model(url_id) for url_id in ids]) == 3
+    assert [row.id for row in await repo.get_urls(HttpUrlFilter())] == ids
+
+
+async def test_get_urls_by_hashes(repo):
+    rows = await _add_urls(repo, 2)
+    hashes = [get_url_hash(str(row.url)) for row in rows]
+
+    found = await repo.get_urls_by_hashes(hashes + [get_url_hash("https://x.com/")])
+
+    assert found == dict(zip(hashes, rows))
+
+
+async def test_get_existing_short_urls(repo):
+    (row,) = await _add_urls(repo, 1)
+    other = SHORTENER.encode_id(row.id + 100)
+
+    assert await repo.get_existing_short_urls([str(row.short_url), other]) == {
+        str(row.short_url)
+    }
+
+
+async def test_get_urls_pages(repo):
+    rows = await _add_urls(repo, 5)
+
+    first = await repo.get_urls(HttpUrlFilter(), limit=2)
+    second = await repo.get_urls(HttpUrlFilter(), after_id=first[-1].id, limit=2)
+    batches = [batch async for batch in repo.stream_urls(HttpUrlFilter(), batch_size=2)]
+
+    assert first + second == rows[:4]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [row for batch in batches for row in batch] == rows
+
+
+async def test_get_url_records(repo):
+    rows = await _add_urls(repo, 3)
+
+    records = await repo.get_url_records(HttpUrlFilter(), limit=2)
+
+    assert [type(rows[0]).model_validate(record) for record in records] == rows[:2]
+
+
+async def test_delete_url(repo):
+    (row,) = await _add_urls(repo, 1)
+
+    assert await repo.delete_url(HttpUrlFilter(id=row.id)) == row
+    with pytest.raises(NoResultFound):
+        await repo.find_url(HttpUrlFilter(id=row.id))
+    with pytest.raises(NoResultFound):
+        await repo.delete_url(HttpUrlFilter(id=row.id))
+
+
+async def test_mark_url_gone(repo):
+    (row,) = await _add_urls(repo, 1)
+
+    gone = await repo.mark_url_gone(HttpUrlFilter(id=row.id))
+
+    assert gone.is_gone
+    assert await repo.get_urls(HttpUrlFilter(is_gone=True)) == [gone]
+
+
+async def test_click_url(repo):
+    (row,) = await _add_urls(repo, 1)
+
+    for _ in range(2):
+        clicked = await repo.click_url(HttpUrlFilter(id=row.id, client_info="curl"))
+
+    assert (clicked.nclicks, clicked.client_info) == (2, "curl")
+    assert clicked.clicked_at is not None
+
+
+async def test_click_gone_url(repo):
+    (row,) = await _add_urls(repo, 1)
+    await repo.mark_url_gone(HttpUrlFilter(id=row.id))
+
+    clicked = await repo.click_url(HttpUrlFilter(id=row.id, client_info="curl"))
+
+    assert clicked.is_gone
+    assert clicked.nclicks == 0
+
+
+async def test_click_url_without_client_info(repo):
+    (row,) = await _add_urls(repo, 1)
+
+    with pytest.raises(UrlRepositoryError):
+        await repo.click_url(HttpUrlFilter(id=row.id))
+
+
+async def test_apply_click_deltas(repo):
+    rows = await _add_urls(repo, 2)
+    clicked_at = datetime(2026, 10, 18, 12, 0)
+
+    await repo.apply_click_deltas(
+        [
+            ClickDelta(rows[0].id, 3, clicked_at, "curl"),
+            ClickDelta(rows[1].id, 1, clicked_at, "wget"),
+            ClickDelta(rows[0].id, 2, clicked_at + timedelta(seconds=1), "httpie"),
+        ]
+    )
+
+    first, second = await repo.get_urls(HttpUrlFilter())
+    assert (first.nclicks, first.client_info) == (5, "httpie")
+    assert first.clicked_at == clicked_at + timedelta(seconds=1)
+    assert (second.nclicks, second.client_info) == (1, "wget")
+
+
+async def test_apply_late_click_deltas(repo):
+    (row,) = await _add_urls(repo, 1)
+    clicked_at = datetime(2026, 10, 18, 12, 0)
+
+    # the worker holding the older window flushes last
+    await repo.apply_click_deltas([ClickDelta(row.id, 2, clicked_at, "newer")])
+    await repo.apply_click_deltas(
+        [ClickDelta(row.id, 3, clicked_at - timedelta(seconds=5), "older")]
+    )
+
+    (found,) = await repo.get_urls(HttpUrlFilter(id=row.id))
+    assert (found.nclicks, found.clicked_at, found.client_info) == (
+        5,
+        clicked_at,
+        "newer",
+    )
+
+
+async def test_get_clicks(repo):
+    (row,) = await _add_urls(repo, 1)
+    clicked_at = datetime(2026, 10, 18, 12, 0)
+    await repo.add_clicks(
+        [
+            ClickEvent(row.id, clicked_at + timedelta(seconds=idx), "10.0.0.1", "curl")
+            for idx in range(3)
+        ]
+    )
+
+    clicks = await repo.get_clicks(row.id, limit=2)
+    rest = await repo.get_clicks(row.id, limit=2, offset=2)
+
+    assert [click.clicked_at for click in clicks + rest] == [
+        clicked_at + timedelta(seconds=idx) for idx in (2, 1, 0)
+    ]
+    assert {click.ip for click in clicks} == {"10.0.0.1"}
+
+
+async def test_memory_max_clicks():
+    repo = InMemoryUrlRepository(max_clicks_per_url=2)
+    (row,) = await _add_urls(repo, 1)
+    clicked_at = datetime(2026, 10, 18, 12, 0)
+
+    await repo.add_clicks(
+        [
+            ClickEvent(row.id, clicked_at + timedelta(seconds=idx), None, None)
+            for idx in range(5)
+        ]
+    )
+
+    clicks = await repo.get_clicks(row.id, limit=10)
+    assert [click.clicked_at.second for click in clicks] == [4, 3]
+
+
+async def test_sqlite_persisted(tmp_path):
+    settings = _settings(backend="sqlite", sqlite_path=tmp_path / "urls.sqlite3")
+    repo = get_url_repository(settings)
+    await repo.warm_up()
+    rows = await _add_urls(repo, 2)
+    await repo.shutdown()
+
+    repo = get_url_repository(settings)
+    await repo.warm_up()
+    try:
+        assert await repo.get_urls(HttpUrlFilter()) == rows
+        # the id sequence goes on after the stored rows
+        assert await repo.reserve_ids(1) == [rows[-1].id + 1]
+    finally:
+        await repo.shutdown()
@@ -0,0 +1,247 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from click.testing import CliRunner
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.sql import text
+
+from sprint4.core.settings import SETTINGS
+from sprint4.db import backfill
+from sprint4.db.backfill import UrlBackfill
+from sprint4.db.repositories import UrlRepository
+from sprint4.models.urls import HttpUrlFilter, HttpUrlModel, get_url_hash
+
+
+ROOT = Path(__file__).parents[2]
+SEEDED = 50
+
+# the revisions before and after the partitioned copy is created
+BEFORE_REVISION = "1372bcce7fde"
+PARTITION_REVISION = "137d44dc3b6d"
+
+
+def _get_dsn(database: str) -> str:
+    url = make_url(str(SETTINGS.postgres.dsn)).set(database=database)
+    return url.render_as_string(hide_password=False)
+
+
+async def _execute(database: str, *statements: str, params=None) -> list:
+    engine = create_async_engine(_get_dsn(database), isolation_level="AUTOCOMMIT")
+    try:
+        async with engine.connect() as conn:
+            results = [await conn.execute(text(sql), params) for sql in statements]
+            return [result.all() if result.returns_rows else None for result in results]
+    finally:
+        await engine.dispose()
+
+
+def _migrate(database: str, revision: str) -> None:
+    url = make_url(str(SETTINGS.postgres.dsn))
+    env = dict(
+        os.environ,
+        S4_POSTGRES_USER=url.username,
+        S4_POSTGRES_PASSWORD=url.password,
+        S4_POSTGRES_HOST=url.host,
+        S4_POSTGRES_PORT=str(url.port or 5432),
+        S4_POSTGRES_DATABASE=database,
+    )
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", revision],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture(scope="module")
+def template():
+    """Return the database migrated up to the partitioned copy, rows seeded before."""
+
+    maintenance = make_url(str(SETTINGS.postgres.dsn)).database
+    template = f"s4_backfill_{uuid4().hex[:8]}"
+    try:
+        asyncio.run(_execute(maintenance, f"CREATE DATABASE {template}"))
+    except Exception as e:
+        pytest.skip(f"PostgreSQL is not available: {e!r}")
+    try:
+        _migrate(template, BEFORE_REVISION)
+        urls = [f"https://example.com/{idx}" for idx in range(SEEDED)]
+        asyncio.run(
+            _execute(
+                template,
+                "INSERT INTO urls (url, short_url, url_hash) "
+                "VALUES (:url, :short_url, :url_hash)",
+                params=[
+                    {
+                        "url": url,
+                        "short_url": f"http://localhost:8080/{idx}",
+                        "url_hash": get_url_hash(url),
+                    }
+                    for idx, url in enumerate(urls)
+                ],
+            )
+        )
+        _migrate(template, PARTITION_REVISION)
+        yield template
+    finally:
+        asyncio.run(_execute(maintenance, f"DROP DATABASE {template} WITH (FORCE)"))
+
+
+@pytest.fixture
+def database(template):
+    maintenance = make_url(str(SETTINGS.postgres.dsn)).database
+    database = f"{template}_{uuid4().hex[:8]}"
+    asyncio.run(
+        _execute(maintenance, f"CREATE DATABASE {database} TEMPLATE {template}")
+    )
+    yield database
+    asyncio.run(_execute(maintenance, f"DROP DATABASE {database} WITH (FORCE)"))
+
+
+@pytest.fixture
+async def tool(database):
+    tool = UrlBackfill(_get_dsn(database), engine_settings={"pool_size": 1})
+    yield tool
+    await tool.shutdown()
+
+
+async def _get_ids(database: str, table: str) -> list[int]:
+    (rows,) = await _execute(database, f"SELECT id FROM {table} ORDER BY id")
+    return [row[0] for row in rows]
+
+
+async def test_seeded_rows_not_mirrored(tool):
+    assert await tool.count_rows() == (SEEDED, 0)
+    assert await tool.get_last_id() == SEEDED
+
+
+async def test_run(tool, database):
+    chunks = [chunk async for chunk in tool.run(chunk_size=20)]
+
+    assert chunks == [(20, 20), (40, 20), (50, 10)]
+    assert await tool.count_rows() == (SEEDED, SEEDED)
+    assert await _get_ids(database, "urls_partitioned") == list(range(1, SEEDED + 1))
+
+
+async def test_run_resumed(tool):
+    first = [chunk async for chunk in tool.run(after_id=30, chunk_size=100)]
+    # the rows copied already are skipped
+    again = [chunk async for chunk in tool.run(chunk_size=100)]
+
+    assert first == [(50, 20)]
+    assert again == [(50, 30)]
+    assert await tool.count_rows() == (SEEDED, SEEDED)
+
+
+async def test_writes_mirrored(tool, database):
+    await _execute(
+        database,
+        "INSERT INTO urls (url, short_url) "
+        "VALUES ('https://example.com/new', 'http://localhost:8080/new')",
+        "UPDATE urls SET nclicks = 5 WHERE id = 3",
+        "DELETE FROM urls WHERE id = 4",
+    )
+    chunks = [chunk async for chunk in tool.run(chunk_size=100)]
+
+    # the new row is mirrored, the updated one copied as it is now
+    assert chunks == [(SEEDED + 1, SEEDED - 1)]
+    assert await tool.count_rows() == (SEEDED, SEEDED)
+    ((row,),) = await _execute(
+        database, "SELECT nclicks FROM urls_partitioned WHERE id = 3"
+    )
+    assert row == (5,)
+    assert 4 not in await _get_ids(database, "urls_partitioned")
+
+
+async def test_swap(tool, database):
+    async for _ in tool.run(chunk_size=100):
+        pass
+
+    await tool.swap()
+
+    repo = UrlRepository(dsn=_get_dsn(database), engine_settings={"pool_size": 1})
+    try:
+        await repo.warm_up(connections=1)
+        assert repo._partitioned
+        (reserved,) = await repo.reserve_ids(1)
+        (row,) = await repo.add_urls(
+            [
+                HttpUrlModel(
+                    id=reserved,
+                    url="https://example.com/swapped",
+                    short_url="http://localhost:8080/swapped",
+                )
+            ]
+        )
+        assert row.id == SEEDED + 1
+        assert len(await repo.get_urls(HttpUrlFilter())) == SEEDED + 1
+        # the keys are unique across the partitions
+        assert await repo.add_urls([_duplicate(row, SEEDED + 2)]) == []
+    finally:
+        await repo.shutdown()
+    assert await _get_ids(database, "urls_unpartitioned") == list(range(1, SEEDED + 1))
+
+
+def _duplicate(row, url_id: int) -> HttpUrlModel:
+    return HttpUrlModel(id=url_id, url=row.url, short_url=f"{row.short_url}-other")
+
+
+async def _get_archive_partitions(database: str) -> list[str]:
+    (rows,) = await _execute(
+        database,
+        "SELECT relname FROM pg_class WHERE relname ~ '^urls_gone_p[0-9]+$'",
+    )
+    return sorted((row[0] for row in rows), key=lambda name: int(name[11:]))
+
+
+async def test_archive_partitions(tool, database):
+    # those of the migration: the ranges up to the last id and 4 ahead
+    assert await _get_archive_partitions(database) == [
+        f"urls_gone_p{idx}" for idx in range(5)
+    ]
+    assert await tool.ensure_archive_partitions(ahead=4) == 0
+
+    assert await tool.ensure_archive_partitions(ahead=6) == 2
+    assert await _get_archive_partitions(database) == [
+        f"urls_gone_p{idx}" for idx in range(7)
+    ]
+
+
+@pytest.fixture
+def cli(database, monkeypatch):
+    monkeypatch.setattr(SETTINGS.postgres, "dsn", _get_dsn(database))
+    return lambda *args: CliRunner().invoke(backfill.cli, list(args))
+
+
+def test_cli(cli):
+    result = cli("verify")
+    assert result.exit_code == 1
+    assert "urls: 50 row(s), urls_partitioned: 0 row(s)" in result.output
+    assert cli("swap").exit_code == 1
+
+    result = cli("run", "--chunk-size", "40")
+    assert result.exit_code == 0, result.output
+    assert "copied 10 row(s) up to id=50, 50 in all" in result.output
+
+    assert cli("verify").exit_code == 0
+    result = cli("swap", "--lock-timeout", "1")
+    assert result.exit_code == 0, result.output
+    assert "restart the application" in result.output
+
+
+async def test_click_url_ids_widened(database):
+    _migrate(database, "67ca8d28668a")
+
+    (rows,) = await _execute(
+        database,
+        "SELECT DISTINCT data_type FROM information_schema.columns "
+        "WHERE table_name LIKE 'clicks%' AND column_name = 'url_id'",
+    )
+    assert rows == [("bigint",)]
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from sprint4.models.clicks import ClickDelta
+from sprint4.models.urls import HttpUrlFilter
+
+
+async def test_apply_click_deltas(repo, add_urls):
+    first, second = await add_urls(2)
+    clicked_at = datetime.now().replace(microsecond=0)
+
+    await repo.apply_click_deltas(
+        [
+            ClickDelta(second.id, 2, clicked_at, "second"),
+            ClickDelta(first.id, 3, clicked_at, "first"),
+        ]
+    )
+    await repo.apply_click_deltas([ClickDelta(first.id, 1, clicked_at, "again")])
+
+    rows = await repo.get_urls(HttpUrlFilter(), after_id=first.id - 1, limit=2)
+    assert [(row.nclicks, row.client_info) for row in rows] == [
+        (4, "again"),
+        (2, "second"),
+    ]
+    assert rows[0].clicked_at == clicked_at
+
+
+async def test_apply_no_click_deltas(repo):
+    await repo.apply_click_deltas([])
+
+
+async def test_apply_late_click_deltas(repo, add_urls):
+    (row,) = await add_urls(1)
+    clicked_at = datetime.now().replace(microsecond=0)
+
+    # the worker holding the older window flushes last
+    await repo.apply_click_deltas([ClickDelta(row.id, 2, clicked_at, "newer")])
+    await repo.apply_click_deltas(
+        [ClickDelta(row.id, 3, clicked_at - timedelta(seconds=5), "older")]
+    )
+
+    (found,) = await repo.get_urls(HttpUrlFilter(id=row.id))
+    assert (found.nclicks, found.clicked_at, found.client_info) == (
+        5,
+        clicked_at,
+        "newer",
+    )
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from sprint4.core.exceptions import UrlRepositoryError
+from sprint4.models.urls import HttpUrlFilter
+
+
+async def test_click_url(repo, add_urls):
+    (row,) = await add_urls()
+
+    clicked = await repo.click_url(HttpUrlFilter(id=row.id, client_info="agent"))
+
+    assert clicked.id == row.id
+    assert clicked.nclicks == 1
+    assert clicked.client_info == "agent"
+    assert clicked.clicked_at is not None
+
+
+async def test_click_url_by_short_url(repo, add_urls):
+    (row,) = await add_urls()
+
+    clicked = await repo.click_url(
+        HttpUrlFilter(short_url=row.short_url, client_info="agent")
+    )
+
+    assert clicked.id == row.id
+    assert clicked.nclicks == 1
+
+
+async def test_concurrent_clicks_not_lost(repo, add_urls):
+    (row,) = await add_urls()
+    url_filter = HttpUrlFilter(id=row.id, client_info="agent")
+
+    await asyncio.gather(*(repo.click_url(url_filter) for _ in range(20)))
+
+    assert (await repo.find_url(HttpUrlFilter(id=row.id))).nclicks == 20
+
+
+async def test_click_gone_url_untouched(repo, add_urls):
+    (row,) = await add_urls()
+    await repo.mark_url_gone(HttpUrlFilter(id=row.id))
+
+    clicked = await repo.click_url(HttpUrlFilter(id=row.id, client_info="agent"))
+
+    assert clicked.is_gone
+    assert clicked.nclicks == 0
+    assert clicked.client_info is None
+
+
+async def test_click_unknown_url(repo):
+    with pytest.raises(NoResultFound):
+        await repo.click_url(HttpUrlFilter(id=2**62, client_info="agent"))
+
+
+async def test_click_url_without_client_info(repo, add_urls):
+    (row,) = await add_urls()
+
+    with pytest.raises(UrlRepositoryError):
+        await repo.click_url(HttpUrlFilter(id=row.id))
@@ -0,0 +1,40 @@
+from datetime import date, datetime, timedelta
+
+from sprint4.models.clicks import ClickEvent
+
+
+async def test_get_clicks_latest_first(repo, add_urls):
+    (row,) = await add_urls()
+    now = datetime.now()
+    events = [
+        ClickEvent(row.id, now - timedelta(seconds=idx), f"10.0.0.{idx}", "agent")
+        for idx in range(5)
+    ]
+    await repo.add_clicks(events)
+
+    first_page = await repo.get_clicks(row.id, limit=3)
+    second_page = await repo.get_clicks(row.id, limit=3, offset=3)
+
+    ips = [click.ip for click in first_page + second_page]
+    assert ips == [f"10.0.0.{idx}" for idx in range(5)]
+
+
+async def test_clicks_of_large_url_id(repo):
+    url_id = 3_000_000_001
+    await repo.add_clicks([ClickEvent(url_id, datetime.now(), None, None)])
+
+    (click,) = await repo.get_clicks(url_id, limit=1)
+
+    assert click.ip is None
+
+
+async def test_add_no_clicks(repo):
+    await repo.add_clicks([])
+
+
+async def test_ensure_click_partitions(repo):
+    since = date.today()
+
+    assert await repo.ensure_click_partitions(since=since, months=2) == []
+    # created already, nothing to do
+    assert await repo.ensure_click_partitions(since=since, months=2) == []
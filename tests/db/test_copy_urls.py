@@ -0,0 +1,45 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from sprint4.core.url_shorteners import LocalShortener
+from sprint4.models.urls import HttpUrlFilter, HttpUrlModel
+
+
+@pytest.fixture
+async def copied_ids(repo):
+    """The ids of the copied URLs, deleted after the test."""
+
+    ids: list[int] = []
+    yield ids
+    for url_id in ids:
+        try:
+            await repo.delete_url(HttpUrlFilter(id=url_id))
+        except NoResultFound:
+            pass
+
+
+async def test_copy_urls(repo, add_urls, copied_ids):
+    (existing,) = await add_urls()
+    shortener = LocalShortener(domain="http://localhost:8080")
+    urls = [f"https://example.com/{uuid4().hex}" for _ in range(2)]
+    # a duplicate within the chunk and an existing URL are skipped
+    urls += [urls[0], str(existing.url)]
+    ids = await repo.reserve_ids(len(urls))
+    copied_ids.extend(ids)
+
+    inserted = await repo.copy_urls(
+        [
+            HttpUrlModel(id=url_id, url=url, short_url=shortener.encode_id(url_id))
+            for url_id, url in zip(ids, urls)
+        ]
+    )
+
+    assert inserted == 2
+    rows = [await repo.find_url(HttpUrlFilter(url=url)) for url in urls[:2]]
+    assert [row.id for row in rows] == ids[:2]
+
+
+async def test_copy_no_urls(repo):
+    assert await repo.copy_urls([]) == 0
@@ -0,0 +1,40 @@
+from sprint4.models.urls import HttpUrlFilter
+
+
+async def test_get_urls_by_keyset(repo, add_urls):
+    rows = await add_urls(5)
+    after_id = rows[0].id - 1
+
+    first_page = await repo.get_urls(HttpUrlFilter(), after_id=after_id, limit=3)
+    second_page = await repo.get_urls(
+        HttpUrlFilter(), after_id=first_page[-1].id, limit=3
+    )
+
+    ids = [row.id for row in first_page + second_page]
+    assert ids[:5] == [row.id for row in rows]
+
+
+async def test_stream_urls_by_batches(repo, add_urls):
+    rows = await add_urls(5)
+
+    batches = [
+        batch
+        async for batch in repo.stream_urls(
+            HttpUrlFilter(), after_id=rows[0].id - 1, limit=5, batch_size=2
+        )
+    ]
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [row.id for batch in batches for row in batch] == [row.id for row in rows]
+
+
+async def test_stream_url_keys(repo, add_urls):
+    rows = await add_urls(3)
+
+    keys = [
+        key
+        async for batch in repo.stream_url_keys(after_id=rows[0].id - 1, batch_size=2)
+        for key in batch
+    ]
+
+    assert keys[:3] == [(row.id, str(row.short_url)) for row in rows]
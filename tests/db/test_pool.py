@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.sql import text
+
+from sprint4.db.pool import InstrumentedAsyncQueuePool
+from sprint4.db.utils import get_async_engine
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    # the pool does not depend on the driver, SQLite spares a server
+    engine = get_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.sqlite3'}",
+        settings={"pool_size": 1, "max_overflow": 0, "pool_timeout": 0.2},
+    )
+    yield engine
+    await engine.dispose()
+
+
+async def test_instrumented_pool(engine):
+    pool = engine.pool
+
+    assert isinstance(pool, InstrumentedAsyncQueuePool)
+    statistics = pool.statistics()
+    assert (statistics.size, statistics.max_overflow) == (1, 0)
+    assert statistics.checkouts == 0
+
+
+async def test_checkouts_counted(engine):
+    for _ in range(3):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    statistics = engine.pool.statistics()
+    assert statistics.checkouts == 3
+    assert statistics.checked_out == 0
+    assert statistics.timeouts == 0
+
+
+async def test_checkout_timeout(engine):
+    async with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            async with engine.connect():
+                pass
+
+    statistics = engine.pool.statistics()
+    assert statistics.timeouts == 1
+    assert statistics.waiting == 0
+    assert statistics.wait_time_max >= 0.2
+    assert engine.pool.congestion() == 0.0
+
+
+async def test_congestion_while_waiting(engine):
+    async with engine.connect():
+        # a timed out checkout sets the average wait
+        with pytest.raises(PoolTimeoutError):
+            await engine.connect().start()
+        waiting = asyncio.create_task(engine.connect().start())
+        await asyncio.sleep(0.05)
+
+        assert engine.pool.statistics().waiting == 1
+        assert engine.pool.congestion() > 0
+
+        with pytest.raises(PoolTimeoutError):
+            await waiting
+    assert engine.pool.congestion() == 0.0
+
+
+async def test_invalidations_counted(engine):
+    async with engine.connect() as conn:
+        await conn.invalidate()
+
+    assert engine.pool.statistics().invalidations == 1
+
+
+async def test_dispose_resets_statistics(engine):
+    async with engine.connect():
+        pass
+    await engine.dispose()
+
+    assert isinstance(engine.pool, InstrumentedAsyncQueuePool)
+    assert engine.pool.statistics().checkouts == 0
+    async with engine.connect():
+        pass
+    assert engine.pool.statistics().checkouts == 1
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from sprint4.models.clicks import ClickBucket, ClickBucketDelta, RollupGranularity
+
+
+# far in the past, apart from the buckets of the other tests
+DAY = datetime(2001, 2, 3)
+
+
+def _minute(hour: int, minute: int) -> datetime:
+    return DAY.replace(hour=hour, minute=minute)
+
+
+async def _series(repo, url_id: int, granularity: RollupGranularity) -> list:
+    return await repo.get_click_timeseries(
+        url_id, granularity=granularity, since=DAY, until=DAY + timedelta(days=1)
+    )
+
+
+async def test_add_click_rollups(repo, add_urls):
+    first, second = await add_urls(2)
+
+    await repo.add_click_rollups(
+        [
+            ClickBucketDelta(first.id, _minute(10, 1), 2),
+            ClickBucketDelta(first.id, _minute(10, 2), 3),
+            ClickBucketDelta(first.id, _minute(11, 0), 1),
+            ClickBucketDelta(second.id, _minute(10, 1), 7),
+        ]
+    )
+    # the upserts add up
+    await repo.add_click_rollups([ClickBucketDelta(first.id, _minute(10, 1), 4)])
+
+    assert await _series(repo, first.id, RollupGranularity.minute) == [
+        ClickBucket(bucket=_minute(10, 1), nclicks=6),
+        ClickBucket(bucket=_minute(10, 2), nclicks=3),
+        ClickBucket(bucket=_minute(11, 0), nclicks=1),
+    ]
+    assert await _series(repo, first.id, RollupGranularity.hour) == [
+        ClickBucket(bucket=_minute(10, 0), nclicks=9),
+        ClickBucket(bucket=_minute(11, 0), nclicks=1),
+    ]
+    assert await _series(repo, first.id, RollupGranularity.day) == [
+        ClickBucket(bucket=DAY, nclicks=10)
+    ]
+    assert await _series(repo, second.id, RollupGranularity.day) == [
+        ClickBucket(bucket=DAY, nclicks=7)
+    ]
+
+
+async def test_timeseries_bounds(repo, add_urls):
+    (row,) = await add_urls(1)
+    await repo.add_click_rollups(
+        [ClickBucketDelta(row.id, _minute(10, minute), 1) for minute in range(5)]
+    )
+
+    buckets = await repo.get_click_timeseries(
+        row.id,
+        granularity=RollupGranularity.minute,
+        since=_minute(10, 1),
+        until=_minute(10, 3),  # exclusive
+    )
+
+    assert [bucket.bucket for bucket in buckets] == [_minute(10, 1), _minute(10, 2)]
+
+
+async def test_prune_click_rollups(repo, add_urls):
+    (row,) = await add_urls(1)
+    await repo.add_click_rollups(
+        [
+            ClickBucketDelta(row.id, _minute(10, 0), 1),
+            ClickBucketDelta(row.id, _minute(12, 0), 1),
+        ]
+    )
+
+    npruned = await repo.prune_click_rollups(
+        RollupGranularity.minute, before=_minute(11, 0)
+    )
+
+    assert npruned >= 1
+    assert await _series(repo, row.id, RollupGranularity.minute) == [
+        ClickBucket(bucket=_minute(12, 0), nclicks=1)
+    ]
+    # the coarser rollups are kept
+    assert len(await _series(repo, row.id, RollupGranularity.hour)) == 2
+
+
+async def test_add_no_click_rollups(repo):
+    await repo.add_click_rollups([])
@@ -0,0 +1,55 @@
+from sprint4.core.hyperloglog import HyperLogLog
+from sprint4.models.urls import HttpUrlFilter
+
+
+def _sketch(items: range) -> HyperLogLog:
+    sketch = HyperLogLog()
+    for item in items:
+        sketch.add(str(item).encode())
+    return sketch
+
+
+async def test_merge_visitor_sketches(repo, add_urls):
+    first, second = await add_urls(2)
+
+    await repo.merge_visitor_sketches(
+        {
+            first.id: _sketch(range(10)).to_bytes(),
+            second.id: _sketch(range(3)).to_bytes(),
+        }
+    )
+    await repo.merge_visitor_sketches({first.id: _sketch(range(5, 20)).to_bytes()})
+
+    stored = await repo.get_visitor_sketches([first.id, second.id])
+    assert stored == {
+        first.id: _sketch(range(20)).to_bytes(),
+        second.id: _sketch(range(3)).to_bytes(),
+    }
+
+
+async def test_invalid_sketch_replaced(repo, add_urls):
+    (row,) = await add_urls(1)
+    await repo.merge_visitor_sketches({row.id: HyperLogLog(10).to_bytes()})
+
+    await repo.merge_visitor_sketches({row.id: _sketch(range(3)).to_bytes()})
+
+    assert await repo.get_visitor_sketches([row.id]) == {
+        row.id: _sketch(range(3)).to_bytes()
+    }
+
+
+async def test_deleted_url_sketch_skipped(repo, add_urls):
+    (row,) = await add_urls(1)
+    await repo.delete_url(HttpUrlFilter(id=row.id))
+
+    await repo.merge_visitor_sketches({row.id: _sketch(range(3)).to_bytes()})
+
+    assert await repo.get_visitor_sketches([row.id]) == {}
+
+
+async def test_no_visitor_sketches(repo, add_urls):
+    (row,) = await add_urls(1)
+
+    await repo.merge_visitor_sketches({})
+
+    assert await repo.get_visitor_sketches([row.id]) == {}
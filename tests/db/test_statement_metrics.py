@@ -0,0 +1,57 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy.sql import text
+
+from sprint4.db.metrics import observe_operations
+from sprint4.db.utils import get_async_engine
+
+
+@observe_operations
+class Repo:
+    def __init__(self, engine) -> None:
+        self._engine = engine
+
+    async def select(self) -> None:
+        await self._select()
+
+    async def stream(self):
+        for _ in range(2):
+            await self._select()
+            yield
+
+    async def _select(self) -> None:
+        async with self._engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+
+def _get_count(operation: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "db_statement_duration_seconds_count", {"operation": operation}
+    )
+    return value or 0.0
+
+
+@pytest.fixture
+async def repo(tmp_path):
+    engine = get_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'metrics.sqlite3'}")
+    yield Repo(engine)
+    await engine.dispose()
+
+
+async def test_statements_labelled_by_method(repo):
+    before = _get_count("select")
+
+    await repo.select()
+
+    assert _get_count("select") == before + 1
+
+
+async def test_generator_statements_labelled(repo):
+    before, other_before = _get_count("stream"), _get_count("other")
+
+    async for _ in repo.stream():
+        # the caller's own statements are not the generator's
+        await repo._select()
+
+    assert _get_count("stream") == before + 2
+    assert _get_count("other") == other_before + 2
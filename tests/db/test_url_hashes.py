@@ -0,0 +1,25 @@
+from sprint4.core.url_shorteners import LocalShortener
+from sprint4.models.urls import HttpUrlModel, get_url_hash
+
+
+async def test_get_urls_by_hashes(repo, add_urls):
+    rows = await add_urls(2)
+    missing_hash = get_url_hash("https://example.com/missing")
+
+    found = await repo.get_urls_by_hashes(
+        [row.url_hash for row in rows] + [missing_hash]
+    )
+
+    assert found == {row.url_hash: row for row in rows}
+
+
+async def test_add_existing_url_skipped(repo, add_urls):
+    (row,) = await add_urls()
+    shortener = LocalShortener(domain="http://localhost:8080")
+    (url_id,) = await repo.reserve_ids(1)
+
+    rows = await repo.add_urls(
+        [HttpUrlModel(id=url_id, url=row.url, short_url=shortener.encode_id(url_id))]
+    )
+
+    assert rows == []
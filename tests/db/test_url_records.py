@@ -0,0 +1,39 @@
+from sprint4.models.urls import URL_RECORD_FIELDS, HttpUrlFilter, HttpUrlRow
+
+
+async def test_get_url_records(repo, add_urls):
+    rows = await add_urls(3)
+    await repo.click_url(HttpUrlFilter(id=rows[1].id, client_info="curl"))
+    page = {"after_id": rows[0].id - 1, "limit": 3}
+
+    records = await repo.get_url_records(HttpUrlFilter(), **page)
+
+    assert [tuple(record) for record in records] == [URL_RECORD_FIELDS] * 3
+    assert [HttpUrlRow.model_validate(record) for record in records] == (
+        await repo.get_urls(HttpUrlFilter(), **page)
+    )
+
+
+async def test_get_url_records_filtered(repo, add_urls):
+    rows = await add_urls(2)
+
+    records = await repo.get_url_records(HttpUrlFilter(short_url=rows[1].short_url))
+
+    assert [record["id"] for record in records] == [rows[1].id]
+    assert records[0]["short_url"] == str(rows[1].short_url)
+
+
+async def test_stream_url_records(repo, add_urls):
+    rows = await add_urls(5)
+
+    batches = [
+        batch
+        async for batch in repo.stream_url_records(
+            HttpUrlFilter(), after_id=rows[0].id - 1, limit=5, batch_size=2
+        )
+    ]
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [record["id"] for batch in batches for record in batch] == [
+        row.id for row in rows
+    ]
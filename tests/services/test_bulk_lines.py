@@ -0,0 +1,35 @@
+import pytest
+
+from sprint4.services.bulk_ingest import iter_lines
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _lines(chunks, max_line_bytes: int = 100) -> list[bytes]:
+    return [line async for line in iter_lines(chunks, max_line_bytes=max_line_bytes)]
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        (b"first\nsecond\nthird",),
+        (b"fir", b"st\nsec", b"ond\n", b"third"),
+        (b"first\n", b"second\n", b"third"),
+    ],
+)
+async def test_lines_across_chunks(chunks):
+    assert await _lines(_chunks(*chunks)) == [b"first", b"second", b"third"]
+
+
+async def test_trailing_newline():
+    assert await _lines(_chunks(b"first\n")) == [b"first"]
+
+
+async def test_overlong_lines_truncated():
+    lines = await _lines(_chunks(b"x" * 6, b"x" * 6 + b"\nok\n"), max_line_bytes=4)
+
+    # one byte over the limit, for the validation to reject the line
+    assert lines == [b"xxxxx", b"ok"]
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from sprint4.models.clicks import ClickDelta
+from sprint4.services.click_counter import ClickCounter
+
+
+class FakeRepo:
+    def __init__(self) -> None:
+        self.flushes: list[list[ClickDelta]] = []
+
+    async def apply_click_deltas(self, deltas: list[ClickDelta]) -> None:
+        self.flushes.append(deltas)
+
+
+async def test_clicks_aggregated_per_url():
+    repo = FakeRepo()
+    counter = ClickCounter(repo)
+    first_at = datetime.now()
+    last_at = first_at + timedelta(seconds=1)
+    counter.add(1, first_at, "first")
+    counter.add(2, first_at, "other")
+    counter.add(1, last_at, "last")
+
+    assert await counter.flush()
+
+    (deltas,) = repo.flushes
+    assert sorted(deltas, key=lambda delta: delta.url_id) == [
+        ClickDelta(1, 2, last_at, "last"),
+        ClickDelta(2, 1, first_at, "other"),
+    ]
+    assert counter.flushed == 3
+    assert counter.pending(1) is None
+
+
+async def test_pending_clicks():
+    counter = ClickCounter(FakeRepo())
+    clicked_at = datetime.now()
+    counter.add(1, clicked_at, "agent")
+
+    assert counter.pending(1) == ClickDelta(1, 1, clicked_at, "agent")
+    assert counter.pending(2) is None
+
+
+async def test_failed_flush_merged_with_new_clicks():
+    counter = ClickCounter(FakeRepo())
+    first_at = datetime.now()
+    last_at = first_at + timedelta(seconds=1)
+    counter.add(1, first_at, "first")
+    batch = counter._swap()
+    counter.add(1, last_at, "last")
+
+    counter._restore(batch)
+
+    assert counter.pending(1) == ClickDelta(1, 2, last_at, "last")
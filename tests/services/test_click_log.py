@@ -0,0 +1,90 @@
+import asyncio
+from datetime import date, datetime
+
+from sprint4.models.clicks import ClickEvent
+from sprint4.services.click_log import ClickLogWriter
+
+
+class FakeRepo:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.batches: list[list[ClickEvent]] = []
+        self.partitions: list[tuple[date, int]] = []
+
+    async def add_clicks(self, events: list[ClickEvent]) -> None:
+        if self.fail:
+            raise RuntimeError("the database is down")
+        self.batches.append(events)
+
+    async def ensure_click_partitions(self, since: date, months: int) -> list[str]:
+        self.partitions.append((since, months))
+        return []
+
+
+def _event(url_id: int = 1) -> ClickEvent:
+    return ClickEvent(url_id, datetime.now(), "127.0.0.1", "agent")
+
+
+async def test_flush_by_batches():
+    repo = FakeRepo()
+    writer = ClickLogWriter(repo, batch_size=2)
+    for url_id in range(5):
+        writer.record(_event(url_id))
+
+    await writer.flush()
+
+    assert [len(batch) for batch in repo.batches] == [2, 2, 1]
+    url_ids = [event.url_id for batch in repo.batches for event in batch]
+    assert url_ids == list(range(5))
+    assert writer.written == 5
+    assert writer.pending == 0
+
+
+async def test_record_drops_when_full():
+    writer = ClickLogWriter(FakeRepo(), max_pending=2)
+
+    recorded = [writer.record(_event()) for _ in range(3)]
+
+    assert recorded == [True, True, False]
+    assert writer.pending == 2
+    assert writer.dropped == 1
+
+
+async def test_failed_batch_counted():
+    writer = ClickLogWriter(FakeRepo(fail=True), batch_size=2)
+    for _ in range(3):
+        writer.record(_event())
+
+    await writer.flush()
+
+    assert writer.failed == 3
+    assert writer.written == 0
+    assert writer.pending == 0
+
+
+async def test_full_batch_written_before_interval():
+    repo = FakeRepo()
+    writer = ClickLogWriter(repo, batch_size=2, flush_interval=60)
+    await writer.start()
+    try:
+        writer.record(_event())
+        writer.record(_event())
+        for _ in range(100):
+            if repo.batches:
+                break
+            await asyncio.sleep(0.01)
+        assert len(repo.batches) == 1
+    finally:
+        await writer.stop()
+
+
+async def test_stop_flushes():
+    repo = FakeRepo()
+    writer = ClickLogWriter(repo, flush_interval=60)
+    await writer.start()
+    writer.record(_event())
+
+    await writer.stop()
+
+    assert writer.written == 1
+    assert repo.partitions == [(date.today(), 2)]
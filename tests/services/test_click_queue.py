@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from sprint4.models.clicks import ClickDelta
+from sprint4.services.click_queue import ClickQueue
+
+
+class FakeRepo:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.fail = False
+        self.batches: list[list[ClickDelta]] = []
+
+    async def apply_click_deltas(self, deltas: list[ClickDelta]) -> None:
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("the database is down")
+        self.batches.append(deltas)
+
+
+CLICKED_AT = datetime(2026, 10, 18, 12, 0)
+
+
+def _click(url_id: int, seconds: int = 0, client_info: str = "curl") -> ClickDelta:
+    return ClickDelta(url_id, 1, CLICKED_AT + timedelta(seconds=seconds), client_info)
+
+
+def _nclicks(repo: FakeRepo) -> dict[int, int]:
+    nclicks: dict[int, int] = {}
+    for batch in repo.batches:
+        for delta in batch:
+            nclicks[delta.url_id] = nclicks.get(delta.url_id, 0) + delta.nclicks
+    return nclicks
+
+
+async def test_clicks_applied():
+    repo = FakeRepo(delay=0.001)
+    queue = ClickQueue(repo, workers=2, batch_size=3)
+    await queue.start()
+
+    for idx in range(20):
+        assert await queue.put(_click(idx % 4))
+    await queue.stop()
+
+    assert _nclicks(repo) == {0: 5, 1: 5, 2: 5, 3: 5}
+    assert max(sum(d.nclicks for d in batch) for batch in repo.batches) <= 3
+    assert (queue.applied, queue.pending) == (20, 0)
+
+
+async def test_batch_merged_per_url():
+    repo = FakeRepo()
+    original = [_click(1, 0, "first"), _click(2, 1), _click(1, 2, "last")]
+    queue = ClickQueue(repo, workers=1)
+    for click in original:
+        await queue.put(click)
+
+    await queue.start()
+    await queue.stop()
+
+    (batch,) = repo.batches
+    assert sorted(batch, key=lambda delta: delta.url_id) == [
+        ClickDelta(1, 2, CLICKED_AT + timedelta(seconds=2), "last"),
+        ClickDelta(2, 1, CLICKED_AT + timedelta(seconds=1), "curl"),
+    ]
+    # the queued clicks are left as they are
+    assert original[0] == _click(1, 0, "first")
+
+
+async def test_overflow_drop():
+    queue = ClickQueue(FakeRepo(), max_pending=2, overflow="drop")
+
+    results = [await queue.put(_click(1)) for _ in range(3)]
+
+    assert results == [True, True, False]
+    assert (queue.pending, queue.dropped) == (2, 1)
+
+
+async def test_overflow_block():
+    repo = FakeRepo()
+    queue = ClickQueue(repo, workers=1, max_pending=1, overflow="block")
+    await queue.put(_click(1))
+
+    blocked = asyncio.create_task(queue.put(_click(2)))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    await queue.start()
+    assert await asyncio.wait_for(blocked, timeout=1)
+    await queue.stop()
+    assert _nclicks(repo) == {1: 1, 2: 1}
+    assert queue.dropped == 0
+
+
+async def test_failed_batch_counted():
+    repo = FakeRepo()
+    repo.fail = True
+    queue = ClickQueue(repo, workers=1)
+    await queue.start()
+    await queue.put(_click(1))
+    await queue.put(_click(2))
+    await asyncio.sleep(0.01)
+
+    # the workers go on after a failure
+    repo.fail = False
+    await queue.put(_click(3))
+    await queue.stop()
+
+    assert queue.failed >= 1
+    assert queue.failed + queue.applied == 3
+    assert 3 in _nclicks(repo)
+
+
+async def test_stop_drains():
+    repo = FakeRepo(delay=0.01)
+    queue = ClickQueue(repo, workers=2, batch_size=2)
+    await queue.start()
+    for idx in range(10):
+        await queue.put(_click(idx))
+
+    await queue.stop()
+
+    assert len(_nclicks(repo)) == 10
+    # stopped twice harmlessly
+    await queue.stop()
+
+
+@pytest.mark.parametrize("overflow", ["drop", "block"])
+async def test_statistics(overflow):
+    queue = ClickQueue(FakeRepo(), max_pending=5, overflow=overflow)
+    await queue.put(_click(1))
+
+    stats = queue.statistics()
+
+    assert stats.pending == 1
+    assert stats.max_pending == 5
+    assert stats.overflow == overflow
+    assert (stats.applied, stats.dropped, stats.failed) == (0, 0, 0)
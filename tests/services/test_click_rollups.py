@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from sprint4.models.clicks import ClickBucketDelta, RollupGranularity
+from sprint4.services.click_rollups import ClickRollupAggregator
+
+
+class FakeRepo:
+    def __init__(self) -> None:
+        self.fail = False
+        self.flushes: list[list[ClickBucketDelta]] = []
+        self.prunes: list[tuple[RollupGranularity, datetime]] = []
+
+    async def add_click_rollups(self, deltas: list[ClickBucketDelta]) -> None:
+        if self.fail:
+            raise RuntimeError("the database is down")
+        self.flushes.append(deltas)
+
+    async def prune_click_rollups(
+        self, granularity: RollupGranularity, before: datetime
+    ) -> int:
+        if self.fail:
+            raise RuntimeError("the database is down")
+        self.prunes.append((granularity, before))
+        return 0
+
+
+MOMENT = datetime(2026, 10, 18, 13, 45, 30, 123456)
+
+
+@pytest.mark.parametrize(
+    "granularity, bucket",
+    [
+        (RollupGranularity.minute, datetime(2026, 10, 18, 13, 45)),
+        (RollupGranularity.hour, datetime(2026, 10, 18, 13)),
+        (RollupGranularity.day, datetime(2026, 10, 18)),
+    ],
+)
+def test_truncate(granularity, bucket):
+    assert granularity.truncate(MOMENT) == bucket
+    assert granularity.truncate(bucket) == bucket
+    assert granularity.truncate(bucket + granularity.step) == bucket + granularity.step
+
+
+async def test_clicks_counted_per_minute():
+    repo = FakeRepo()
+    rollups = ClickRollupAggregator(repo)
+    for seconds in (0, 10, 59, 60):
+        rollups.add(1, datetime(2026, 10, 18, 13, 45) + timedelta(seconds=seconds))
+    rollups.add(2, MOMENT)
+
+    assert await rollups.flush()
+
+    (deltas,) = repo.flushes
+    assert sorted(deltas, key=lambda delta: (delta.url_id, delta.bucket)) == [
+        ClickBucketDelta(1, datetime(2026, 10, 18, 13, 45), 3),
+        ClickBucketDelta(1, datetime(2026, 10, 18, 13, 46), 1),
+        ClickBucketDelta(2, datetime(2026, 10, 18, 13, 45), 1),
+    ]
+    assert rollups.flushed == 5
+    # nothing left to flush
+    assert await rollups.flush()
+    assert len(repo.flushes) == 1
+
+
+async def test_failed_flush_merged_with_new_clicks():
+    rollups = ClickRollupAggregator(FakeRepo())
+    rollups.add(1, MOMENT)
+    batch = rollups._swap()
+    rollups.add(1, MOMENT)
+
+    rollups._restore(batch)
+    assert await rollups.flush()
+
+    assert rollups._repo.flushes == [
+        [ClickBucketDelta(1, MOMENT.replace(second=0, microsecond=0), 2)]
+    ]
+
+
+async def test_prune_by_retentions():
+    repo = FakeRepo()
+    rollups = ClickRollupAggregator(
+        repo,
+        retentions={
+            RollupGranularity.minute: timedelta(days=2),
+            RollupGranularity.hour: timedelta(0),  # kept
+        },
+    )
+
+    started_at = datetime.now()
+    await rollups.prune()
+
+    ((granularity, before),) = repo.prunes
+    assert granularity is RollupGranularity.minute
+    assert before == granularity.truncate(before)
+    assert timedelta(days=2, minutes=1) > started_at - before >= timedelta(days=2)
+
+
+async def test_failed_prune_logged():
+    repo = FakeRepo()
+    repo.fail = True
+    rollups = ClickRollupAggregator(
+        repo, retentions={RollupGranularity.minute: timedelta(days=2)}
+    )
+
+    await rollups.prune()
+
+    assert repo.prunes == []
@@ -0,0 +1,101 @@
+import asyncio
+
+from sprint4.services.flusher import PeriodicFlusher
+
+
+class CountingFlusher(PeriodicFlusher[str, int]):
+    def __init__(self, flush_interval: float = 60, max_pending: int = 100) -> None:
+        super().__init__(flush_interval=flush_interval, max_pending=max_pending)
+        self.fail = False
+        self.flushes: list[dict[str, int]] = []
+        self.after_flushes = 0
+
+    def add(self, key: str) -> None:
+        self._pending[key] = self._pending.get(key, 0) + 1
+        if len(self._pending) >= self._max_pending:
+            self._flush_needed.set()
+
+    async def _write(self, batch: dict[str, int]) -> None:
+        if self.fail:
+            raise RuntimeError("the database is down")
+        self.flushes.append(dict(batch))
+
+    def _restore(self, batch: dict[str, int]) -> None:
+        for key, count in batch.items():
+            self._pending[key] = self._pending.get(key, 0) + count
+
+    async def _after_flush(self) -> None:
+        self.after_flushes += 1
+
+
+async def _wait_for(predicate) -> None:
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_failed_flush_kept_for_retry():
+    flusher = CountingFlusher()
+    flusher.add("a")
+    flusher.fail = True
+
+    assert not await flusher.flush()
+    flusher.add("a")
+    assert flusher.failed_flushes == 1
+
+    flusher.fail = False
+    assert await flusher.flush()
+    assert flusher.flushes == [{"a": 2}]
+    # nothing left to flush
+    assert await flusher.flush()
+    assert len(flusher.flushes) == 1
+
+
+async def test_failing_flush_retried_in_background():
+    flusher = CountingFlusher(flush_interval=0.01)
+    flusher.fail = True
+    await flusher.start()
+    try:
+        flusher.add("a")
+        await _wait_for(lambda: flusher.failed_flushes >= 2)
+        assert flusher.after_flushes == 0
+
+        flusher.fail = False
+        await _wait_for(lambda: flusher.flushes)
+        assert flusher.flushes == [{"a": 1}]
+        assert flusher.after_flushes >= 1
+    finally:
+        await flusher.stop()
+
+
+async def test_flush_when_max_pending():
+    flusher = CountingFlusher(max_pending=2)
+    await flusher.start()
+    try:
+        flusher.add("a")
+        flusher.add("a")
+        await asyncio.sleep(0.01)
+        assert flusher.flushes == []
+
+        flusher.add("b")
+        await _wait_for(lambda: flusher.flushes)
+        assert flusher.flushes == [{"a": 2, "b": 1}]
+    finally:
+        await flusher.stop()
+
+
+async def test_stop_flushes():
+    flusher = CountingFlusher()
+    await flusher.start()
+    flusher.add("a")
+
+    await flusher.stop()
+
+    assert flusher.flushes == [{"a": 1}]
+    # stopped twice harmlessly, restarted
+    await flusher.stop()
+    await flusher.start()
+    flusher.add("b")
+    await flusher.stop()
+    assert flusher.flushes == [{"a": 1}, {"b": 1}]
@@ -0,0 +1,129 @@
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from sprint4.core.url_shorteners import ShortenersEnum
+from sprint4.db.memory import InMemoryUrlRepository
+from sprint4.models.urls import HttpUrlAddRequest
+from sprint4.services import url_shortener
+from sprint4.services.url_filter import UrlExistenceFilter
+from sprint4.services.url_shortener import UrlShortenerService
+
+
+class FakeRepo:
+    def __init__(self, keys: list[tuple[int, str]]) -> None:
+        self.keys = keys
+        self.scans: list[None | int] = []
+
+    async def estimate_url_count(self) -> int:
+        return len(self.keys)
+
+    async def stream_url_keys(self, after_id=None, batch_size=10_000):
+        self.scans.append(after_id)
+        keys = [key for key in self.keys if after_id is None or key[0] > after_id]
+        for start in range(0, len(keys), batch_size):
+            stop = start + batch_size
+            yield keys[start:stop]
+
+
+def _short_url(url_id: int) -> str:
+    return f"http://localhost:8080/{url_id:07d}"
+
+
+@pytest.fixture
+def repo():
+    return FakeRepo([(url_id, _short_url(url_id)) for url_id in range(1, 101)])
+
+
+@pytest.fixture
+async def url_filter(repo):
+    url_filter = UrlExistenceFilter(repo, capacity=1000, scan_batch_size=30)
+    await url_filter.rebuild()
+    return url_filter
+
+
+async def test_everything_may_exist_until_built(repo):
+    url_filter = UrlExistenceFilter(repo)
+
+    assert not url_filter.ready
+    assert url_filter.may_contain_id(12345)
+    assert url_filter.statistics() is None
+
+
+async def test_rebuild(url_filter):
+    assert url_filter.ready
+    assert all(url_filter.may_contain_id(url_id) for url_id in range(1, 101))
+    assert url_filter.may_contain_short_url(_short_url(50))
+    missing = sum(url_filter.may_contain_id(url_id) for url_id in range(101, 1101))
+    assert missing < 50
+    assert url_filter.statistics().size == 200
+
+
+async def test_refresh_adds_new_rows(repo, url_filter):
+    repo.keys.append((1000, _short_url(1000)))
+
+    await url_filter.refresh()
+
+    assert repo.scans == [None, 100]
+    assert url_filter.may_contain_id(1000)
+    assert url_filter.may_contain_short_url(_short_url(1000))
+
+
+async def test_add_and_remove(url_filter):
+    url_filter.add(5000, _short_url(5000))
+    assert url_filter.may_contain_id(5000)
+
+    url_filter.remove(5000, _short_url(5000))
+
+    assert not url_filter.may_contain_id(5000)
+    assert not url_filter.may_contain_short_url(_short_url(5000))
+
+
+async def test_added_rows_not_rescanned(repo, url_filter):
+    repo.keys.append((1000, _short_url(1000)))
+    url_filter.add(1000, _short_url(1000))
+
+    await url_filter.refresh()
+
+    # counted once: a removal leaves no false positive behind
+    url_filter.remove(1000, _short_url(1000))
+    assert not url_filter.may_contain_id(1000)
+
+
+async def test_service_finds_url_added_by_other_worker(monkeypatch):
+    shared_repo = InMemoryUrlRepository()
+    monkeypatch.setattr(url_shortener, "get_url_repository", lambda _: shared_repo)
+    adder, redirector = UrlShortenerService(), UrlShortenerService()
+    await redirector._url_filter.rebuild()
+
+    [result] = await adder.add_urls(
+        [
+            HttpUrlAddRequest(
+                url="https://example.com/added", shortener_code=ShortenersEnum.local
+            )
+        ]
+    )
+    url = await redirector.redirect("short_url", str(result.row.short_url))
+
+    assert url == "https://example.com/added"
+    assert redirector._url_filter.may_contain_id(result.row.id)
+
+
+async def test_service_remembers_missing_url(monkeypatch):
+    shared_repo = InMemoryUrlRepository()
+    monkeypatch.setattr(url_shortener, "get_url_repository", lambda _: shared_repo)
+    service = UrlShortenerService()
+    await service._url_filter.rebuild()
+    lookups = []
+    find_url = shared_repo.find_url
+
+    async def counted_find_url(url_filter):
+        lookups.append(url_filter)
+        return await find_url(url_filter)
+
+    monkeypatch.setattr(shared_repo, "find_url", counted_find_url)
+
+    for _ in range(3):
+        with pytest.raises(NoResultFound):
+            await service.redirect("id", 12345)
+
+    assert len(lookups) == 1
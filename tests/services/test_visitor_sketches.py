@@ -0,0 +1,55 @@
+from sprint4.core.hyperloglog import HyperLogLog
+from sprint4.services.unique_visitors import UniqueVisitorCounter
+
+
+class FakeRepo:
+    def __init__(self) -> None:
+        self.flushes: list[dict[int, bytes]] = []
+
+    async def merge_visitor_sketches(self, sketches: dict[int, bytes]) -> None:
+        self.flushes.append(sketches)
+
+
+def _visit(counter: UniqueVisitorCounter, url_id: int, visitors: range) -> None:
+    for idx in visitors:
+        counter.add(url_id, f"10.0.0.{idx}", "curl")
+
+
+async def test_visitors_sketched_per_url():
+    repo = FakeRepo()
+    counter = UniqueVisitorCounter(repo, precision=10)
+    _visit(counter, 1, range(5))
+    _visit(counter, 1, range(5))
+    _visit(counter, 2, range(2))
+    counter.add(2, "10.0.0.0", "wget")  # another agent, another visitor
+
+    assert counter.pending(1).count() == 5
+
+    assert await counter.flush()
+    (sketches,) = repo.flushes
+    counts = {
+        url_id: HyperLogLog.from_bytes(data).count()
+        for url_id, data in sketches.items()
+    }
+    assert counts == {1: 5, 2: 3}
+    assert counter.pending(1) is None
+
+
+async def test_anonymous_visitor_skipped():
+    counter = UniqueVisitorCounter(FakeRepo())
+    counter.add(1, None, None)
+    counter.add(2, None, "curl")
+
+    assert counter.pending(1) is None
+    assert counter.pending(2).count() == 1
+
+
+async def test_failed_flush_merged_with_new_visitors():
+    counter = UniqueVisitorCounter(FakeRepo())
+    _visit(counter, 1, range(3))
+    batch = counter._swap()
+    _visit(counter, 1, range(2, 6))
+
+    counter._restore(batch)
+
+    assert counter.pending(1).count() == 6
@@ -0,0 +1,91 @@
+import asyncio
+import importlib
+
+import pytest
+from click.testing import CliRunner
+
+
+@pytest.fixture
+def main(monkeypatch):
+    # the uvloop policy would be set for the whole test session otherwise
+    monkeypatch.setattr(asyncio, "set_event_loop_policy", lambda policy: None)
+    return importlib.import_module("sprint4.main")
+
+
+@pytest.fixture
+def runs(main, monkeypatch):
+    runs: list[dict] = []
+    monkeypatch.setattr(main, "run_asgi", lambda **kwargs: runs.append(kwargs))
+    return runs
+
+
+@pytest.fixture
+def multiproc_dirs(main, monkeypatch):
+    dirs = []
+    monkeypatch.setattr(main, "prepare_multiproc_dir", dirs.append)
+    return dirs
+
+
+def test_dev_mode(main, runs, multiproc_dirs):
+    result = CliRunner().invoke(main.main, ["--mode", "dev", "--port", "8000"])
+
+    assert result.exit_code == 0, result.output
+    (kwargs,) = runs
+    assert kwargs["reload"] is True
+    assert kwargs["port"] == 8000
+    assert "workers" not in kwargs
+    assert multiproc_dirs == []
+
+
+def test_prod_mode(main, runs, multiproc_dirs):
+    result = CliRunner().invoke(
+        main.main,
+        [
+            "--mode",
+            "prod",
+            "--workers",
+            "4",
+            "--backlog",
+            "512",
+            "--keep-alive",
+            "10",
+            "--limit-concurrency",
+            "1000",
+            "--limit-max-requests",
+            "50000",
+            "--graceful-shutdown",
+            "15",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    (kwargs,) = runs
+    assert kwargs["workers"] == 4
+    assert kwargs["loop"] == "uvloop"
+    assert kwargs["http"] == "httptools"
+    assert kwargs["backlog"] == 512
+    assert kwargs["timeout_keep_alive"] == 10
+    assert kwargs["limit_concurrency"] == 1000
+    assert kwargs["limit_max_requests"] == 50000
+    assert kwargs["timeout_graceful_shutdown"] == 15
+    assert kwargs["access_log"] is False
+    assert "reload" not in kwargs
+    assert len(multiproc_dirs) == 1
+
+
+def test_prod_mode_single_worker(main, runs, multiproc_dirs):
+    result = CliRunner().invoke(main.main, ["--mode", "prod", "--workers", "1"])
+
+    assert result.exit_code == 0, result.output
+    assert runs[0]["workers"] == 1
+    assert multiproc_dirs == []
+
+
+@pytest.mark.parametrize(
+    "args", [["--mode", "debug"], ["--workers", "0"], ["--backlog", "0"]]
+)
+def test_invalid_options(main, runs, args):
+    result = CliRunner().invoke(main.main, args)
+
+    assert result.exit_code == 2
+    assert runs == []